@@ -0,0 +1,111 @@
+#####------------------------------------------------------------------------Detecting aliases shared by several authors (reverse index alias -> QIDs) before compiling the matcher-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import json
+import pandas as pd
+from alias_table import load_alias_tables
+
+### Step 1: Defining relevant directories, file paths and variables
+
+ALIAS_CSVS = [
+    r'path_to\use-case-1\aliases.csv',
+    r'path_to\use-case-3\ancient_authors_wikidata_labels_aliases.csv',
+]
+OUTPUT_DIR = r'path_to\corpus-matching\output'
+
+COLLISION_POLICIES = ('exclude', 'weight', 'keep') # what to do with an alias shared by several authors
+
+
+### Step 2: Defining the functions
+
+def normalise_alias(alias):
+    """
+Description:
+Casefolds an alias and collapses its whitespace, so that 'Saint  Clement' and 'saint clement' are counted as the same surface form.
+"""
+    return ' '.join(str(alias).casefold().split())
+
+def build_alias_collision_index(df_aliases, by_language=False, normalise=normalise_alias):
+    """
+Description:
+Builds, in one pass over an alias table (see alias_table.py), a hashed reverse index from every normalised alias to the set of authors (QIDs) it designates.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)().
+by_language (bool, optional): if True, the keys are (alias, lang_code) pairs, so that an alias is only ambiguous within one language (e.g. French 'césar'). Defaults to False.
+normalise (function, optional): function turning an alias into its key. Defaults to normalise_alias.
+
+Returns:
+alias_index (dict): key -> set of QIDs
+"""
+    alias_index = {}
+    languages = df_aliases['lang_code'] if by_language else [None] * len(df_aliases)
+
+    for alias, qid, lang_code in zip(df_aliases['alias'], df_aliases['q_identifier'], languages):
+        key = (normalise(alias), lang_code) if by_language else normalise(alias)
+        alias_index.setdefault(key, set()).add(qid)
+
+    return alias_index
+
+def find_alias_collisions(alias_index):
+    """
+Description:
+Lists every key of the reverse index shared by more than one author.
+
+Arguments:
+alias_index (dict): output of build_alias_collision_index().
+
+Returns:
+df_collisions (DataFrame): columns 'alias', 'lang_code', 'nb_authors', 'q_identifiers' (JSON list), most shared first.
+"""
+    rows = []
+    for key, qids in alias_index.items():
+        if len(qids) > 1:
+            alias, lang_code = key if isinstance(key, tuple) else (key, None)
+            rows.append({"alias": alias, "lang_code": lang_code, "nb_authors": len(qids), "q_identifiers": json.dumps(sorted(qids))})
+
+    df_collisions = pd.DataFrame(rows, columns=["alias", "lang_code", "nb_authors", "q_identifiers"])
+    return df_collisions.sort_values(["nb_authors", "alias"], ascending=[False, True]).reset_index(drop=True)
+
+def resolve_alias_collisions(df_aliases, policy='exclude', by_language=False, normalise=normalise_alias):
+    """
+Description:
+Flags the ambiguous aliases of an alias table and applies the collision policy before the matcher is compiled:
+'exclude' drops them, 'weight' keeps them with a weight of 1 / number of authors sharing them, 'keep' only flags them.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)().
+policy (str, optional): one of COLLISION_POLICIES. Defaults to 'exclude'.
+by_language (bool, optional): see build_alias_collision_index(). Defaults to False.
+normalise (function, optional): see build_alias_collision_index(). Defaults to normalise_alias.
+
+Returns:
+tuple: (df_aliases with 'nb_authors' and 'weight' columns (ambiguous rows dropped with 'exclude'), df_collisions)
+"""
+    if policy not in COLLISION_POLICIES:
+        raise ValueError(f"Unknown collision policy '{policy}', expected one of {COLLISION_POLICIES}.")
+
+    alias_index = build_alias_collision_index(df_aliases, by_language, normalise)
+    df_collisions = find_alias_collisions(alias_index)
+
+    keys = zip(df_aliases['alias'].map(normalise), df_aliases['lang_code']) if by_language else df_aliases['alias'].map(normalise)
+    df_aliases = df_aliases.assign(nb_authors=[len(alias_index[key]) for key in keys])
+    df_aliases['weight'] = 1 / df_aliases['nb_authors']
+
+    nb_ambiguous = int((df_aliases['nb_authors'] > 1).sum())
+    print(f"[i] Found {len(df_collisions)} aliases shared by more than one author{' (within one language)' if by_language else ''}, in {nb_ambiguous} (alias, QID) rows. Policy: {policy}.")
+
+    if policy == 'exclude':
+        df_aliases = df_aliases[df_aliases['nb_authors'] == 1].reset_index(drop=True)
+
+    return df_aliases, df_collisions
+
+### Step 3: Saving the collisions of the alias lists for review
+
+if __name__ == "__main__":
+    _, df_collisions = resolve_alias_collisions(load_alias_tables(ALIAS_CSVS), policy='keep', by_language=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    collisions_csv_path = os.path.join(OUTPUT_DIR, 'alias_collisions.csv')
+    df_collisions.to_csv(collisions_csv_path, index=False)
+    print(f"|Y| Alias collisions saved to {collisions_csv_path}.")
@@ -0,0 +1,176 @@
+#####------------------------------------------------------------------------Compact, memory-mappable alias -> author dictionary (sorted key table with interned QIDs and language codes)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import json
+import bisect
+import numpy as np
+from alias_table import load_alias_tables
+from alias_collisions import normalise_alias
+from alias_normalisation import alias_key
+
+### Step 1: Defining relevant directories, file paths and variables
+
+ALIAS_CSVS = [
+    r'path_to\use-case-1\aliases.csv',
+    r'path_to\use-case-3\ancient_authors_wikidata_labels_aliases.csv',
+]
+DICTIONARY_DIR = r'path_to\corpus-matching\output\alias_dictionary'
+
+KEY_FUNCTIONS = {
+    'casefold': normalise_alias,
+    'strict': lambda alias: ' '.join(alias_key(alias, 'strict')),
+    'loose': lambda alias: ' '.join(alias_key(alias, 'loose')),
+}
+ARRAY_NAMES = ['key_bytes', 'key_offsets', 'entry_offsets', 'entry_qids', 'entry_langs']
+NO_LANGUAGE = 0 # position of the empty language code in the language table
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Compiling the dictionary
+
+def compile_alias_dictionary(df_aliases, dictionary_dir, key_type='casefold'):
+    """
+Description:
+Compiles the alias -> author mapping of an alias table (see alias_table.py) into a few flat arrays saved as .npy files:
+the sorted alias keys (one UTF-8 byte array and its offsets) and, for every key, its (QID, language) entries as positions in two interned tables (qids.json, langs.json).
+The files can be memory-mapped, so that loading takes milliseconds and the pages are shared read-only by all the processes using them.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)().
+dictionary_dir (str): directory where the files are written.
+key_type (str, optional): how aliases are turned into keys: 'casefold', or the 'strict' / 'loose' keys of alias_normalisation.py. Defaults to 'casefold'.
+
+Returns:
+dictionary_dir (str)
+"""
+    key_function = KEY_FUNCTIONS[key_type]
+
+    # interning the QIDs and language codes
+    qids = sorted(df_aliases['q_identifier'].unique())
+    langs = [''] + sorted(lang for lang in df_aliases['lang_code'].dropna().unique() if lang)
+    qid_positions = {qid: position for position, qid in enumerate(qids)}
+    lang_positions = {lang: position for position, lang in enumerate(langs)}
+
+    entries_by_key = {}
+    for alias, qid, lang in zip(df_aliases['alias'], df_aliases['q_identifier'], df_aliases['lang_code']):
+        key = key_function(alias)
+        if key:
+            entries_by_key.setdefault(key.encode('utf-8'), set()).add((qid_positions[qid], lang_positions.get(lang, NO_LANGUAGE) if isinstance(lang, str) else NO_LANGUAGE))
+
+    # keys are sorted as bytes, which is the order used for lookups
+    keys = sorted(entries_by_key)
+    key_offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    key_offsets[1:] = np.cumsum([len(key) for key in keys])
+    entry_offsets = np.zeros(len(keys) + 1, dtype=np.uint32)
+    entry_offsets[1:] = np.cumsum([len(entries_by_key[key]) for key in keys])
+    entries = [entry for key in keys for entry in sorted(entries_by_key[key])]
+
+    arrays = {
+        'key_bytes': np.frombuffer(b''.join(keys), dtype=np.uint8),
+        'key_offsets': key_offsets,
+        'entry_offsets': entry_offsets,
+        'entry_qids': np.array([qid for qid, _ in entries], dtype=np.uint32),
+        'entry_langs': np.array([lang for _, lang in entries], dtype=np.uint16),
+    }
+
+    os.makedirs(dictionary_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(dictionary_dir, f'{name}.npy'), array)
+    with open(os.path.join(dictionary_dir, 'qids.json'), 'w', encoding='utf-8') as file:
+        json.dump(qids, file)
+    with open(os.path.join(dictionary_dir, 'langs.json'), 'w', encoding='utf-8') as file:
+        json.dump(langs, file)
+    with open(os.path.join(dictionary_dir, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump({'key_type': key_type, 'nb_keys': len(keys), 'nb_entries': len(entries)}, file)
+
+    size = sum(array.nbytes for array in arrays.values())
+    print(f"|Y| Compiled {len(keys)} alias keys ({len(entries)} entries, {len(qids)} QIDs, {len(langs) - 1} languages) into {size / 1e6:.1f} MB in {dictionary_dir}.")
+
+    return dictionary_dir
+
+## 2.2.: Loading and querying the dictionary
+
+def key_at(dictionary, position):
+    """
+Description:
+Returns the key stored at a position of the sorted key table (as UTF-8 bytes), read from the (memory-mapped) arrays without building a list of keys.
+"""
+    return dictionary['key_bytes'][int(dictionary['key_offsets'][position]):int(dictionary['key_offsets'][position + 1])].tobytes()
+
+def _search_key(dictionary, key):
+    # position of the first key >= key (binary search on the sorted keys)
+    return bisect.bisect_left(range(dictionary['meta']['nb_keys']), key, key=lambda position: key_at(dictionary, position))
+
+def load_alias_dictionary(dictionary_dir, mmap=True):
+    """
+Description:
+Opens a dictionary compiled by compile_alias_dictionary(). With mmap=True the arrays are memory-mapped (read-only) instead of read.
+
+Arguments:
+dictionary_dir (str): directory of the compiled dictionary.
+mmap (bool, optional): Defaults to True.
+
+Returns:
+dictionary (dict): the arrays, the 'qids' and 'langs' tables, 'meta' and 'key_function'.
+"""
+    dictionary = {name: np.load(os.path.join(dictionary_dir, f'{name}.npy'), mmap_mode='r' if mmap else None) for name in ARRAY_NAMES}
+    for name in ('qids', 'langs', 'meta'):
+        with open(os.path.join(dictionary_dir, f'{name}.json'), 'r', encoding='utf-8') as file:
+            dictionary[name] = json.load(file)
+
+    dictionary['key_function'] = KEY_FUNCTIONS[dictionary['meta']['key_type']]
+
+    return dictionary
+
+def _entries(dictionary, position):
+    start, end = int(dictionary['entry_offsets'][position]), int(dictionary['entry_offsets'][position + 1])
+    return [(dictionary['qids'][qid], dictionary['langs'][lang] or None) for qid, lang in zip(dictionary['entry_qids'][start:end], dictionary['entry_langs'][start:end])]
+
+def lookup_alias(dictionary, alias):
+    """
+Description:
+Exact lookup: returns the (QID, language code) entries of an alias (binary search on the sorted keys). The alias is keyed like at compile time.
+
+Arguments:
+dictionary (dict): output of load_alias_dictionary().
+alias (str): the alias to look up.
+
+Returns:
+entries (list): list of (QID, lang_code) tuples (empty if the alias is unknown).
+"""
+    key = dictionary['key_function'](alias).encode('utf-8')
+    position = _search_key(dictionary, key)
+    if position < dictionary['meta']['nb_keys'] and key_at(dictionary, position) == key:
+        return _entries(dictionary, position)
+    return []
+
+def lookup_prefix(dictionary, prefix, limit=100):
+    """
+Description:
+Prefix lookup: returns the aliases starting with prefix (e.g. 'cicer' -> 'cicero', 'ciceron', 'cicerone' ...) and their entries.
+
+Arguments:
+dictionary (dict): output of load_alias_dictionary().
+prefix (str): the beginning of the alias (keyed like at compile time).
+limit (int, optional): maximum number of aliases returned. Defaults to 100.
+
+Returns:
+matches (list): list of (alias key, entries) tuples, in key order.
+"""
+    key = dictionary['key_function'](prefix).encode('utf-8')
+    nb_keys = dictionary['meta']['nb_keys']
+    position = _search_key(dictionary, key)
+
+    matches = []
+    while position < nb_keys and len(matches) < (limit or nb_keys) and key_at(dictionary, position).startswith(key):
+        matches.append((key_at(dictionary, position).decode('utf-8'), _entries(dictionary, position)))
+        position += 1
+
+    return matches
+
+### Step 3: Compiling the dictionary of the alias lists
+
+if __name__ == "__main__":
+    compile_alias_dictionary(load_alias_tables(ALIAS_CSVS), DICTIONARY_DIR)
@@ -0,0 +1,217 @@
+#####------------------------------------------------------------------------Resolving the aliases shared by several authors from their context, in the same pass as the matching-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import math
+import pandas as pd
+from alias_normalisation import TOKEN_PATTERN, token_key
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Author features (priors and dates)
+
+AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv' # 'mediate_nb_collections'
+ITEM_METRICS_CSV = r'path_to\use-case-3\ancient_authors_wikidata_item_metrics.csv' # 'total_sitelinks'
+WITH_PRECISION_CSV = r'path_to\use-case-3\ancient_authors_wikidata_with_precision.csv' # birth, death and floruit years
+UC3_SEPARATOR = ';'
+
+## 1.2.: Context features
+
+WINDOW = 300 # characters before and after an ambiguous hit in which the other hits and the era cues are looked for
+ERA_SCALE = 150 # years: two authors this far apart get an affinity of 1 / e
+CHRISTIAN_ERA_START = 50 # authors dated from this year on get the 'christian' cue
+ERA_CUES = { # token keys (see token_key()) -> cue
+    'saint': 'christian', 'st': 'christian', 'sanctus': 'christian', 'sancti': 'christian', 'sainte': 'christian', 'san': 'christian',
+    'eueque': 'christian', 'bishop': 'christian', 'episcopus': 'christian', 'pape': 'christian', 'pope': 'christian', 'martyr': 'christian',
+    'eglise': 'christian', 'church': 'christian', 'ecclesia': 'christian', 'apologiste': 'christian', 'apologist': 'christian', 'chretien': 'christian', 'christian': 'christian',
+    'elder': 'elder', 'ancien': 'elder', 'maior': 'elder', 'rheteur': 'elder', 'rhetor': 'elder',
+    'younger': 'younger', 'ieune': 'younger', 'minor': 'younger', 'neueu': 'younger', 'nephew': 'younger',
+}
+
+## 1.3.: Weights of the features in the score of a candidate
+
+WEIGHTS = {
+    'prior': 1.0, # popularity: MEDIATE collections and Wikidata sitelinks
+    'document': 2.0, # the candidate is named unambiguously elsewhere in the document
+    'resolved': 1.0, # the candidate was resolved confidently earlier in the document (below the era cues, so that an explicit 'the Elder' is not overruled)
+    'cooccurrence': 1.0, # the unambiguous authors of the window are close in time to the candidate
+    'era': 1.5, # an era cue of the window fits the candidate
+}
+FEEDBACK_CONFIDENCE = 0.8 # resolutions at least this likely also count for the next hits of the document (the runner-up is then at least 0.6 behind)
+DISAMBIGUATION_COLUMN = 'disambiguation_confidence'
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Precomputing the features of the authors
+
+def representative_year(row):
+    """
+Description:
+Returns one year for an author of the with_precision CSV: the floruit, otherwise 40 years after birth, otherwise 20 years before death (None if undated).
+"""
+    if pd.notna(row['floruit_year']):
+        return float(row['floruit_year'])
+    if pd.notna(row['birth_year']):
+        return float(row['birth_year']) + 40
+    if pd.notna(row['death_year']):
+        return float(row['death_year']) - 20
+    return None
+
+def build_author_features(qids, authors_csv=None, item_metrics_csv=None, with_precision_csv=None):
+    """
+Description:
+Precomputes, once, the features of every author used to score the candidates of an ambiguous alias:
+a prior in [0, 1] (mean of the log-scaled MEDIATE collections and Wikidata sitelinks, each divided by its maximum) and a representative year.
+Missing files or authors get a prior of 0 and no year.
+
+Arguments:
+qids (iterable): the authors of the alias table.
+authors_csv (str, optional): use case 2 authors CSV ('q_identifier', 'mediate_nb_collections').
+item_metrics_csv (str, optional): use case 3 item metrics CSV ('wikidata_id', 'total_sitelinks').
+with_precision_csv (str, optional): use case 3 dates CSV ('wikidata_id', birth, death and floruit years).
+
+Returns:
+features (dict): QID -> {'prior': float, 'year': float or None}
+"""
+    qids = set(qids)
+    collections, sitelinks, years = {}, {}, {}
+
+    if authors_csv:
+        df_authors = pd.read_csv(authors_csv, dtype={'q_identifier': str})
+        collections = dict(zip(df_authors['q_identifier'], pd.to_numeric(df_authors['mediate_nb_collections'], errors='coerce').fillna(0)))
+    if item_metrics_csv:
+        df_metrics = pd.read_csv(item_metrics_csv, sep=UC3_SEPARATOR, dtype={'wikidata_id': str})
+        sitelinks = dict(zip(df_metrics['wikidata_id'], pd.to_numeric(df_metrics['total_sitelinks'], errors='coerce').fillna(0)))
+    if with_precision_csv:
+        df_dates = pd.read_csv(with_precision_csv, sep=UC3_SEPARATOR, dtype={'wikidata_id': str})
+        years = {row['wikidata_id']: representative_year(row) for row in df_dates.to_dict('records')}
+
+    max_collections = math.log1p(max(collections.values(), default=0)) or 1
+    max_sitelinks = math.log1p(max(sitelinks.values(), default=0)) or 1
+
+    features = {}
+    for qid in qids:
+        prior = (math.log1p(collections.get(qid, 0)) / max_collections + math.log1p(sitelinks.get(qid, 0)) / max_sitelinks) / 2
+        features[qid] = {"prior": prior, "year": years.get(qid)}
+
+    nb_dated = sum(1 for feature in features.values() if feature['year'] is not None)
+    print(f"[i] Features of {len(features)} authors precomputed ({nb_dated} dated).")
+
+    return features
+
+def build_disambiguating_matcher(automaton, scanner, features):
+    """
+Description:
+Wraps a matcher (see alias_matcher.py, alias_normalisation.py or alias_fuzzy.py) compiled with ambiguous aliases kept (collision policy 'keep' or 'weight')
+so that scan_text_disambiguated() reports every ambiguous hit for the best-scored author only.
+For every (ambiguous pattern, candidate) pair, a pattern with that single author is added after the patterns of the matcher, so that scan_corpus() and the mention counts need no change.
+
+Arguments:
+automaton (dict): the compiled matcher.
+scanner (function): its scanning function (scan_text, scan_text_normalised or scan_text_fuzzy).
+features (dict): output of build_author_features().
+
+Returns:
+matcher (dict): the automaton with the resolved patterns added, 'base_scanner', 'features' and 'resolved_patterns' ((pattern position, QID) -> resolved pattern position).
+"""
+    matcher = dict(automaton)
+    matcher["patterns"], matcher["alias_qids"], matcher["alias_weights"] = list(automaton["patterns"]), list(automaton["alias_qids"]), list(automaton["alias_weights"])
+    matcher["resolved_patterns"] = {}
+
+    for pattern_nb, qids in enumerate(automaton["alias_qids"]):
+        if len(qids) > 1:
+            for qid in qids:
+                matcher["resolved_patterns"][(pattern_nb, qid)] = len(matcher["patterns"])
+                matcher["patterns"].append(automaton["patterns"][pattern_nb])
+                matcher["alias_qids"].append((qid,))
+                matcher["alias_weights"].append(1.0)
+
+    matcher["base_scanner"] = scanner
+    matcher["features"] = {qid: features.get(qid, {"prior": 0.0, "year": None}) for qids in automaton["alias_qids"] for qid in qids}
+    nb_ambiguous = sum(1 for qids in automaton["alias_qids"] if len(qids) > 1)
+    print(f"[i] {nb_ambiguous} ambiguous aliases will be resolved from their context ({len(matcher['resolved_patterns'])} candidate patterns).")
+
+    return matcher
+
+## 2.2.: Scoring the candidates of a hit
+
+def score_candidates(candidates, features, document_qids, window_qids, cues, resolved_qids=()):
+    """
+Description:
+Scores the candidates of an ambiguous hit (see WEIGHTS) and turns the scores into probabilities (softmax).
+
+Arguments:
+candidates (tuple): the QIDs sharing the alias.
+features (dict): QID -> {'prior', 'year'}.
+document_qids (set): authors named unambiguously in the document.
+window_qids (list): authors named unambiguously within WINDOW characters of the hit.
+cues (set): era cues found within WINDOW characters of the hit.
+resolved_qids (set, optional): authors resolved earlier in the document with a probability of at least FEEDBACK_CONFIDENCE. Defaults to none.
+
+Returns:
+probabilities (dict): QID -> probability
+"""
+    dated = [features[qid]['year'] for qid in candidates if features[qid]['year'] is not None]
+    window_years = [features[qid]['year'] for qid in window_qids if qid in features and features[qid]['year'] is not None]
+
+    scores = {}
+    for qid in candidates:
+        year = features[qid]['year']
+        score = WEIGHTS['prior'] * features[qid]['prior'] + WEIGHTS['document'] * (qid in document_qids) + WEIGHTS['resolved'] * (qid in resolved_qids and qid not in document_qids)
+        if year is not None:
+            if window_years:
+                score += WEIGHTS['cooccurrence'] * sum(math.exp(-abs(year - other) / ERA_SCALE) for other in window_years) / len(window_years)
+            if 'christian' in cues and year >= CHRISTIAN_ERA_START:
+                score += WEIGHTS['era']
+            # elder and younger only tell apart two dated candidates (a single dated one would be both)
+            if 'elder' in cues and len(dated) >= 2 and year == min(dated):
+                score += WEIGHTS['era']
+            if 'younger' in cues and len(dated) >= 2 and year == max(dated):
+                score += WEIGHTS['era']
+        scores[qid] = score
+
+    top = max(scores.values())
+    exponentials = {qid: math.exp(score - top) for qid, score in scores.items()}
+    total = sum(exponentials.values())
+    return {qid: value / total for qid, value in exponentials.items()}
+
+## 2.3.: Scanning a text
+
+def scan_text_disambiguated(matcher, text):
+    """
+Description:
+Scans the text with the base scanner of the matcher, then resolves every ambiguous hit from the hits of the same text (already in memory, no second pass or lookup):
+the authors named unambiguously in the document and in the window around the hit, the era cues of the window, and the priors of the candidates.
+
+Arguments:
+matcher (dict): output of build_disambiguating_matcher().
+text (str): the text to scan.
+
+Returns:
+hits (list): the hits of the base scanner with the resolved pattern position for ambiguous hits and the confidence of the resolution added as a last column (1.0 for unambiguous hits).
+"""
+    hits = matcher["base_scanner"](matcher, text)
+    alias_qids, features, resolved_patterns = matcher["alias_qids"], matcher["features"], matcher["resolved_patterns"]
+
+    unambiguous = [(hit[0], alias_qids[hit[1]][0]) for hit in hits if len(alias_qids[hit[1]]) == 1]
+    document_qids = {qid for _, qid in unambiguous}
+    resolved_qids = set()
+
+    resolved = []
+    for offset, pattern_nb, *details in hits:
+        candidates = alias_qids[pattern_nb]
+        if len(candidates) == 1:
+            resolved.append((offset, pattern_nb, *details, 1.0))
+            continue
+
+        window_qids = [qid for other_offset, qid in unambiguous if abs(other_offset - offset) <= WINDOW]
+        window = text[max(0, offset - WINDOW):offset + WINDOW]
+        cues = {ERA_CUES[key] for key in (token_key(token) for token in TOKEN_PATTERN.findall(window)) if key in ERA_CUES}
+
+        probabilities = score_candidates(candidates, features, document_qids, window_qids, cues, resolved_qids)
+        best = max(probabilities, key=probabilities.get)
+        if probabilities[best] >= FEEDBACK_CONFIDENCE: # a confident resolution also counts for the next hits of the document ('Saint Clement of Alexandria ... Clement'), a coin flip does not
+            resolved_qids.add(best)
+        resolved.append((offset, resolved_patterns[(pattern_nb, best)], *details, round(probabilities[best], 3)))
+
+    return resolved
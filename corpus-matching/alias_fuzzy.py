@@ -0,0 +1,198 @@
+#####------------------------------------------------------------------------OCR-tolerant matching of the aliases (symmetric deletion index on normalised token keys, bounded edit distance)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+from itertools import combinations
+from alias_normalisation import KEY_LEVELS, TOKEN_PATTERN, alias_key, token_key
+
+### Step 1: Defining relevant variables
+
+# maximum edit distance allowed for a token, by token length (short tokens must match exactly: 'cato' / 'cata', 'livy' / 'live')
+MAX_DISTANCES = [(4, 0), (8, 1), (float('inf'), 2)] # (up to this length, maximum distance)
+MIN_CONFIDENCE = 0.75
+MAX_CACHED_TOKENS = 1_000_000
+FUZZY_HITS_COLUMNS = ['doc_id', 'offset', 'alias', 'q_identifier', 'weight', 'matched_text', 'edit_distance', 'confidence']
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Edit distance
+
+def max_distance_for(token):
+    """
+Description:
+Returns the maximum edit distance allowed for a token of this length (see MAX_DISTANCES).
+"""
+    for max_length, max_distance in MAX_DISTANCES:
+        if len(token) <= max_length:
+            return max_distance
+
+def deletion_variants(token, max_distance):
+    """
+Description:
+Returns the token and every string obtained by deleting up to max_distance of its characters ('ciceron', 1 -> 'ciceron', 'iceron', 'cceron', 'cieron'...).
+Two tokens within an edit distance d share at least one variant with up to d deletions, so a lookup of the variants finds the candidates without comparing to every alias token.
+"""
+    variants = {token}
+    for nb_deleted in range(1, min(max_distance, len(token) - 1) + 1):
+        for positions in combinations(range(len(token)), nb_deleted):
+            variants.add(''.join(char for position, char in enumerate(token) if position not in positions))
+    return variants
+
+def edit_distance(first, second, max_distance):
+    """
+Description:
+Levenshtein distance (insertions, deletions, substitutions) between two strings, stopping as soon as it exceeds max_distance.
+
+Returns:
+distance (int): the distance, or max_distance + 1 if it is larger than max_distance.
+"""
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (first_char != second_char)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return min(previous[-1], max_distance + 1)
+
+## 2.2.: Compiling the index
+
+def build_fuzzy_alias_index(df_aliases, level='strict', min_key_length=3):
+    """
+Description:
+Normalises every alias of an alias table (see alias_table.py) into its token keys (see alias_normalisation.py) and indexes the deletion variants of every alias token,
+so that the corpus tokens within the allowed edit distance of an alias token (e.g. 'cic6ron' for 'ciceron', 'uirgilc' for 'uirgile') are found by a few dictionary lookups.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)() (or of resolve_alias_collisions()).
+level (str, optional): 'strict' or 'loose'. Defaults to 'strict'.
+min_key_length (int, optional): keys shorter than this (in characters) are left out. Defaults to 3.
+
+Returns:
+index (dict): {'keys', 'prefixes', 'patterns', 'alias_qids', 'alias_weights', 'level'} as in build_normalised_alias_index(),
+plus 'vocabulary' (set of alias tokens), 'deletions' (variant -> alias tokens) and 'cache' (corpus token -> candidates).
+"""
+    if level not in KEY_LEVELS:
+        raise ValueError(f"Unknown key level '{level}', expected one of {KEY_LEVELS}.")
+
+    qids_by_key = {}
+    for alias, qid in zip(df_aliases['alias'], df_aliases['q_identifier']):
+        key = alias_key(alias, level)
+        if key and len(' '.join(key)) >= min_key_length:
+            qids_by_key.setdefault(key, []).append(qid)
+
+    keys = list(qids_by_key)
+    vocabulary = {token for key in keys for token in key}
+    deletions = {}
+    for token in vocabulary:
+        for variant in deletion_variants(token, max_distance_for(token)):
+            deletions.setdefault(variant, []).append(token)
+
+    index = {
+        "keys": {key: pattern_nb for pattern_nb, key in enumerate(keys)},
+        "patterns": [' '.join(key) for key in keys],
+        "alias_qids": [tuple(dict.fromkeys(qids_by_key[key])) for key in keys],
+        "prefixes": {key[:length] for key in keys for length in range(1, len(key) + 1)},
+        "level": level,
+        "vocabulary": vocabulary,
+        "deletions": deletions,
+        "cache": {},
+    }
+    index["alias_weights"] = [1 / len(qids) for qids in index["alias_qids"]]
+
+    print(f"[i] Indexed {len(vocabulary)} alias tokens ({len(keys)} {level} keys) under {len(deletions)} deletion variants.")
+
+    return index
+
+## 2.3.: Scanning a text
+
+def token_candidates(index, token):
+    """
+Description:
+Returns the alias tokens matching a corpus token key: the token itself if it is an alias token, otherwise the alias tokens within the allowed edit distance.
+Results are cached in the index, since corpus tokens repeat a lot (most of them have no candidate and cost one lookup).
+
+Returns:
+candidates (tuple): tuple of (alias token, edit distance)
+"""
+    cache = index["cache"]
+    candidates = cache.get(token)
+    if candidates is not None:
+        return candidates
+
+    if token in index["vocabulary"]:
+        candidates = ((token, 0),)
+    else:
+        max_distance = max_distance_for(token)
+        found = {}
+        if max_distance:
+            for variant in deletion_variants(token, max_distance):
+                for alias_token in index["deletions"].get(variant, ()):
+                    if alias_token not in found:
+                        found[alias_token] = edit_distance(token, alias_token, min(max_distance, max_distance_for(alias_token)))
+        candidates = tuple((alias_token, distance) for alias_token, distance in found.items() if distance <= min(max_distance, max_distance_for(alias_token)))
+
+    if len(cache) >= MAX_CACHED_TOKENS:
+        cache.clear()
+    cache[token] = candidates
+    return candidates
+
+def scan_text_fuzzy(index, text, longest_only=True, min_confidence=MIN_CONFIDENCE):
+    """
+Description:
+Tokenises the text like scan_text_normalised() and, from every token, extends the sequences of candidate alias tokens as long as they are the beginning of an alias key,
+adding up the edit distances of the tokens. Confidence is 1 - edit distance / length of the alias key (exact hits have a confidence of 1).
+
+Arguments:
+index (dict): output of build_fuzzy_alias_index().
+text (str): the text to scan.
+longest_only (bool, optional): keeps only the longest alias starting at a token (the closest one if several) and skips the tokens it covers. Defaults to True.
+min_confidence (float, optional): hits with a lower confidence are dropped. Defaults to MIN_CONFIDENCE.
+
+Returns:
+hits (list): list of (offset, pattern position, matched text, edit distance, confidence) tuples, in text order
+(scan_corpus() in alias_matcher.py saves the last three as extra columns, see FUZZY_HITS_COLUMNS).
+"""
+    keys, prefixes, level, patterns = index["keys"], index["prefixes"], index["level"], index["patterns"]
+    tokens = [(match.start(), match.end(), token_key(match.group(), level)) for match in TOKEN_PATTERN.finditer(text)]
+    tokens = [(start, end, key) for start, end, key in tokens if key]
+    candidates = [token_candidates(index, key) for _, _, key in tokens]
+
+    hits = []
+    position = 0
+    while position < len(tokens):
+        if not candidates[position]:
+            position += 1
+            continue
+
+        matches = [] # (number of tokens, edit distance, pattern position)
+        states = {(): 0} # beginnings of alias keys -> smallest edit distance
+        end = position
+        while states and end < len(tokens):
+            next_states = {}
+            for prefix, distance in states.items():
+                for alias_token, token_distance in candidates[end]:
+                    key = prefix + (alias_token,)
+                    if key in prefixes and distance + token_distance < next_states.get(key, float('inf')):
+                        next_states[key] = distance + token_distance
+            states = next_states
+            end += 1
+            for key, distance in states.items():
+                pattern_nb = keys.get(key)
+                if pattern_nb is not None and 1 - distance / len(patterns[pattern_nb].replace(' ', '')) >= min_confidence:
+                    matches.append((end - position, distance, pattern_nb))
+
+        if longest_only and matches:
+            matches = [max(matches, key=lambda match: (match[0], -match[1]))]
+        for nb_tokens, distance, pattern_nb in matches:
+            start, stop = tokens[position][0], tokens[position + nb_tokens - 1][1]
+            confidence = round(1 - distance / len(patterns[pattern_nb].replace(' ', '')), 3)
+            hits.append((start, pattern_nb, text[start:stop], distance, confidence))
+        position += matches[0][0] if longest_only and matches else 1
+
+    return hits
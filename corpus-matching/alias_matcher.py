@@ -0,0 +1,279 @@
+#####------------------------------------------------------------------------Finding the authors of the alias lists in a corpus in one pass (Aho-Corasick automaton, multiprocess)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import csv
+import time
+from collections import deque
+from multiprocessing import Pool
+from alias_table import load_alias_tables
+from alias_collisions import resolve_alias_collisions
+from alias_normalisation import build_normalised_alias_index, scan_text_normalised
+from alias_fuzzy import FUZZY_HITS_COLUMNS, build_fuzzy_alias_index, scan_text_fuzzy
+from corpus_readers import iter_corpus_files, read_corpus_texts
+from shared_tables import attach_matcher, publish_matcher
+from alias_disambiguation import AUTHORS_CSV, ITEM_METRICS_CSV, WITH_PRECISION_CSV, DISAMBIGUATION_COLUMN, build_author_features, build_disambiguating_matcher, scan_text_disambiguated
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Alias lists (any of the formats read by alias_table.py)
+
+ALIAS_CSVS = [
+    r'path_to\use-case-1\aliases.csv',
+    r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv',
+]
+
+## 1.2.: Corpus and output
+
+CORPUS_DIR = r'path_to\corpus' # read recursively
+CORPUS_FORMAT = 'text' # 'text' (.txt files) or 'any' (.txt, ALTO and TEI XML files, and zips of them, read page by page, see corpus_readers.py)
+OUTPUT_DIR = r'path_to\corpus-matching\output'
+SHARED_DIR = None # memory against speed: set to e.g. r'path_to\corpus-matching\output\shared_matcher' to publish the matcher there once, memory-mapped by every worker (see shared_tables.py),
+# instead of sending each worker a copy; a worker then takes about 95 MB instead of 320 MB with the use case 3 aliases, but matches about 3 times slower (it decodes the states it reads)
+
+## 1.3.: Other
+
+MATCHER = 'automaton' # 'automaton' (exact, lowercased aliases), 'normalised' (lookup of normalised and transliterated token keys, see alias_normalisation.py) or 'fuzzy' (normalised keys within an edit distance, for OCR errors, see alias_fuzzy.py)
+KEY_LEVEL = 'strict' # 'strict' or 'loose' keys for the 'normalised' and 'fuzzy' matchers
+COLLISION_POLICY = 'exclude' # aliases shared by several authors: 'exclude', 'weight' (hits weighted 1 / number of authors) or 'keep' (see alias_collisions.py)
+COLLISIONS_BY_LANGUAGE = False
+DISAMBIGUATE = False # resolves every ambiguous hit to one author from its context (needs COLLISION_POLICY 'keep' or 'weight', see alias_disambiguation.py)
+MIN_ALIAS_LENGTH = 3 # shorter aliases ('p. v. m.' is kept, 'ps' is not) produce too many false hits
+PROCESSES = os.cpu_count()
+HITS_COLUMNS = ['doc_id', 'offset', 'alias', 'q_identifier', 'weight']
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Compiling the automaton
+
+def build_automaton(patterns):
+    """
+Description:
+Compiles the patterns into an Aho-Corasick automaton: a trie of the patterns (goto), the failure link of every state (longest proper suffix that is also in the trie)
+and the patterns ending in every state (output, merged along the failure links), so that the text is read once whatever the number of patterns.
+
+Arguments:
+patterns (list): the (already lowercased) patterns.
+
+Returns:
+automaton (dict): {'goto': list of dicts (character -> state), 'fail': list of states, 'output': list of lists of pattern positions, 'patterns': patterns}
+"""
+    goto, fail, output = [{}], [0], [[]]
+
+    for pattern_nb, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                fail.append(0)
+                output.append([])
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        output[state].append(pattern_nb)
+
+    # breadth-first traversal to set the failure links (states of depth 1 fail to the root)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            output[next_state] = output[next_state] + output[fail[next_state]]
+
+    return {"goto": goto, "fail": fail, "output": output, "patterns": patterns}
+
+def lower_text(text):
+    # lowercases character by character when the lowercase form of a character is longer (U+0130, capital I with dot above, gives two characters), so that offsets in the lowercased text are those of the text
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else ''.join(char.lower()[0] for char in text)
+
+def build_alias_automaton(df_aliases, min_alias_length=MIN_ALIAS_LENGTH):
+    """
+Description:
+Compiles the aliases of an alias table (see alias_table.py) into an Aho-Corasick automaton. Aliases are lowercased; an alias shared by several authors is compiled once and reports all of them.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)().
+min_alias_length (int, optional): aliases shorter than this are left out. Defaults to MIN_ALIAS_LENGTH.
+
+Returns:
+automaton (dict): see build_automaton(), plus 'alias_qids' (list of QID tuples, one per pattern) and 'alias_weights' (1 / number of authors of every pattern).
+"""
+    qids_by_alias = {}
+    for alias, qid in zip(df_aliases['alias'].map(lower_text), df_aliases['q_identifier']):
+        if len(alias) >= min_alias_length:
+            qids_by_alias.setdefault(alias, []).append(qid)
+
+    patterns = list(qids_by_alias)
+    automaton = build_automaton(patterns)
+    automaton["alias_qids"] = [tuple(dict.fromkeys(qids_by_alias[pattern])) for pattern in patterns]
+    automaton["alias_weights"] = [1 / len(qids) for qids in automaton["alias_qids"]]
+
+    print(f"[i] Compiled {len(patterns)} aliases of {df_aliases['q_identifier'].nunique()} authors into an automaton of {len(automaton['goto'])} states.")
+
+    return automaton
+
+## 2.2.: Scanning a text
+
+def scan_text(automaton, text, longest_only=True):
+    """
+Description:
+Reads the (lowercased, see lower_text()) text once through the automaton and returns the aliases found at word boundaries (the characters before and after the hit are not letters or digits,
+so that 'homer' is not found in 'homeric').
+
+Arguments:
+automaton (dict): output of build_alias_automaton().
+text (str): the text to scan.
+longest_only (bool, optional): drops hits contained in a longer hit ('cicero' inside 'marcus tullius cicero'). Defaults to True.
+
+Returns:
+hits (list): list of (offset, pattern position) tuples, in text order.
+"""
+    goto, fail, output, patterns = automaton["goto"], automaton["fail"], automaton["output"], automaton["patterns"]
+    text = lower_text(text)
+    text_length = len(text)
+
+    hits = []
+    state = 0
+    for position, char in enumerate(text):
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+
+        if output[state]:
+            for pattern_nb in output[state]:
+                start = position - len(patterns[pattern_nb]) + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (position + 1 == text_length or not text[position + 1].isalnum()):
+                    hits.append((start, pattern_nb))
+
+    if longest_only and hits:
+        hits.sort(key=lambda hit: (hit[0], -len(patterns[hit[1]])))
+        kept, covered_until = [], -1
+        for start, pattern_nb in hits:
+            end = start + len(patterns[pattern_nb])
+            if end > covered_until:
+                kept.append((start, pattern_nb))
+                covered_until = end
+        hits = kept
+
+    return hits
+
+## 2.3.: Scanning a corpus with a pool of worker processes
+
+def iter_text_files(corpus_dir):
+    """
+Description:
+Yields the paths of the plain text files of the corpus directory (recursively), in a stable order.
+"""
+    for root, _, files in sorted(os.walk(corpus_dir)):
+        for file_name in sorted(files):
+            if file_name.lower().endswith('.txt'):
+                yield os.path.join(root, file_name)
+
+def read_text_file(path, corpus_dir):
+    """
+Description:
+Reads a plain text file as one document.
+
+Returns:
+documents (list): one (doc_id, text) tuple, doc_id being the path relative to the corpus directory.
+"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        return [(os.path.relpath(path, corpus_dir), file.read())]
+
+# the automaton is sent once to every worker (not once per document), or attached from its published files (see shared_tables.py)
+_worker_automaton = None
+
+def _init_worker(automaton):
+    global _worker_automaton
+    _worker_automaton = attach_matcher(automaton) if "shared_dir" in automaton else automaton
+
+def _scan_file(task):
+    path, corpus_dir, reader, scanner = task
+    started = time.perf_counter()
+    hits, nb_bytes = [], 0
+    for doc_id, text in reader(path, corpus_dir):
+        nb_bytes += len(text.encode('utf-8'))
+        for offset, pattern_nb, *details in scanner(_worker_automaton, text): # details: extra columns of some scanners (e.g. edit distance)
+            for qid in _worker_automaton["alias_qids"][pattern_nb]:
+                hits.append((doc_id, offset, _worker_automaton["patterns"][pattern_nb], qid, _worker_automaton["alias_weights"][pattern_nb], *details))
+    return hits, nb_bytes, time.perf_counter() - started
+
+def scan_corpus(automaton, corpus_dir, hits_csv, processes=PROCESSES, reader=read_text_file, paths=None, scanner=scan_text, hits_columns=HITS_COLUMNS, shared_dir=None):
+    """
+Description:
+Scans every document of the corpus with the automaton, spreading the files over a pool of worker processes, and streams the hits to a CSV
+(doc_id, offset, alias, q_identifier, weight), one row per author when an alias is shared (weight = 1 / number of authors sharing it).
+Throughput is reported in MB/s overall and per core (MB read divided by the time spent scanning in the workers).
+
+Arguments:
+automaton (dict): output of build_alias_automaton() (or of build_normalised_alias_index() with scanner=scan_text_normalised, or of build_fuzzy_alias_index() with scanner=scan_text_fuzzy).
+corpus_dir (str): path to the corpus directory.
+hits_csv (str): path to the output CSV.
+processes (int, optional): number of worker processes. Defaults to PROCESSES (all cores).
+reader (function, optional): function (path, corpus_dir) -> list (or generator) of (doc_id, text), used to read one corpus file. Defaults to read_text_file (read_corpus_texts in corpus_readers.py reads ALTO, TEI and zips).
+paths (list, optional): the files to scan. Defaults to all the .txt files of corpus_dir.
+scanner (function, optional): function (automaton, text) -> list of (offset, pattern position, *extra columns). Defaults to scan_text.
+hits_columns (list, optional): header of the output CSV. Defaults to HITS_COLUMNS (FUZZY_HITS_COLUMNS for scan_text_fuzzy).
+shared_dir (str, optional): directory where the automaton is published once and memory-mapped by the workers (see shared_tables.py). Defaults to None (a copy per worker).
+
+Returns:
+metrics (dict): 'nb_files', 'nb_hits', 'megabytes', 'seconds', 'mb_per_second', 'mb_per_second_per_core'
+"""
+    paths = list(paths) if paths is not None else list(iter_text_files(corpus_dir))
+    print(f"[i] Scanning {len(paths)} corpus files with {processes} worker process(es).")
+
+    if shared_dir:
+        automaton = publish_matcher(automaton, shared_dir)
+    os.makedirs(os.path.dirname(hits_csv) or '.', exist_ok=True)
+    started = time.perf_counter()
+    nb_hits, nb_bytes, worker_seconds = 0, 0, 0.0
+
+    with open(hits_csv, 'w', encoding='utf-8', newline='') as file, Pool(processes, initializer=_init_worker, initargs=(automaton,)) as pool:
+        writer = csv.writer(file)
+        writer.writerow(hits_columns)
+        tasks = ((path, corpus_dir, reader, scanner) for path in paths)
+        for file_nb, (hits, file_bytes, file_seconds) in enumerate(pool.imap_unordered(_scan_file, tasks, chunksize=4), 1):
+            writer.writerows(hits)
+            nb_hits += len(hits)
+            nb_bytes += file_bytes
+            worker_seconds += file_seconds
+            if file_nb % 1000 == 0:
+                print(f"[i] [{file_nb}/{len(paths)}] {nb_hits} hits so far.")
+
+    seconds = time.perf_counter() - started
+    megabytes = nb_bytes / 1e6
+    metrics = {
+        "nb_files": len(paths),
+        "nb_hits": nb_hits,
+        "megabytes": round(megabytes, 3),
+        "seconds": round(seconds, 3),
+        "mb_per_second": round(megabytes / seconds, 3) if seconds else None,
+        "mb_per_second_per_core": round(megabytes / worker_seconds, 3) if worker_seconds else None,
+    }
+
+    print(f"|Y| Found {nb_hits} hits in {metrics['megabytes']} MB ({metrics['mb_per_second']} MB/s overall, {metrics['mb_per_second_per_core']} MB/s per core). Hits saved to {hits_csv}.")
+
+    return metrics
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    df_aliases, _ = resolve_alias_collisions(load_alias_tables(ALIAS_CSVS), COLLISION_POLICY, COLLISIONS_BY_LANGUAGE)
+    reader, paths = (read_corpus_texts, list(iter_corpus_files(CORPUS_DIR))) if CORPUS_FORMAT == 'any' else (read_text_file, None)
+    if MATCHER == 'normalised':
+        automaton, scanner, hits_columns = build_normalised_alias_index(df_aliases, KEY_LEVEL), scan_text_normalised, HITS_COLUMNS
+    elif MATCHER == 'fuzzy':
+        automaton, scanner, hits_columns = build_fuzzy_alias_index(df_aliases, KEY_LEVEL), scan_text_fuzzy, FUZZY_HITS_COLUMNS
+    else:
+        automaton, scanner, hits_columns = build_alias_automaton(df_aliases), scan_text, HITS_COLUMNS
+
+    if DISAMBIGUATE:
+        features = build_author_features(df_aliases['q_identifier'].unique(), AUTHORS_CSV, ITEM_METRICS_CSV, WITH_PRECISION_CSV)
+        automaton, scanner, hits_columns = build_disambiguating_matcher(automaton, scanner, features), scan_text_disambiguated, hits_columns + [DISAMBIGUATION_COLUMN]
+
+    scan_corpus(automaton, CORPUS_DIR, os.path.join(OUTPUT_DIR, 'alias_hits.csv'), reader=reader, paths=paths, scanner=scanner, hits_columns=hits_columns, shared_dir=SHARED_DIR)
@@ -0,0 +1,182 @@
+#####------------------------------------------------------------------------Normalisation and transliteration keys for aliases and corpus tokens (matching by dictionary lookup)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import re
+import unicodedata
+from functools import lru_cache
+
+### Step 1: Defining relevant variables
+
+## 1.1.: Greek to Latin transliteration (conventional, close to the Latinised spellings found in the alias lists)
+
+GREEK_DIGRAPHS = [
+    ('γγ', 'ng'), ('γκ', 'nk'), ('γξ', 'nx'), ('γχ', 'nch'),
+    ('ου', 'ou'), ('αυ', 'au'), ('ευ', 'eu'), ('ηυ', 'eu'),
+]
+GREEK_LETTERS = {
+    'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'e', 'θ': 'th', 'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm',
+    'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p', 'ρ': 'r', 'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y', 'φ': 'ph', 'χ': 'ch', 'ψ': 'ps', 'ω': 'o',
+}
+ROUGH_BREATHING = '\u0314' # combining reversed comma above (after NFD)
+
+## 1.2.: Latin orthographic variants (Early Modern print, 19th-20th c. press)
+
+LIGATURES = {'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'ſ': 's', 'ꝑ': 'p'}
+ORTHOGRAPHIC_VARIANTS = str.maketrans({'j': 'i', 'v': 'u'})
+
+## 1.3.: Further folding for the 'loose' keys (Greek-style and Latin-style spellings of the same name: 'Apikios' / 'Apicius', 'Kyros' / 'Cyrus')
+
+LOOSE_RULES = [
+    (re.compile(r'k'), 'c'),
+    (re.compile(r'y'), 'i'),
+    (re.compile(r'(ae|oe)'), 'e'),
+    (re.compile(r'os$'), 'us'),
+    (re.compile(r'(.)\1'), r'\1'),
+]
+
+TOKEN_PATTERN = re.compile(r'\w+')
+KEY_LEVELS = ('strict', 'loose')
+
+
+### Step 2: Defining the functions
+
+def transliterate_greek(text):
+    """
+Description:
+Transliterates Greek script to Latin script ('Ἀπίκιος' -> 'apikios', 'Ἡρόδοτος' -> 'herodotos'), keeping the rough breathing as an initial 'h'. Other scripts are left as they are.
+
+Arguments:
+text (str): casefolded text.
+
+Returns:
+transliterated_text (str)
+"""
+    if not any('\u0370' <= char <= '\u03ff' or '\u1f00' <= char <= '\u1fff' for char in text): # Greek and Greek Extended blocks
+        return text
+
+    decomposed = unicodedata.normalize('NFD', text)
+    # rough breathing on the first vowel of a word (or on rho): h + letter
+    decomposed = re.sub(r'(\b[αεηιοωυρ]+)' + ROUGH_BREATHING, lambda match: 'h' + match.group(1), decomposed)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    for digraph, latin in GREEK_DIGRAPHS:
+        stripped = stripped.replace(digraph, latin)
+    return ''.join(GREEK_LETTERS.get(char, char) for char in stripped)
+
+@lru_cache(maxsize=1_000_000)
+def token_key(token, level='strict'):
+    """
+Description:
+Turns one token into its matching key: casefold, Greek -> Latin transliteration, ligatures and long s, diacritics removed, u/v and i/j merged
+('Virgilivs' -> 'uirgilius', 'Cicéron' -> 'ciceron', 'Æneas' -> 'aeneas'). 'loose' keys also merge k/c, y/i, ae/oe/e, final -os/-us and double letters.
+Results are cached, since corpus tokens repeat a lot.
+
+Arguments:
+token (str): one word.
+level (str, optional): 'strict' or 'loose'. Defaults to 'strict'.
+
+Returns:
+key (str): may be empty (punctuation only).
+"""
+    key = transliterate_greek(token.casefold())
+    key = ''.join(LIGATURES.get(char, char) for char in key)
+    key = unicodedata.normalize('NFKD', key)
+    key = ''.join(char for char in key if not unicodedata.combining(char) and char.isalnum())
+    key = key.translate(ORTHOGRAPHIC_VARIANTS)
+
+    if level == 'loose':
+        for pattern, replacement in LOOSE_RULES:
+            key = pattern.sub(replacement, key)
+
+    return key
+
+def alias_key(alias, level='strict'):
+    """
+Description:
+Turns an alias into the tuple of the keys of its tokens ('Publius Vergilius Maro' -> ('publius', 'uergilius', 'maro')).
+
+Arguments:
+alias (str): the alias.
+level (str, optional): 'strict' or 'loose'. Defaults to 'strict'.
+
+Returns:
+key (tuple)
+"""
+    return tuple(filter(None, (token_key(token, level) for token in TOKEN_PATTERN.findall(alias))))
+
+def build_normalised_alias_index(df_aliases, level='strict', min_key_length=3):
+    """
+Description:
+Normalises every alias of an alias table (see alias_table.py) once, at build time, into a dictionary from alias key (tuple of token keys) to authors,
+so that matching a corpus is a dictionary lookup on normalised tokens instead of a regular expression per spelling variant.
+
+Arguments:
+df_aliases (DataFrame): output of load_alias_table(s)() (or of resolve_alias_collisions()).
+level (str, optional): 'strict' or 'loose'. Defaults to 'strict'.
+min_key_length (int, optional): keys shorter than this (in characters) are left out. Defaults to 3.
+
+Returns:
+index (dict): {'keys': alias key -> pattern position, 'prefixes': every leading part of the alias keys, 'patterns': alias keys joined with spaces, 'alias_qids', 'alias_weights', 'level'}
+(same 'patterns', 'alias_qids' and 'alias_weights' as the automaton of alias_matcher.py, so both can be used by scan_corpus()).
+"""
+    if level not in KEY_LEVELS:
+        raise ValueError(f"Unknown key level '{level}', expected one of {KEY_LEVELS}.")
+
+    qids_by_key = {}
+    for alias, qid in zip(df_aliases['alias'], df_aliases['q_identifier']):
+        key = alias_key(alias, level)
+        if key and len(' '.join(key)) >= min_key_length:
+            qids_by_key.setdefault(key, []).append(qid)
+
+    keys = list(qids_by_key)
+    index = {
+        "keys": {key: pattern_nb for pattern_nb, key in enumerate(keys)},
+        "patterns": [' '.join(key) for key in keys],
+        "alias_qids": [tuple(dict.fromkeys(qids_by_key[key])) for key in keys],
+        "prefixes": {key[:length] for key in keys for length in range(1, len(key) + 1)},
+        "level": level,
+    }
+    index["alias_weights"] = [1 / len(qids) for qids in index["alias_qids"]]
+
+    print(f"[i] Normalised {len(df_aliases)} aliases into {len(keys)} {level} keys.")
+
+    return index
+
+def scan_text_normalised(index, text, longest_only=True):
+    """
+Description:
+Tokenises the text, turns every token into its key (cached) and, from every token, extends the sequence of keys as long as it is the beginning of an alias key.
+Most tokens are rejected with a single set lookup.
+Offsets refer to the original text, so hits can be shown in context.
+
+Arguments:
+index (dict): output of build_normalised_alias_index().
+text (str): the text to scan.
+longest_only (bool, optional): keeps only the longest alias starting at a token and skips the tokens it covers. Defaults to True.
+
+Returns:
+hits (list): list of (offset, pattern position) tuples, in text order (same as scan_text() in alias_matcher.py).
+"""
+    keys, prefixes, level = index["keys"], index["prefixes"], index["level"]
+    tokens = [(match.start(), token_key(match.group(), level)) for match in TOKEN_PATTERN.finditer(text)]
+    tokens = [(offset, key) for offset, key in tokens if key]
+    token_keys = [key for _, key in tokens]
+
+    hits = []
+    position = 0
+    while position < len(tokens):
+        matches = []
+        end = position + 1
+        while end <= len(tokens) and tuple(token_keys[position:end]) in prefixes:
+            pattern_nb = keys.get(tuple(token_keys[position:end]))
+            if pattern_nb is not None:
+                matches.append((end - position, pattern_nb))
+            end += 1
+
+        if longest_only and matches:
+            hits.append((tokens[position][0], matches[-1][1]))
+            position += matches[-1][0]
+        else:
+            hits.extend((tokens[position][0], pattern_nb) for _, pattern_nb in matches)
+            position += 1
+
+    return hits
@@ -0,0 +1,107 @@
+#####------------------------------------------------------------------------Loading the alias lists of the three use cases into one (alias, QID, language) table-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import ast
+import json
+import pandas as pd
+
+### Step 1: Defining relevant variables
+
+ALIAS_TABLE_COLUMNS = ['alias', 'q_identifier', 'lang_code', 'source']
+UC2_LABEL_COLUMNS = {'english_label': 'en', 'french_label': 'fr', 'latin_label': 'la'}
+UC2_ALIAS_COLUMNS = {'english_aliases': 'en', 'french_aliases': 'fr', 'latin_aliases': 'la'}
+UC3_SEPARATOR = ';'
+UC3_ALIAS_SEPARATOR = '|'
+
+
+### Step 2: Defining the functions
+
+def parse_list_column(value):
+    """
+Description:
+Reads a list stored in a CSV cell, saved either with json.dumps() (use case 2) or as a Python list (use case 1 aliases.csv),
+as parse_list_column() of use-case-2/python_scripts/name_candidate_index.py does (the folders do not share modules).
+
+Arguments:
+value: the cell value.
+
+Returns:
+values (list): empty list if the cell is empty or unreadable.
+"""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    for parser in (json.loads, ast.literal_eval):
+        try:
+            parsed = parser(value)
+            return parsed if isinstance(parsed, list) else [parsed]
+        except (ValueError, SyntaxError):
+            continue
+    return []
+
+def load_alias_table(alias_csv):
+    """
+Description:
+Loads an alias list into a long table with one row per (alias, QID) pair. The format is recognised from the columns:
+- use case 1 'aliases.csv' ('wikidata_id' and 'aliases' as a Python list; no language),
+- use case 2 authors CSVs (outputs of steps 02 to 06: 'q_identifier', English/French/Latin labels and JSON alias lists),
+- use case 3 'ancient_authors_wikidata_labels_aliases.csv' (';'-separated: 'wikidata_id', 'lang_code', 'label', '|'-joined 'aliases').
+
+Arguments:
+alias_csv (str): path to the CSV.
+
+Returns:
+df_aliases (DataFrame): columns 'alias', 'q_identifier', 'lang_code' (None when unknown) and 'source' (file name), without empty aliases.
+"""
+    with open(alias_csv, 'r', encoding='utf-8') as file:
+        header = file.readline()
+
+    rows = []
+    source = alias_csv.replace('\\', '/').split('/')[-1]
+
+    if 'lang_code' in header and UC3_SEPARATOR in header:
+        df_source = pd.read_csv(alias_csv, sep=UC3_SEPARATOR, dtype=str, keep_default_na=False)
+        for qid, lang_code, label, aliases in zip(df_source['wikidata_id'], df_source['lang_code'], df_source['label'], df_source['aliases']):
+            for alias in [label] + aliases.split(UC3_ALIAS_SEPARATOR):
+                rows.append((alias, qid, lang_code or None))
+
+    elif 'q_identifier' in header:
+        df_source = pd.read_csv(alias_csv, dtype=str, keep_default_na=False)
+        for row in df_source.to_dict('records'):
+            for column, lang_code in UC2_LABEL_COLUMNS.items():
+                rows.append((row.get(column, ''), row['q_identifier'], lang_code))
+            for column, lang_code in UC2_ALIAS_COLUMNS.items():
+                rows.extend((alias, row['q_identifier'], lang_code) for alias in parse_list_column(row.get(column)))
+
+    elif 'aliases' in header and 'wikidata_id' in header:
+        df_source = pd.read_csv(alias_csv, dtype=str, keep_default_na=False)
+        for qid, aliases in zip(df_source['wikidata_id'], df_source['aliases']):
+            if not qid or qid == 'nan':
+                continue
+            rows.extend((alias, qid, None) for alias in parse_list_column(aliases)) # the aliases already include the Wikidata labels (the 'author' column holds Trismegistos names such as 'Anonymi of the Orphica')
+
+    else:
+        raise ValueError(f"Unrecognised alias list format: {alias_csv}")
+
+    df_aliases = pd.DataFrame(rows, columns=ALIAS_TABLE_COLUMNS[:3])
+    df_aliases['alias'] = df_aliases['alias'].astype(str).str.strip()
+    df_aliases = df_aliases[(df_aliases['alias'] != '') & (df_aliases['q_identifier'] != '')].drop_duplicates()
+    df_aliases['source'] = source
+
+    print(f"[i] Loaded {len(df_aliases)} (alias, QID) pairs for {df_aliases['q_identifier'].nunique()} authors from {source}.")
+
+    return df_aliases.reset_index(drop=True)
+
+def load_alias_tables(alias_csvs):
+    """
+Description:
+Loads and concatenates several alias lists (see load_alias_table()).
+
+Arguments:
+alias_csvs (list): paths to the CSVs.
+
+Returns:
+df_aliases (DataFrame)
+"""
+    return pd.concat([load_alias_table(alias_csv) for alias_csv in alias_csvs], ignore_index=True)
@@ -0,0 +1,275 @@
+#####------------------------------------------------------------------------Positional inverted index of the normalised corpus tokens (built once, sharded by file range, queried with new alias lists)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import csv
+import json
+import time
+import shutil
+import numpy as np
+from multiprocessing import Pool
+from alias_table import load_alias_tables
+from alias_collisions import resolve_alias_collisions
+from alias_matcher import HITS_COLUMNS, iter_text_files, read_text_file
+from alias_normalisation import KEY_LEVELS, TOKEN_PATTERN, build_normalised_alias_index, token_key
+from corpus_readers import iter_corpus_files, read_corpus_texts
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Corpus and index
+
+CORPUS_DIR = r'path_to\corpus' # read recursively
+CORPUS_FORMAT = 'text' # 'text' (.txt files) or 'any' (.txt, ALTO and TEI XML files, and zips of them, see corpus_readers.py)
+INDEX_DIR = r'path_to\corpus-matching\output\corpus_index'
+
+## 1.2.: Alias lists queried against the index (any of the formats read by alias_table.py)
+
+ALIAS_CSVS = [
+    r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv',
+]
+OUTPUT_DIR = r'path_to\corpus-matching\output'
+
+## 1.3.: Other
+
+KEY_LEVEL = 'strict' # the index can only be queried with keys of the same level
+FILES_PER_SHARD = 500
+PROCESSES = os.cpu_count()
+COLLISION_POLICY = 'exclude'
+BUILD_INDEX = True # False to only query an existing index
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Building the index
+
+def index_shard(task):
+    """
+Description:
+Indexes the documents of one range of corpus files into a shard directory:
+- 'terms.json': the sorted token keys of the shard,
+- 'term_offsets.npy': for every term, the range of its postings,
+- 'posting_docs.npy' / 'posting_positions.npy': document number (in the shard) and token position of every occurrence, grouped by term,
+- 'token_offsets.npy' / 'doc_token_starts.npy': character offset of every token, so that hits point to the original text,
+- 'docs.json': doc_id of every document of the shard.
+The shard is written to a temporary directory and then renamed, so that an interrupted build is resumed by running it again.
+
+Arguments:
+task (tuple): (shard number, paths, corpus_dir, reader, level, index_dir)
+
+Returns:
+tuple: (shard number, number of documents, number of tokens, seconds spent)
+"""
+    shard_nb, paths, corpus_dir, reader, level, index_dir = task
+    started = time.perf_counter()
+
+    doc_ids, token_offsets, doc_token_starts = [], [], [0]
+    postings = {} # term -> list of (doc number, token position)
+    for path in paths:
+        for doc_id, text in reader(path, corpus_dir):
+            doc_nb = len(doc_ids)
+            doc_ids.append(doc_id)
+            position = 0
+            for match in TOKEN_PATTERN.finditer(text):
+                key = token_key(match.group(), level)
+                if key:
+                    postings.setdefault(key, []).append((doc_nb, position))
+                    token_offsets.append(match.start())
+                    position += 1
+            doc_token_starts.append(len(token_offsets))
+
+    terms = sorted(postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    term_offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    flat = np.array([posting for term in terms for posting in postings[term]], dtype=np.uint32).reshape(-1, 2)
+
+    shard_dir = shard_dir_path(index_dir, shard_nb)
+    temporary_dir = shard_dir + '.tmp'
+    shutil.rmtree(temporary_dir, ignore_errors=True)
+    os.makedirs(temporary_dir)
+    np.save(os.path.join(temporary_dir, 'term_offsets.npy'), term_offsets)
+    np.save(os.path.join(temporary_dir, 'posting_docs.npy'), np.ascontiguousarray(flat[:, 0]))
+    np.save(os.path.join(temporary_dir, 'posting_positions.npy'), np.ascontiguousarray(flat[:, 1]))
+    np.save(os.path.join(temporary_dir, 'token_offsets.npy'), np.array(token_offsets, dtype=np.uint32))
+    np.save(os.path.join(temporary_dir, 'doc_token_starts.npy'), np.array(doc_token_starts, dtype=np.uint64))
+    with open(os.path.join(temporary_dir, 'terms.json'), 'w', encoding='utf-8') as file:
+        json.dump(terms, file, ensure_ascii=False)
+    with open(os.path.join(temporary_dir, 'docs.json'), 'w', encoding='utf-8') as file:
+        json.dump(doc_ids, file, ensure_ascii=False)
+    os.replace(temporary_dir, shard_dir)
+
+    return shard_nb, len(doc_ids), len(token_offsets), time.perf_counter() - started
+
+def shard_dir_path(index_dir, shard_nb):
+    return os.path.join(index_dir, f'shard_{shard_nb:05d}')
+
+def build_corpus_index(corpus_dir, index_dir, level=KEY_LEVEL, files_per_shard=FILES_PER_SHARD, processes=PROCESSES, reader=read_text_file, paths=None):
+    """
+Description:
+Builds, once, a positional inverted index of the normalised tokens of the corpus (see token_key() in alias_normalisation.py), sharded by ranges of files_per_shard corpus files.
+Shards are built in parallel by a pool of worker processes; shards already built are kept, so that an interrupted build can be resumed.
+New alias lists can then be matched with query_corpus_index() without reading the corpus again.
+
+Arguments:
+corpus_dir (str): path to the corpus directory.
+index_dir (str): directory of the index.
+level (str, optional): 'strict' or 'loose' token keys. Defaults to KEY_LEVEL.
+files_per_shard (int, optional): Defaults to FILES_PER_SHARD.
+processes (int, optional): Defaults to PROCESSES (all cores).
+reader (function, optional): see scan_corpus() in alias_matcher.py. Defaults to read_text_file.
+paths (list, optional): the files to index. Defaults to all the .txt files of corpus_dir.
+
+Returns:
+manifest (dict): content of 'index.json' (level, corpus_dir, nb_files, files_per_shard, nb_shards, and the path, size and modification time of every file,
+so that an index is not reused for a corpus whose files were changed)
+"""
+    if level not in KEY_LEVELS:
+        raise ValueError(f"Unknown key level '{level}', expected one of {KEY_LEVELS}.")
+
+    paths = list(paths) if paths is not None else list(iter_text_files(corpus_dir))
+    nb_shards = (len(paths) + files_per_shard - 1) // files_per_shard
+    manifest = {"level": level, "corpus_dir": corpus_dir, "nb_files": len(paths), "files_per_shard": files_per_shard, "nb_shards": nb_shards,
+                "files": [[os.path.relpath(path, corpus_dir), stat.st_size, stat.st_mtime_ns] for path, stat in zip(paths, map(os.stat, paths))]}
+
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_json = os.path.join(index_dir, 'index.json')
+    if os.path.exists(manifest_json):
+        with open(manifest_json, 'r', encoding='utf-8') as file:
+            previous = json.load(file)
+        if {key: previous.get(key) for key in manifest} != manifest:
+            changed = [key for key in manifest if previous.get(key) != manifest[key]]
+            raise ValueError(f"{index_dir} holds an index built with other settings or files (different {', '.join(changed)}): remove it or use another directory.")
+    with open(manifest_json, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+
+    to_do = [shard_nb for shard_nb in range(nb_shards) if not os.path.isdir(shard_dir_path(index_dir, shard_nb))]
+    print(f"[i] Indexing {len(paths)} corpus files: {len(to_do)} shard(s) to build, {nb_shards - len(to_do)} already built, with {processes} worker process(es).")
+
+    tasks = ((shard_nb, paths[shard_nb * files_per_shard:(shard_nb + 1) * files_per_shard], corpus_dir, reader, level, index_dir) for shard_nb in to_do)
+    nb_docs, nb_tokens = 0, 0
+    with Pool(processes) as pool:
+        for done_nb, (shard_nb, shard_docs, shard_tokens, _) in enumerate(pool.imap_unordered(index_shard, tasks), 1):
+            nb_docs += shard_docs
+            nb_tokens += shard_tokens
+            print(f"[i] [{done_nb}/{len(to_do)}] shard {shard_nb} built ({shard_docs} documents, {shard_tokens} tokens).")
+
+    print(f"|Y| Index of {nb_shards} shard(s) saved to {index_dir} ({nb_docs} documents and {nb_tokens} tokens indexed in this run).")
+
+    return manifest
+
+## 2.2.: Querying the index
+
+def load_index_shard(index_dir, shard_nb):
+    """
+Description:
+Opens one shard of the index (arrays memory-mapped, terms loaded as a dictionary term -> position).
+"""
+    shard_dir = shard_dir_path(index_dir, shard_nb)
+    shard = {name: np.load(os.path.join(shard_dir, f'{name}.npy'), mmap_mode='r') for name in ('term_offsets', 'posting_docs', 'posting_positions', 'token_offsets', 'doc_token_starts')}
+    with open(os.path.join(shard_dir, 'terms.json'), 'r', encoding='utf-8') as file:
+        shard['terms'] = {term: term_nb for term_nb, term in enumerate(json.load(file))}
+    with open(os.path.join(shard_dir, 'docs.json'), 'r', encoding='utf-8') as file:
+        shard['doc_ids'] = json.load(file)
+    return shard
+
+def term_postings(shard, term):
+    """
+Description:
+Returns the postings of a term in a shard, as one array of (document number << 32 | token position) values, sorted.
+"""
+    term_nb = shard['terms'].get(term)
+    if term_nb is None:
+        return np.empty(0, dtype=np.uint64)
+    start, end = int(shard['term_offsets'][term_nb]), int(shard['term_offsets'][term_nb + 1])
+    return (np.array(shard['posting_docs'][start:end], dtype=np.uint64) << np.uint64(32)) | np.array(shard['posting_positions'][start:end], dtype=np.uint64)
+
+def phrase_postings(shard, key, cache):
+    """
+Description:
+Returns the positions where the tokens of an alias key follow each other, by intersecting the postings of its tokens (shifted by their place in the key), rarest token first.
+
+Arguments:
+shard (dict): output of load_index_shard().
+key (tuple): alias key (see alias_key() in alias_normalisation.py).
+cache (dict): term -> postings, shared by the keys queried on the shard.
+
+Returns:
+starts (array): (document number << 32 | position of the first token) of every occurrence.
+"""
+    if not all(term in shard['terms'] for term in key): # most alias keys have a token that is not in the shard
+        return np.empty(0, dtype=np.uint64)
+    for term in key:
+        if term not in cache:
+            cache[term] = term_postings(shard, term)
+    if len(key) == 1:
+        return cache[key[0]]
+
+    order = sorted(range(len(key)), key=lambda place: len(cache[key[place]]))
+    starts = None
+    for place in order:
+        shifted = cache[key[place]] - np.uint64(place) # postings at a position < place cannot be a phrase start (the token before the document start)
+        shifted = shifted[(cache[key[place]] & np.uint64(0xFFFFFFFF)) >= place]
+        starts = shifted if starts is None else np.intersect1d(starts, shifted, assume_unique=True)
+        if not len(starts):
+            break
+    return starts
+
+def query_corpus_index(alias_index, index_dir, hits_csv, longest_only=True):
+    """
+Description:
+Finds the aliases of a normalised alias index (see build_normalised_alias_index()) in the corpus index, shard by shard, by posting-list intersection,
+and saves the hits in the same format as scan_corpus() in alias_matcher.py. As with scan_text_normalised(), a hit inside a longer hit is dropped (longest_only).
+
+Arguments:
+alias_index (dict): output of build_normalised_alias_index(), with the level of the corpus index.
+index_dir (str): directory of the index.
+hits_csv (str): path to the output CSV.
+longest_only (bool, optional): Defaults to True.
+
+Returns:
+metrics (dict): 'nb_shards', 'nb_hits', 'seconds'
+"""
+    with open(os.path.join(index_dir, 'index.json'), 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest['level'] != alias_index['level']:
+        raise ValueError(f"The corpus index holds {manifest['level']} keys, the alias index {alias_index['level']} keys.")
+
+    started = time.perf_counter()
+    nb_hits = 0
+    os.makedirs(os.path.dirname(hits_csv) or '.', exist_ok=True)
+    with open(hits_csv, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(HITS_COLUMNS)
+
+        for shard_nb in range(manifest['nb_shards']):
+            shard, cache = load_index_shard(index_dir, shard_nb), {}
+            found = [] # (document number, position, number of tokens, pattern position)
+            for key, pattern_nb in alias_index['keys'].items():
+                for start in phrase_postings(shard, key, cache).tolist():
+                    found.append((start >> 32, start & 0xFFFFFFFF, len(key), pattern_nb))
+
+            found.sort(key=lambda hit: (hit[0], hit[1], -hit[2]))
+            rows, covered = [], (-1, -1) # (document number, end position) of the last kept hit
+            for doc_nb, position, nb_tokens, pattern_nb in found:
+                if longest_only and doc_nb == covered[0] and position < covered[1]:
+                    continue
+                covered = (doc_nb, position + nb_tokens)
+                offset = int(shard['token_offsets'][int(shard['doc_token_starts'][doc_nb]) + position])
+                for qid in alias_index['alias_qids'][pattern_nb]:
+                    rows.append((shard['doc_ids'][doc_nb], offset, alias_index['patterns'][pattern_nb], qid, alias_index['alias_weights'][pattern_nb]))
+            writer.writerows(rows)
+            nb_hits += len(rows)
+
+    metrics = {"nb_shards": manifest['nb_shards'], "nb_hits": nb_hits, "seconds": round(time.perf_counter() - started, 3)}
+    print(f"|Y| Found {nb_hits} hits of {len(alias_index['keys'])} alias keys in {metrics['seconds']} s. Hits saved to {hits_csv}.")
+
+    return metrics
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    if BUILD_INDEX:
+        reader, paths = (read_corpus_texts, list(iter_corpus_files(CORPUS_DIR))) if CORPUS_FORMAT == 'any' else (read_text_file, None)
+        build_corpus_index(CORPUS_DIR, INDEX_DIR, reader=reader, paths=paths)
+
+    df_aliases, _ = resolve_alias_collisions(load_alias_tables(ALIAS_CSVS), COLLISION_POLICY)
+    query_corpus_index(build_normalised_alias_index(df_aliases, KEY_LEVEL), INDEX_DIR, os.path.join(OUTPUT_DIR, 'alias_hits_from_index.csv'))
@@ -0,0 +1,358 @@
+#####------------------------------------------------------------------------Streaming readers for the corpora (plain text, ALTO OCR XML, TEI, and zipped batches of them)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import re
+import io
+import queue
+import zipfile
+import threading
+import xml.sax
+import xml.sax.expatreader
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+### Step 1: Defining relevant variables
+
+CORPUS_EXTENSIONS = ('.txt', '.xml', '.zip')
+DATE_PATTERN = re.compile(r'(?<!\d)(1[4-9]\d\d|20\d\d)(?:[-_]?(0[1-9]|1[0-2])(?:[-_]?(0[1-9]|[12]\d|3[01]))?)?(?!\d)') # '1905', '1905-04', '19050412'...
+CHUNK_SIZE = 1 << 16 # bytes fed to the XML parsers at a time
+QUEUE_SIZE = 64 # records waiting to be matched (bounds the memory used by the readers)
+DECOMPRESSION_THREADS = 4
+
+TEI_SKIPPED_ELEMENTS = {'teiHeader', 'fw', 'facsimile'} # header, running heads and catchwords, image links
+TEI_BLOCK_ELEMENTS = {'p', 'l', 'lg', 'head', 'div', 'item', 'list', 'note', 'sp', 'speaker', 'closer', 'opener', 'byline', 'titlePart', 'docTitle', 'row', 'cell'}
+TEI_BREAK_HYPHENS = ('-', '\u00ad', '\u00ac', '\u2e17') # hyphen, soft hyphen, not sign and double oblique hyphen ending the first part of a word split at a line break
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Records
+# Every reader yields records (doc_id, date, page, text, offset_map):
+# - doc_id: path of the file relative to the corpus directory (plus '!member' inside a zip),
+# - date: ISO date (possibly partial, '1905' or '1905-04') or None,
+# - page: page number or label (None for plain text),
+# - text: the text of the page,
+# - offset_map: list of (text offset, position in the source) tuples, increasing; the source position of a hit is the last one at or before its offset
+#   (ALTO String ID, TEI line number, 0 for plain text).
+
+def date_from_path(doc_id):
+    """
+Description:
+Reads a date from a file path ('le_temps/1905-04-12/page_3.xml' -> '1905-04-12', 'estc/R1234_1651.xml' -> '1651').
+
+Returns:
+date (str): ISO date, possibly partial, or None.
+"""
+    match = DATE_PATTERN.search(doc_id.replace('\\', '/'))
+    if not match:
+        return None
+    return '-'.join(part for part in match.groups() if part)
+
+def source_position(offset_map, offset):
+    """
+Description:
+Returns the position in the source (ALTO String ID, TEI line number...) of a text offset, from the offset map of a record.
+"""
+    position = None
+    for map_offset, source in offset_map:
+        if map_offset > offset:
+            break
+        position = source
+    return position
+
+def read_plain_text(file, doc_id):
+    """
+Description:
+Reads a plain text file (binary file object, UTF-8) as one record.
+"""
+    text = io.TextIOWrapper(file, encoding='utf-8', errors='replace').read()
+    yield doc_id, date_from_path(doc_id), None, text, [(0, 0)]
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def read_alto(file, doc_id):
+    """
+Description:
+Reads an ALTO OCR file (any ALTO version) incrementally, one record per <Page>, without building the tree of the whole issue: the elements are cleared once read.
+Words split by a hyphen at the end of a line (SUBS_TYPE HypPart1 / HypPart2) are joined back ('Cicé-' + 'ron' -> 'Cicéron'), so that they can be matched.
+
+Arguments:
+file: binary file object.
+doc_id (str): identifier of the file.
+
+Yields:
+records (tuple): (doc_id, date, page, text, offset_map), the offset map giving the String ID (or 'HPOS,VPOS') of every word.
+"""
+    date = date_from_path(doc_id)
+    parts, offset_map, length, page = [], [], 0, None
+    root = None
+
+    for event, element in ET.iterparse(file, events=('start', 'end')):
+        name = _local_name(element.tag)
+        if event == 'start':
+            if root is None:
+                root = element
+            if name == 'Page':
+                page = element.get('PHYSICAL_IMG_NR') or element.get('PRINTED_IMG_NR') or element.get('ID')
+                parts, offset_map, length = [], [], 0
+            continue
+
+        if name == 'String':
+            if element.get('SUBS_TYPE') == 'HypPart2':
+                element.clear()
+                continue
+            content = element.get('SUBS_CONTENT') if element.get('SUBS_TYPE') == 'HypPart1' else element.get('CONTENT')
+            if content:
+                offset_map.append((length, element.get('ID') or f"{element.get('HPOS')},{element.get('VPOS')}"))
+                parts.append(content)
+                length += len(content)
+        elif name == 'SP':
+            parts.append(' ')
+            length += 1
+        elif name in ('TextLine', 'TextBlock'):
+            parts.append('\n')
+            length += 1
+        elif name == 'Page':
+            yield doc_id, date, page, ''.join(parts), offset_map
+            root.clear()
+
+        if name in ('String', 'SP', 'HYP', 'TextLine'):
+            element.clear()
+
+class _TeiHandler(xml.sax.ContentHandler):
+    # collects the text of a TEI file in document order and closes a record at every <pb/> (page beginning)
+
+    def __init__(self, doc_id):
+        super().__init__()
+        self.doc_id, self.date, self.page = doc_id, None, None
+        self.records = []
+        self.parts, self.offset_map, self.length = [], [], 0
+        self.skipped_depth, self.in_header_date = 0, False
+        self.joining_word = False
+
+    def _append(self, text):
+        self.offset_map.append((self.length, self._locator.getLineNumber() if self._locator else 0))
+        self.parts.append(text)
+        self.length += len(text)
+
+    def _join_at_break(self):
+        # drops the whitespace and the hyphen already collected before a <lb break="no"/> (the whitespace after it is dropped by characters())
+        while self.parts and not self.parts[-1].rstrip():
+            self.length -= len(self.parts.pop())
+            self.offset_map.pop()
+        if self.parts:
+            text = self.parts[-1].rstrip()
+            text = text[:-1] if text.endswith(TEI_BREAK_HYPHENS) else text
+            self.length -= len(self.parts[-1]) - len(text)
+            self.parts[-1] = text
+        self.joining_word = True
+
+    def _close_page(self):
+        text = ''.join(self.parts)
+        if text.strip():
+            self.records.append((self.doc_id, self.date or date_from_path(self.doc_id), self.page, text, self.offset_map))
+        self.parts, self.offset_map, self.length = [], [], 0
+
+    def startElement(self, tag, attributes):
+        name = tag.rsplit(':', 1)[-1]
+        if self.skipped_depth or name in TEI_SKIPPED_ELEMENTS:
+            self.skipped_depth += 1
+            # the first dated element of the header gives the date of the document
+            if name == 'date' and self.date is None:
+                self.date = attributes.get('when') or attributes.get('notBefore')
+                self.in_header_date = self.date is None
+            return
+        if name == 'pb':
+            self._close_page()
+            self.page = attributes.get('n') or attributes.get('facs')
+        elif name == 'lb':
+            if attributes.get('break') != 'no':
+                self._append('\n')
+            else:
+                self._join_at_break()
+        elif name in TEI_BLOCK_ELEMENTS:
+            self._append('\n')
+
+    def endElement(self, tag):
+        if self.skipped_depth:
+            self.skipped_depth -= 1
+            self.in_header_date = False
+        elif tag.rsplit(':', 1)[-1] in TEI_BLOCK_ELEMENTS:
+            self._append('\n')
+
+    def characters(self, content):
+        if self.in_header_date:
+            year = DATE_PATTERN.search(content)
+            self.date = '-'.join(part for part in year.groups() if part) if year else None
+            self.in_header_date = False
+        elif not self.skipped_depth:
+            if self.joining_word:
+                content = content.lstrip()
+                if not content:
+                    return
+                self.joining_word = False
+            self._append(content)
+
+    def endDocument(self):
+        self._close_page()
+
+def read_tei(file, doc_id):
+    """
+Description:
+Reads a TEI file incrementally (SAX parser fed by chunks), one record per page (<pb/>), or a single record if there is none. The header, running heads and catchwords are skipped;
+words split at a line break (<lb break="no"/>) are joined, without the hyphen and the whitespace around the break. The date is the first date of the header (@when, or a year in its text), otherwise read from the path.
+
+Arguments:
+file: binary file object.
+doc_id (str): identifier of the file.
+
+Yields:
+records (tuple): (doc_id, date, page, text, offset_map), the offset map giving the line number of the source for every text segment.
+"""
+    handler = _TeiHandler(doc_id)
+    parser = xml.sax.make_parser()
+    parser.setContentHandler(handler)
+    parser.setFeature(xml.sax.handler.feature_namespaces, False)
+    handler.setDocumentLocator(xml.sax.expatreader.ExpatLocator(parser)) # only set by parse(), not by feed()
+
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from handler.records
+        handler.records = []
+    parser.close()
+    yield from handler.records
+
+def xml_reader_for(head):
+    """
+Description:
+Chooses the reader of an XML file from its first bytes (ALTO or TEI namespace or root element).
+"""
+    head = head.decode('utf-8', errors='ignore')
+    if 'alto' in head.lower():
+        return read_alto
+    if 'tei-c.org' in head or '<TEI' in head:
+        return read_tei
+    raise ValueError("XML file that is neither ALTO nor TEI.")
+
+def read_corpus_stream(file, doc_id):
+    """
+Description:
+Reads one corpus file (binary file object) with the reader matching its extension and, for XML, its content.
+
+Yields:
+records (tuple): (doc_id, date, page, text, offset_map)
+"""
+    if doc_id.lower().endswith('.xml'):
+        head = file.read(2048)
+        file.seek(0) # zip members can be rewound too (the first bytes are decompressed again)
+        yield from xml_reader_for(head)(file, doc_id)
+    else:
+        yield from read_plain_text(file, doc_id)
+
+## 2.2.: Corpus files and zipped batches
+
+def iter_corpus_files(corpus_dir, extensions=CORPUS_EXTENSIONS):
+    """
+Description:
+Yields the paths of the corpus files (plain text, XML and zip files), recursively and in a stable order.
+"""
+    for root, _, files in sorted(os.walk(corpus_dir)):
+        for file_name in sorted(files):
+            if file_name.lower().endswith(extensions):
+                yield os.path.join(root, file_name)
+
+def read_corpus_file(path, corpus_dir):
+    """
+Description:
+Reads one corpus file, or every .txt and .xml member of a zip file, as a stream of records (one member is decompressed and parsed at a time).
+
+Arguments:
+path (str): path to the file.
+corpus_dir (str): path to the corpus directory (doc_ids are relative to it).
+
+Yields:
+records (tuple): (doc_id, date, page, text, offset_map)
+"""
+    doc_id = os.path.relpath(path, corpus_dir)
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.lower().endswith(('.txt', '.xml')):
+                    with archive.open(member) as file:
+                        yield from read_corpus_stream(file, f'{doc_id}!{member.filename}')
+    else:
+        with open(path, 'rb') as file:
+            yield from read_corpus_stream(file, doc_id)
+
+def read_corpus_texts(path, corpus_dir):
+    """
+Description:
+Reader for scan_corpus() in alias_matcher.py and run_mention_count_shards() in mention_counts.py: yields one (doc_id, text) pair per page, the page being added to the doc_id ('...xml#p3').
+"""
+    for doc_id, _, page, text, _ in read_corpus_file(path, corpus_dir):
+        yield (f'{doc_id}#p{page}' if page is not None else doc_id), text
+
+## 2.3.: Feeding a consumer through a bounded queue
+
+_END = object()
+
+def stream_corpus_records(paths, corpus_dir, threads=DECOMPRESSION_THREADS, queue_size=QUEUE_SIZE):
+    """
+Description:
+Reads (and decompresses) several corpus files at a time with a pool of threads and yields their records through a bounded queue:
+the readers stop when queue_size records are waiting, so that memory stays bounded whatever the size of the corpus. Records of one file keep their order.
+
+Arguments:
+paths (iterable): the corpus files (e.g. iter_corpus_files(corpus_dir)).
+corpus_dir (str): path to the corpus directory.
+threads (int, optional): number of files read at a time. Defaults to DECOMPRESSION_THREADS.
+queue_size (int, optional): maximum number of records waiting. Defaults to QUEUE_SIZE.
+
+Yields:
+records (tuple): (doc_id, date, page, text, offset_map)
+"""
+    records = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def read(path):
+        try:
+            for record in read_corpus_file(path, corpus_dir):
+                while not stop.is_set():
+                    try:
+                        records.put(record, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as error: # any error of one file (a corrupt zip member, a bad encoding...) skips that file only
+            print(f"|!| Could not read {path}: {error}")
+
+    def produce():
+        try:
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(read, paths))
+        finally:
+            # the end marker is always queued (unless the consumer has stopped), so that the consumer never waits for records that will not come
+            while not stop.is_set():
+                try:
+                    records.put(_END, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            record = records.get()
+            if record is _END:
+                break
+            yield record
+    finally:
+        stop.set()
@@ -0,0 +1,314 @@
+#####------------------------------------------------------------------------Counting the mentions of every author per year, publication and corpus (sharded map-reduce, restartable per shard)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import re
+import glob
+import json
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool
+from scipy import sparse
+from alias_table import load_alias_tables
+from alias_collisions import resolve_alias_collisions
+from alias_matcher import build_alias_automaton, iter_text_files, read_text_file, scan_text
+from alias_normalisation import build_normalised_alias_index, scan_text_normalised
+from alias_fuzzy import build_fuzzy_alias_index, scan_text_fuzzy
+from corpus_readers import iter_corpus_files, read_corpus_texts
+from alias_disambiguation import AUTHORS_CSV, ITEM_METRICS_CSV, WITH_PRECISION_CSV, build_author_features, build_disambiguating_matcher, scan_text_disambiguated
+from shared_tables import attach_matcher, publish_matcher
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Alias lists (any of the formats read by alias_table.py)
+
+ALIAS_CSVS = [
+    r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv',
+]
+
+## 1.2.: Corpus, shards and output
+
+CORPUS_DIR = r'path_to\corpus' # read recursively
+CORPUS_FORMAT = 'text' # 'text' (.txt files) or 'any' (.txt, ALTO and TEI XML files, and zips of them, read page by page, see corpus_readers.py)
+CORPUS_NAME = 'corpus'
+DOCUMENT_METADATA_CSV = None # optional CSV with 'doc_id', 'year', 'publication' columns; otherwise both are read from the file path (see document_metadata_from_path())
+SHARDS_DIR = r'path_to\corpus-matching\output\mention_shards' # can be a shared directory, so that several machines work on the same job
+SHARED_DIR = None # memory against speed: set to e.g. r'path_to\corpus-matching\output\shared_matcher' to publish the matcher there once, memory-mapped by every worker (see shared_tables.py),
+# instead of sending each worker a copy; a worker then takes about 95 MB instead of 320 MB with the use case 3 aliases, but matches about 3 times slower (it decodes the states it reads)
+OUTPUT_DIR = r'path_to\corpus-matching\output'
+
+## 1.3.: Other
+
+NB_SHARDS = 256 # fixed for a job: a file always falls in the same shard
+SHARD_NBS = None # shards handled by this run (e.g. range(0, 128) on one machine, range(128, 256) on another); None for all
+PROCESSES = os.cpu_count()
+MATCHER = 'automaton' # 'automaton', 'normalised' or 'fuzzy' (see alias_matcher.py)
+KEY_LEVEL = 'strict'
+COLLISION_POLICY = 'weight'
+DISAMBIGUATE = False # counts every ambiguous mention for the author resolved from its context (see alias_disambiguation.py)
+COUNT_COLUMNS = ['q_identifier', 'year', 'publication', 'corpus', 'nb_mentions', 'weighted_mentions', 'nb_documents']
+YEAR_PATTERN = re.compile(r'(?<!\d)(1[4-9]\d\d|20\d\d)(?!\d)') # first year-like number of a path (1400-2099)
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Partitioning the corpus
+
+def shard_of(doc_path, nb_shards):
+    """
+Description:
+Returns the shard of a corpus file, from a checksum of its relative path, so that the partition does not depend on the machine, the order of the files or the Python hash seed.
+"""
+    return zlib.crc32(doc_path.replace('\\', '/').encode('utf-8')) % nb_shards
+
+def partition_corpus(corpus_dir, nb_shards, paths=None):
+    """
+Description:
+Partitions the files of the corpus into nb_shards shards.
+
+Arguments:
+corpus_dir (str): path to the corpus directory.
+nb_shards (int): number of shards.
+paths (list, optional): the files to partition. Defaults to all the .txt files of corpus_dir.
+
+Returns:
+shards (dict): shard number -> list of paths (only non-empty shards)
+"""
+    shards = {}
+    for path in (paths if paths is not None else iter_text_files(corpus_dir)):
+        shards.setdefault(shard_of(os.path.relpath(path, corpus_dir), nb_shards), []).append(path)
+    return shards
+
+def document_metadata_from_path(doc_id):
+    """
+Description:
+Reads the year and publication of a document from its path relative to the corpus directory: the publication is the first folder ('le_temps/1905/04/12.txt' -> 'le_temps')
+and the year the first year-like number of the path (None when there is none).
+"""
+    parts = doc_id.replace('\\', '/').split('/')
+    year = YEAR_PATTERN.search(doc_id)
+    return (int(year.group()) if year else None), (parts[0] if len(parts) > 1 else None)
+
+def load_document_metadata(metadata_csv):
+    """
+Description:
+Loads a CSV giving the year and publication of every document ('doc_id', 'year', 'publication').
+
+Returns:
+metadata (dict): doc_id -> (year, publication)
+"""
+    df_metadata = pd.read_csv(metadata_csv, dtype={'doc_id': str, 'publication': str})
+    years = pd.to_numeric(df_metadata['year'], errors='coerce')
+    return {doc_id: (int(year) if pd.notna(year) else None, publication if isinstance(publication, str) else None)
+            for doc_id, year, publication in zip(df_metadata['doc_id'], years, df_metadata['publication'])}
+
+## 2.2.: Map: counting the mentions of one shard
+
+# the automaton and metadata are sent once to every worker (not once per shard), or the automaton is attached from its published files (see shared_tables.py)
+_worker_state = {}
+
+def _init_worker(automaton, scanner, reader, metadata):
+    if "shared_dir" in automaton:
+        automaton = attach_matcher(automaton)
+    _worker_state.update(automaton=automaton, scanner=scanner, reader=reader, metadata=metadata)
+
+def shard_csv_path(shards_dir, shard_nb):
+    return os.path.join(shards_dir, f'shard_{shard_nb:05d}.csv')
+
+def count_shard(task):
+    """
+Description:
+Scans the files of one shard and saves its partial count table (one row per author, year and publication) to shards_dir.
+The table is written to a temporary file and then renamed, so that a shard is either complete or missing: an interrupted job is restarted by running it again.
+
+Arguments:
+task (tuple): (shard number, paths, corpus_dir, corpus_name, shards_dir); the automaton, scanner, reader and metadata are those given to _init_worker().
+
+Returns:
+tuple: (shard number, number of bytes read, seconds spent)
+"""
+    shard_nb, paths, corpus_dir, corpus_name, shards_dir = task
+    automaton, scanner, reader, metadata = (_worker_state[key] for key in ('automaton', 'scanner', 'reader', 'metadata'))
+    started = time.perf_counter()
+
+    counts = {} # (qid, year, publication) -> [nb_mentions, weighted_mentions, set of doc_ids]
+    nb_bytes = 0
+    for path in paths:
+        for doc_id, text in reader(path, corpus_dir):
+            nb_bytes += len(text.encode('utf-8'))
+            year, publication = metadata.get(doc_id.split('#')[0]) or document_metadata_from_path(doc_id) # '#p3': page of an ALTO or TEI file
+            for _, pattern_nb, *_ in scanner(automaton, text):
+                weight = automaton["alias_weights"][pattern_nb]
+                for qid in automaton["alias_qids"][pattern_nb]:
+                    count = counts.setdefault((qid, year, publication), [0, 0.0, set()])
+                    count[0] += 1
+                    count[1] += weight
+                    count[2].add(doc_id)
+
+    rows = [(qid, year, publication, corpus_name, nb, weighted, len(doc_ids)) for (qid, year, publication), (nb, weighted, doc_ids) in counts.items()]
+    shard_csv = shard_csv_path(shards_dir, shard_nb)
+    pd.DataFrame(rows, columns=COUNT_COLUMNS).to_csv(shard_csv + '.tmp', index=False)
+    os.replace(shard_csv + '.tmp', shard_csv)
+
+    return shard_nb, nb_bytes, time.perf_counter() - started
+
+def run_mention_count_shards(automaton, corpus_dir, shards_dir, corpus_name=CORPUS_NAME, nb_shards=NB_SHARDS, shard_nbs=SHARD_NBS, processes=PROCESSES,
+                             scanner=scan_text, reader=read_text_file, paths=None, metadata=None, shared_dir=None):
+    """
+Description:
+Map stage: partitions the corpus into shards and counts the mentions of every shard with a pool of worker processes (one shard per task).
+Shards whose table already exists in shards_dir are skipped, so that the job can be restarted, or split between machines sharing shards_dir (shard_nbs).
+
+Arguments:
+automaton (dict): output of build_alias_automaton() or build_normalised_alias_index() (with scanner=scan_text_normalised).
+corpus_dir (str): path to the corpus directory.
+shards_dir (str): directory of the partial count tables.
+corpus_name (str, optional): saved in the 'corpus' column. Defaults to CORPUS_NAME.
+nb_shards (int, optional): Defaults to NB_SHARDS.
+shard_nbs (iterable, optional): shards handled by this run. Defaults to SHARD_NBS (all).
+processes (int, optional): Defaults to PROCESSES (all cores).
+scanner, reader (function, optional): see scan_corpus() in alias_matcher.py.
+paths (list, optional): the files to count. Defaults to all the .txt files of corpus_dir.
+metadata (dict, optional): output of load_document_metadata(). Defaults to reading the year and publication from the paths.
+shared_dir (str, optional): directory where the automaton is published once and memory-mapped by the workers (see shared_tables.py). Defaults to None (a copy per worker).
+
+Returns:
+metrics (dict): 'nb_shards_done', 'nb_shards_skipped', 'megabytes', 'seconds', 'mb_per_second', 'mb_per_second_per_core'
+"""
+    os.makedirs(shards_dir, exist_ok=True)
+    shards = partition_corpus(corpus_dir, nb_shards, paths)
+
+    # the shards holding files, so that the reduce stage can check that all of them are counted (same content whichever machine writes it)
+    partition_json = os.path.join(shards_dir, 'partition.json')
+    with open(partition_json + f'.{os.getpid()}.tmp', 'w', encoding='utf-8') as file:
+        json.dump({"nb_shards": nb_shards, "shard_nbs": sorted(shards)}, file)
+    os.replace(partition_json + f'.{os.getpid()}.tmp', partition_json)
+    selected = set(shard_nbs) if shard_nbs is not None else set(range(nb_shards))
+
+    to_do = [shard_nb for shard_nb in sorted(shards) if shard_nb in selected and not os.path.exists(shard_csv_path(shards_dir, shard_nb))]
+    nb_skipped = len([shard_nb for shard_nb in shards if shard_nb in selected]) - len(to_do)
+    print(f"[i] {len(to_do)} shard(s) to count, {nb_skipped} already done, with {processes} worker process(es).")
+
+    if shared_dir and to_do:
+        automaton = publish_matcher(automaton, shared_dir)
+    started = time.perf_counter()
+    nb_bytes, worker_seconds = 0, 0.0
+    tasks = ((shard_nb, shards[shard_nb], corpus_dir, corpus_name, shards_dir) for shard_nb in to_do)
+    with Pool(processes, initializer=_init_worker, initargs=(automaton, scanner, reader, metadata or {})) as pool:
+        for done_nb, (shard_nb, shard_bytes, shard_seconds) in enumerate(pool.imap_unordered(count_shard, tasks), 1):
+            nb_bytes += shard_bytes
+            worker_seconds += shard_seconds
+            if done_nb % 10 == 0 or done_nb == len(to_do):
+                print(f"[i] [{done_nb}/{len(to_do)}] shards counted.")
+
+    seconds = time.perf_counter() - started
+    megabytes = nb_bytes / 1e6
+    metrics = {
+        "nb_shards_done": len(to_do),
+        "nb_shards_skipped": nb_skipped,
+        "megabytes": round(megabytes, 3),
+        "seconds": round(seconds, 3),
+        "mb_per_second": round(megabytes / seconds, 3) if seconds else None,
+        "mb_per_second_per_core": round(megabytes / worker_seconds, 3) if worker_seconds else None,
+    }
+    print(f"|Y| Counted {metrics['megabytes']} MB in {metrics['seconds']} s ({metrics['mb_per_second']} MB/s overall, {metrics['mb_per_second_per_core']} MB/s per core).")
+
+    return metrics
+
+## 2.3.: Reduce: merging the partial tables
+
+def reduce_mention_counts(shards_dir):
+    """
+Description:
+Reduce stage: merges the partial count tables of shards_dir into one table (counts summed by author, year, publication and corpus).
+Warns when some shards of the partition are not counted yet.
+
+Arguments:
+shards_dir (str): directory of the partial count tables.
+
+Returns:
+df_counts (DataFrame): columns COUNT_COLUMNS
+"""
+    shard_csvs = sorted(glob.glob(os.path.join(shards_dir, 'shard_*.csv')))
+    partition_json = os.path.join(shards_dir, 'partition.json')
+    if os.path.exists(partition_json):
+        with open(partition_json, 'r', encoding='utf-8') as file:
+            missing = [shard_nb for shard_nb in json.load(file)["shard_nbs"] if not os.path.exists(shard_csv_path(shards_dir, shard_nb))]
+        if missing:
+            print(f"|!| {len(missing)} shard(s) not counted yet (e.g. {missing[:5]}): run the map stage again before using the counts.")
+
+    df_counts = pd.concat([pd.read_csv(shard_csv, dtype={'q_identifier': str, 'publication': str, 'corpus': str}) for shard_csv in shard_csvs], ignore_index=True) \
+        if shard_csvs else pd.DataFrame(columns=COUNT_COLUMNS)
+    df_counts = df_counts.groupby(['q_identifier', 'year', 'publication', 'corpus'], dropna=False, as_index=False)[['nb_mentions', 'weighted_mentions', 'nb_documents']].sum()
+
+    print(f"[i] Merged {len(shard_csvs)} shard tables into {len(df_counts)} (author, year, publication, corpus) rows.")
+
+    return df_counts
+
+def author_year_matrix(df_counts, value='nb_mentions', authors=None, publication=None, corpus=None):
+    """
+Description:
+Turns the merged counts into a sparse author x year matrix (scipy CSR), optionally for one publication or corpus. Rows without a year are left out.
+
+Arguments:
+df_counts (DataFrame): output of reduce_mention_counts().
+value (str, optional): 'nb_mentions', 'weighted_mentions' or 'nb_documents'. Defaults to 'nb_mentions'.
+authors (list, optional): QIDs of the rows (e.g. every author of the list, including those never mentioned). Defaults to the mentioned authors.
+publication (str, optional): only counts this publication. Defaults to None (all).
+corpus (str, optional): only counts this corpus. Defaults to None (all).
+
+Returns:
+tuple: (matrix (csr_matrix), row QIDs (list), column years (list))
+"""
+    df = df_counts[df_counts['year'].notna()]
+    if publication is not None:
+        df = df[df['publication'] == publication]
+    if corpus is not None:
+        df = df[df['corpus'] == corpus]
+
+    qids = list(authors) if authors is not None else sorted(df['q_identifier'].unique())
+    years = list(range(int(df['year'].min()), int(df['year'].max()) + 1)) if len(df) else []
+    df = df[df['q_identifier'].isin(set(qids))]
+
+    rows = pd.Index(qids).get_indexer(df['q_identifier'])
+    columns = df['year'].astype(int).to_numpy() - (years[0] if years else 0)
+    matrix = sparse.csr_matrix((df[value].to_numpy(dtype=np.float64), (rows, columns)), shape=(len(qids), len(years))) # duplicates (publications) are summed
+
+    return matrix, qids, years
+
+def save_author_year_matrix(matrix, qids, years, output_dir, name):
+    """
+Description:
+Saves a sparse author x year matrix as '{name}.npz' (scipy) with its row and column labels in '{name}_labels.json'.
+"""
+    os.makedirs(output_dir, exist_ok=True)
+    sparse.save_npz(os.path.join(output_dir, f'{name}.npz'), matrix)
+    with open(os.path.join(output_dir, f'{name}_labels.json'), 'w', encoding='utf-8') as file:
+        json.dump({"q_identifiers": qids, "years": years}, file)
+    print(f"|Y| {matrix.shape[0]} x {matrix.shape[1]} author x year matrix ({matrix.nnz} non-zero cells) saved to {os.path.join(output_dir, name + '.npz')}.")
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    df_aliases, _ = resolve_alias_collisions(load_alias_tables(ALIAS_CSVS), COLLISION_POLICY)
+    if MATCHER == 'normalised':
+        automaton, scanner = build_normalised_alias_index(df_aliases, KEY_LEVEL), scan_text_normalised
+    elif MATCHER == 'fuzzy':
+        automaton, scanner = build_fuzzy_alias_index(df_aliases, KEY_LEVEL), scan_text_fuzzy
+    else:
+        automaton, scanner = build_alias_automaton(df_aliases), scan_text
+    if DISAMBIGUATE:
+        features = build_author_features(df_aliases['q_identifier'].unique(), AUTHORS_CSV, ITEM_METRICS_CSV, WITH_PRECISION_CSV)
+        automaton, scanner = build_disambiguating_matcher(automaton, scanner, features), scan_text_disambiguated
+
+    metadata = load_document_metadata(DOCUMENT_METADATA_CSV) if DOCUMENT_METADATA_CSV else None
+    reader, paths = (read_corpus_texts, list(iter_corpus_files(CORPUS_DIR))) if CORPUS_FORMAT == 'any' else (read_text_file, None)
+    run_mention_count_shards(automaton, CORPUS_DIR, SHARDS_DIR, scanner=scanner, reader=reader, paths=paths, metadata=metadata, shared_dir=SHARED_DIR)
+
+    # the reduce stage is run once every shard is counted (on any of the machines)
+    df_counts = reduce_mention_counts(SHARDS_DIR)
+    df_counts.to_csv(os.path.join(OUTPUT_DIR, f'{CORPUS_NAME}_mention_counts.csv'), index=False)
+    matrix, qids, years = author_year_matrix(df_counts, authors=sorted(df_aliases['q_identifier'].unique()))
+    save_author_year_matrix(matrix, qids, years, OUTPUT_DIR, f'{CORPUS_NAME}_author_year_mentions')
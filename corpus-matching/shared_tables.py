@@ -0,0 +1,263 @@
+#####------------------------------------------------------------------------Publishing the compiled matcher and the author table once, as memory-mapped files shared by all the worker processes-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import json
+import math
+import bisect
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+
+### Step 1: Defining relevant directories, file paths and variables
+
+SHARED_DIR = r'path_to\corpus-matching\output\shared_matcher' # on Linux, a directory of /dev/shm keeps the files in memory
+# only the patterns, QIDs, weights, automaton and features of a matcher are published as flat arrays; its other keys (the key dicts of the normalised and fuzzy matchers,
+# about 27 MB pickled with the use case 3 aliases, the scanner of a disambiguating matcher...) are Python objects and are still pickled to every worker
+TRANSITION_DTYPE = np.dtype([('char', '<i4'), ('target', '<i4')])
+MAX_CACHED_ROWS = 20000 # decoded rows kept by every view of a worker, so that a long run does not rebuild a private copy of the automaton (None to keep them all)
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Read-only views of the flat arrays
+
+class SharedRows(dict):
+    """
+Description:
+Read-only list view of a memory-mapped array: row i is values[i], or values[offsets[i]:offsets[i + 1]] when offsets are given, turned into a Python object by decode.
+A row is decoded the first time it is read, so that a worker only decodes the rows it needs (e.g. the states of the automaton reached by its texts).
+The first max_cached rows read are then kept (the dict holds them) and read again at the speed of a list, the others are decoded at every read:
+the rows read first are the ones read most often (the root and the shallow states of the automaton, that every text goes through), while a deep state is rarely reached twice.
+The last row decoded is kept aside as well, as the scanners read a state twice in a row (goto[state] in 'char in goto[state]' and 'goto[state].get(char)').
+"""
+    def __init__(self, values, offsets=None, decode=None, max_cached=MAX_CACHED_ROWS):
+        super().__init__()
+        self.values, self.offsets, self.decode = values, offsets, decode
+        self.nb_rows = len(values) if offsets is None else len(offsets) - 1
+        self.max_cached = max_cached
+        self.last_read = (None, None)
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __iter__(self):
+        return (self[position] for position in range(self.nb_rows))
+
+    def __missing__(self, position):
+        if not isinstance(position, (int, np.integer)) or not -self.nb_rows <= position < self.nb_rows:
+            raise IndexError(position)
+        row_nb = int(position) % self.nb_rows
+        if self.last_read[0] == row_nb:
+            return self.last_read[1]
+        row = self.values[row_nb] if self.offsets is None else self.values[int(self.offsets[row_nb]):int(self.offsets[row_nb + 1])]
+        row = self.decode(row) if self.decode is not None else row
+        if self.max_cached is None or dict.__len__(self) < self.max_cached:
+            self[position] = row
+        else:
+            self.last_read = (row_nb, row)
+        return row
+
+class SharedRecords(Mapping):
+    """
+Description:
+Read-only dict view of a table published by publish_table(): key -> {column: value}, found by binary search on the sorted keys. Missing numbers read as None.
+"""
+    def __init__(self, keys, columns):
+        self.keys_view, self.columns = keys, columns
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.keys_view)
+
+    def __iter__(self):
+        return iter(self.keys_view)
+
+    def __getitem__(self, key):
+        if key not in self.cache:
+            position = bisect.bisect_left(self.keys_view, key) if isinstance(key, str) else len(self.keys_view)
+            if position == len(self.keys_view) or self.keys_view[position] != key:
+                raise KeyError(key)
+            self.cache[key] = {name: column[position] for name, column in self.columns.items()}
+        return self.cache[key]
+
+def _decode_utf8(row):
+    return row.tobytes().decode('utf-8')
+
+def _decode_number(value):
+    value = value.item()
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+## 2.2.: Writing and reading the arrays
+
+def _save_array(shared_dir, name, array):
+    # written to a temporary file and renamed: workers still reading an older publication keep their (unlinked) files
+    path = os.path.join(shared_dir, f'{name}.npy')
+    with open(path + '.tmp', 'wb') as file:
+        np.save(file, array)
+    os.replace(path + '.tmp', path)
+
+def _save_json(shared_dir, name, content):
+    path = os.path.join(shared_dir, f'{name}.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(content, file)
+    os.replace(path + '.tmp', path)
+
+def _load_array(shared_dir, name):
+    return np.load(os.path.join(shared_dir, f'{name}.npy'), mmap_mode='r')
+
+def _load_json(shared_dir, name):
+    with open(os.path.join(shared_dir, f'{name}.json'), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def _flatten_strings(strings):
+    # UTF-8 bytes of all the strings and the offsets of every string
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(string) for string in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+def _flatten_rows(rows, dtype):
+    # values of all the rows and the offsets of every row
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    return np.fromiter((value for row in rows for value in row), dtype=dtype, count=int(offsets[-1])), offsets
+
+## 2.3.: The author table
+
+def publish_table(df, shared_dir, name, key='q_identifier'):
+    """
+Description:
+Publishes a table (e.g. the merged author table of build_ranking_table() in use case 2, or the author features of alias_disambiguation.py) as memory-mapped columns:
+the sorted keys as UTF-8 bytes and offsets, numeric columns as arrays, other columns as strings.
+
+Arguments:
+df (DataFrame): the table, with its keys in the column key (or in its index).
+shared_dir (str): directory of the published files.
+name (str): name of the table (prefix of its files).
+key (str, optional): the key column. Defaults to 'q_identifier'.
+
+Returns:
+name (str)
+"""
+    df = (df.reset_index() if key not in df.columns else df).drop_duplicates(subset=key).sort_values(key, kind='stable')
+    os.makedirs(shared_dir, exist_ok=True)
+    key_bytes, key_offsets = _flatten_strings(df[key].astype(str))
+    _save_array(shared_dir, f'{name}.key_bytes', key_bytes)
+    _save_array(shared_dir, f'{name}.key_offsets', key_offsets)
+
+    columns = {}
+    for column in df.columns.drop(key):
+        if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+            _save_array(shared_dir, f'{name}.{column}', df[column].to_numpy(dtype=np.float64 if df[column].isna().any() else None))
+            columns[column] = 'number'
+        else:
+            string_bytes, string_offsets = _flatten_strings(df[column].fillna('').astype(str))
+            _save_array(shared_dir, f'{name}.{column}.bytes', string_bytes)
+            _save_array(shared_dir, f'{name}.{column}.offsets', string_offsets)
+            columns[column] = 'string'
+    _save_json(shared_dir, f'{name}.columns', {'key': key, 'nb_rows': len(df), 'columns': columns})
+
+    return name
+
+def attach_table(shared_dir, name):
+    """
+Description:
+Opens a table published by publish_table() without reading it (zero-copy): every process attaching it shares the same pages.
+
+Returns:
+table (SharedRecords): key -> {column: value}
+"""
+    meta = _load_json(shared_dir, f'{name}.columns')
+    keys = SharedRows(_load_array(shared_dir, f'{name}.key_bytes'), _load_array(shared_dir, f'{name}.key_offsets'), _decode_utf8)
+    columns = {}
+    for column, kind in meta['columns'].items():
+        if kind == 'number':
+            columns[column] = SharedRows(_load_array(shared_dir, f'{name}.{column}'), decode=_decode_number)
+        else:
+            columns[column] = SharedRows(_load_array(shared_dir, f'{name}.{column}.bytes'), _load_array(shared_dir, f'{name}.{column}.offsets'), _decode_utf8)
+    return SharedRecords(keys, columns)
+
+## 2.4.: The compiled matcher
+
+def publish_matcher(matcher, shared_dir=SHARED_DIR):
+    """
+Description:
+Publishes a compiled matcher once, as flat arrays saved in shared_dir, instead of sending a pickled copy of it to every worker process:
+the patterns (UTF-8 bytes and offsets), their QIDs (positions in an interned QID table, qids.json) and weights and, for the automaton of alias_matcher.py,
+its transitions (sorted (character, state) pairs of every state), failure links and outputs. The features of a disambiguating matcher are published with publish_table().
+
+Arguments:
+matcher (dict): output of build_alias_automaton(), build_normalised_alias_index(), build_fuzzy_alias_index() or build_disambiguating_matcher().
+shared_dir (str, optional): directory of the published files. Defaults to SHARED_DIR.
+
+Returns:
+handle (dict): 'shared_dir' and 'unshared' (the other keys of the matcher), to give to the workers instead of the matcher (see attach_matcher()).
+"""
+    os.makedirs(shared_dir, exist_ok=True)
+    published = []
+
+    pattern_bytes, pattern_offsets = _flatten_strings(matcher["patterns"])
+    qids = sorted({qid for pattern_qids in matcher["alias_qids"] for qid in pattern_qids})
+    qid_positions = {qid: position for position, qid in enumerate(qids)}
+    qid_codes, qid_offsets = _flatten_rows([[qid_positions[qid] for qid in pattern_qids] for pattern_qids in matcher["alias_qids"]], np.int32)
+    arrays = {
+        'pattern_bytes': pattern_bytes, 'pattern_offsets': pattern_offsets,
+        'qid_codes': qid_codes, 'qid_offsets': qid_offsets,
+        'alias_weights': np.asarray(matcher["alias_weights"], dtype=np.float64),
+    }
+    _save_json(shared_dir, 'qids', qids)
+    published += ['patterns', 'alias_qids', 'alias_weights']
+
+    if isinstance(matcher.get("goto"), list):
+        transitions = [sorted((ord(char), target) for char, target in state.items()) for state in matcher["goto"]]
+        arrays['transitions'], arrays['transition_offsets'] = _flatten_rows(transitions, TRANSITION_DTYPE)
+        arrays['fail'] = np.asarray(matcher["fail"], dtype=np.int32)
+        arrays['output_patterns'], arrays['output_offsets'] = _flatten_rows(matcher["output"], np.int32)
+        published += ['goto', 'fail', 'output']
+
+    for name, array in arrays.items():
+        _save_array(shared_dir, name, array)
+
+    if isinstance(matcher.get("features"), dict):
+        df_features = pd.DataFrame.from_dict(matcher["features"], orient='index', columns=['prior', 'year']).astype(np.float64)
+        publish_table(df_features.rename_axis('q_identifier'), shared_dir, 'features')
+        published.append('features')
+
+    _save_json(shared_dir, 'meta', {'published': published, 'nb_patterns': len(matcher["patterns"]), 'nb_states': len(matcher.get("goto") or [])})
+    size = sum(array.nbytes for array in arrays.values())
+    print(f"|Y| Published {len(matcher['patterns'])} patterns{' and ' + str(len(matcher['goto'])) + ' automaton states' if 'goto' in published else ''} ({size / 1e6:.1f} MB) in {shared_dir}.")
+
+    return {"shared_dir": shared_dir, "unshared": {key: value for key, value in matcher.items() if key not in published}}
+
+def attach_matcher(handle):
+    """
+Description:
+Rebuilds a matcher published by publish_matcher() from memory-mapped views (zero-copy: all the workers share the same pages, and only decode the rows they read).
+The views behave as the lists of the compiled matcher, so that scan_text(), scan_text_disambiguated() and the callers of the scanners need no change.
+
+Arguments:
+handle (dict): output of publish_matcher().
+
+Returns:
+matcher (dict)
+"""
+    shared_dir = handle["shared_dir"]
+    meta = _load_json(shared_dir, 'meta')
+    qids = _load_json(shared_dir, 'qids')
+    matcher = dict(handle["unshared"])
+
+    matcher["patterns"] = SharedRows(_load_array(shared_dir, 'pattern_bytes'), _load_array(shared_dir, 'pattern_offsets'), _decode_utf8)
+    matcher["alias_qids"] = SharedRows(_load_array(shared_dir, 'qid_codes'), _load_array(shared_dir, 'qid_offsets'), lambda row: tuple(qids[code] for code in row.tolist()))
+    matcher["alias_weights"] = SharedRows(_load_array(shared_dir, 'alias_weights'), decode=float)
+
+    if 'goto' in meta['published']:
+        matcher["goto"] = SharedRows(_load_array(shared_dir, 'transitions'), _load_array(shared_dir, 'transition_offsets'),
+                                     lambda row: dict(zip(map(chr, row['char'].tolist()), row['target'].tolist())))
+        matcher["fail"] = SharedRows(_load_array(shared_dir, 'fail'), decode=int)
+        matcher["output"] = SharedRows(_load_array(shared_dir, 'output_patterns'), _load_array(shared_dir, 'output_offsets'), lambda row: row.tolist())
+
+    if 'features' in meta['published']:
+        matcher["features"] = attach_table(shared_dir, 'features')
+
+    return matcher
@@ -0,0 +1,23 @@
+import io
+from corpus_readers import read_tei
+
+
+def test_tei_word_split_at_line_break_is_joined():
+    # the line break and the indentation before <lb break="no"/> reach the handler as text
+    tei = '''<TEI>
+  <teiHeader><date when="1750"/></teiHeader>
+  <text><body>
+    <p>Lettre de Cicé-
+      <lb break="no"/>ron à Atticus,
+      <lb/>et de Sénèque</p>
+  </body></text>
+</TEI>'''.encode('utf-8')
+
+    records = list(read_tei(io.BytesIO(tei), 'lettres.xml'))
+
+    assert len(records) == 1
+    doc_id, date, page, text, offset_map = records[0]
+    assert 'Cicéron à Atticus' in text
+    assert 'Atticus,\n' in text and 'Sénèque' in text
+    assert date == '1750'
+    assert all(offset <= len(text) for offset, _ in offset_map)
@@ -41,12 +41,26 @@ def get_wikidata_id(trismegistos_id):
         else:
             print(f"Error retrieving data: {e}")
 
+# Trismegistos ID -> QID pairs already known locally (crosswalk saved by use-case-2/python_scripts/identifier_crosswalk.py):
+# only the IDs missing from it are sent to Wikidata
+CROSSWALK_CSV = r'\path\identifier_crosswalk.csv'
+try:
+    crosswalk = pd.read_csv(CROSSWALK_CSV, dtype=str).fillna('')
+    crosswalk = crosswalk[crosswalk['id_type'] == 'trismegistos_id']
+    tm_to_qid = dict(zip(crosswalk['id_value'], crosswalk['q_identifier']))  # an empty QID means Wikidata has none
+except FileNotFoundError:
+    tm_to_qid = {}
+
 # Populate the dictionary with Wikidata IDs
 for author in authors_dict:
-    trismegistos_id = author.get('trismegistos_id')
-    if trismegistos_id:
-        author['wikidata_id'] = get_wikidata_id(trismegistos_id)
-        time.sleep(1)  # Throttle requests to avoid rate limits
+    # 'https://www.trismegistos.org/author/694' -> '694'; the header row ('Trismegistos ID') and authors without a TM ID are skipped
+    trismegistos_id = author.get('trimegistos', '').rsplit('/', 1)[-1]
+    if trismegistos_id.isdigit():
+        if trismegistos_id in tm_to_qid:
+            author['wikidata_id'] = tm_to_qid[trismegistos_id] or None
+        else:
+            author['wikidata_id'] = get_wikidata_id(trismegistos_id)
+            time.sleep(1)  # Throttle requests to avoid rate limits
 
 # authors_dict['Homeros']['wikidata_id'] = 'Q6691'
 # authors_dict['Scriptores Historiae Augustae']['wikidata_id'] = 'Q9334638'
@@ -134,33 +148,36 @@ for author in authors_dict:
     # Convert all aliases to lowercase and remove duplicates
     author['aliases'] = list(set(alias.lower() for alias in author['aliases']))
 
-# Eliminate alias 'césar' from Augustus mentions (it is already included as an alias for Julius Caesar)
-for author in authors_dict:
-    if author.get('author') == 'Augustus':
-        author['aliases'].remove('césar')
-        author['aliases'].remove('gaius julius caesar'
-                                 
-# saint clement of rome vs saint clement of alexandria
-for author in authors_dict:
-    if author.get('author') == 'Clemens of Alexandria':
-        author['aliases'].remove('saint clement')
-
-# seneca rhetor vs seneca the younger
-for author in authors_dict:
-    if author.get('author') == 'Seneca rhetor':
-        author['aliases'].remove('lucius annaeus seneca')
-
-# ephraem syrus vs ephraem graecus
+# ephraem syrus vs ephraem graecus: only keep the specific name for Ephraem Graecus
 for author in authors_dict:
     if author.get('author') == 'Ephraem Graecus':
         author['aliases'] = ['ephraem graecus']
-    if author.get('author') == 'Ephraem of Syria':
-        author['aliases'].remove('ephraem graecus')
 
-# giustino alias for Iustinus and iustinus martyr
+# Detect the aliases shared by more than one author with a reverse index (alias -> authors) instead of removing them by hand
+aliases_to_authors = {}
+for author in authors_dict:
+    for alias in author.get('aliases', []):
+        aliases_to_authors.setdefault(alias, set()).add(author['author'])
+
+colliding_aliases = {alias: authors for alias, authors in aliases_to_authors.items() if len(authors) > 1}
+print(f"{len(colliding_aliases)} aliases are shared by more than one author")
+for alias, authors in sorted(colliding_aliases.items()):
+    print(alias, sorted(authors))
+
+# Authors who keep a shared alias (checked manually: 'césar' is Caesar rather than Augustus, 'saint clement' is Clement of Rome rather than Clement of Alexandria, etc.)
+# Every other shared alias is ambiguous and removed from all the authors sharing it
+ALIAS_OWNERS = {
+    'césar': 'Caesar',
+    'gaius julius caesar': 'Caesar',
+    'saint clement': 'Clemens of Rome',
+    'lucius annaeus seneca': 'Seneca',
+    'ephraem graecus': 'Ephraem Graecus',
+    'giustino': 'Iustinus',
+    'justin': 'Iustinus',
+}
+
 for author in authors_dict:
-    if author.get('author') == 'Iustinus martyr':
-        author['aliases'].remove('giustino')
-        author['aliases'].remove('justin')
+    if 'aliases' in author:
+        author['aliases'] = [alias for alias in author['aliases'] if alias not in colliding_aliases or ALIAS_OWNERS.get(alias) == author['author']]
 
 aliases_df = pd.DataFrame(authors_dict)
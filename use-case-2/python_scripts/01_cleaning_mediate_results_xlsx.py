@@ -5,6 +5,7 @@
 import pandas as pd
 import os
 import re
+from mediate_collection_matrix import build_author_collection_matrix, save_author_collection_matrix
 
 ### Step 1: Defining relevant paths, directories and variables
 
@@ -17,6 +18,7 @@ MEDIATE_XLSX_RAW_RESULTS_FILE_PATH = os.path.join(MEDIATE_LISTS_DIR, XLSX_SUBDIR
 CSV_SUBDIR = 'csv'
 RAW_RESULTS_SUBDIR = 'raw_results'
 CLEANED_RESULTS_SUBDIR = 'cleaned_results'
+COLLECTION_MATRIX_DIR = r'path_to\use-case-2\output\mediate_collection_matrix' # author x collection matrix, see 3.2. and mediate_collection_matrix.py
 
 
 ### Step 1: loading the XLSX as a dataframe and printing a preview to see if it works
@@ -59,6 +61,10 @@ df_cleaned_mediate_raw_results.columns = ['nb_items', 'nb_collections', 'short_n
 print(f"[i] Successfully renamed columns from df_cleaned_mediate_raw_results")
 print(df_cleaned_mediate_raw_results.head())
 
+# before dropping them, keeping the collections of every author (not only their number) as a sparse author x collection matrix, with the year and place of every collection (see mediate_collection_matrix.py)
+collection_matrix = build_author_collection_matrix(df_cleaned_mediate_raw_results, author_column='short_name', collections_column='collections')
+save_author_collection_matrix(collection_matrix, COLLECTION_MATRIX_DIR)
+
 # keeping only interesting columns
 df_cleaned_mediate_raw_results = df_cleaned_mediate_raw_results[['short_name', 'nb_items', 'nb_collections', 'first_names', 'surname', 'date_of_birth', 'date_of_death', 'viaf_id']]
 print(f"[i] First successful sorting of the columns of df_cleaned_mediate_raw_results.\n")
@@ -4,9 +4,11 @@
 import os
 import pandas as pd
 import json
-from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper import SPARQLWrapper
 from datetime import datetime
 import traceback
+from wikidata_enrichment import enrich_by_external_id, EXTERNAL_ID_PROPERTIES
+from identifier_crosswalk import load_crosswalk, save_crosswalk, ids_to_qids
 
 ### Step 1: Defining relevant directories, file paths and variables
 
@@ -20,6 +22,12 @@ LAST_TAG = '02_last'
 ## 1.3. SPARQL endpoint
 SPARQL = SPARQLWrapper("https://query.wikidata.org/sparql",
                        agent="your_role - your_email@email.com")
+CROSSWALK_CSV = r'path_to\use-case-2\output\identifier_crosswalk\identifier_crosswalk.csv' # VIAF IDs already known locally (see identifier_crosswalk.py) are not matched online again; set to None to match every ID online
+
+## 1.4. Review queue for authors not matched automatically (see 2.2. and 2.3.)
+APPLY_REVIEW_DECISIONS = False # set to True once 'new_viaf_id' has been filled in in the review queue: patches LAST_CSV_TO_PATCH without re-running the whole query
+REVIEW_QUEUE_CSV = r'path_to\use-case-2\output\authors_csv\02_mediate_ancient_authors_csv_wiki\02_intermediate\02_mediate_viaf_id_review_queue.csv'
+LAST_CSV_TO_PATCH = r'path_to\use-case-2\output\authors_csv\02_mediate_ancient_authors_csv_wiki\02_last\02_20250912_mediate_ancient_authors_wiki_labelled_last.csv'
 
 
 ### Step 2: Defining the function(s)
@@ -28,7 +36,7 @@ SPARQL = SPARQLWrapper("https://query.wikidata.org/sparql",
 
 # We are interested in  QIDs, French labels, English labels, French aliases, English aliases, Latin aliases and writing language(s)
 
-def retrieve_qids_aliases_lang_wikidata(input_author_list, source, sparql_setup, output_csv_dir, error_log_dir, specific_ids=None, nb_ids=None):
+def retrieve_qids_aliases_lang_wikidata(input_author_list, source, sparql_setup, output_csv_dir, error_log_dir, specific_ids=None, nb_ids=None, crosswalk_csv=None):
 
     """
 Queries Wikidata for authors in a MEDIATE 'cleaned results' CSV list using their VIAF cluster IDs (as reported on MEDIATE). The objective is to retrieve labels, aliases (in French, English and Latin),
@@ -42,6 +50,7 @@ Arguments:
     error_log_dir (str): Path to the directory to save error logs.
     specific_ids (list, optional): List of VIAF IDs to query. Defaults to None.
     nb_ids (int., optional): Limit number of authors to query. Defaults to None.
+    crosswalk_csv (str, optional): Path to the identifier crosswalk; VIAF IDs found there are not matched online again. Defaults to None.
 
 Returns:
     tuple: (DataFrame of results, path to output CSV)
@@ -53,6 +62,8 @@ Returns:
     df_ancient_authors_output = pd.DataFrame()  # empty dataframe as fallback
     output_csv_path = None
     df_not_matched_automatically = pd.DataFrame()
+    not_matched_automatically_viaf_ids = []
+    author_ids = []
     
     # initialising a list to hold possible errors
     error_log = []
@@ -82,146 +93,63 @@ Returns:
             print("|!| No author_ids found. Check strucutre of CSV or specific_ids = [].")
             return None
 
-        # feeding the target author ids to the SPARQL query
-        values_block = " ".join(f'"{id}"' for id in author_ids)
-
-        # setting up the SPARQL query
-
-        query = f"""
-    
-    SELECT ?viafID ?item ?itemLabelEN ?itemLabelFR ?itemLabelLA
-        (GROUP_CONCAT(DISTINCT ?aliasEnglish; SEPARATOR=", ") AS ?aliasesEnglish)
-        (GROUP_CONCAT(DISTINCT ?aliasFrench; SEPARATOR=", ") AS ?aliasesFrench)
-        (GROUP_CONCAT(DISTINCT ?aliasLatin; SEPARATOR=", ") AS ?aliasesLatin)
-        (GROUP_CONCAT(DISTINCT ?writingLangLabelEN; SEPARATOR=", ") AS ?writingLanguages)
-    
-    WHERE {{
-    VALUES ?viafID {{ {values_block} }}
-    ?item wdt:P214 ?viafID.
-
-    OPTIONAL {{
-    ?item rdfs:label ?itemLabelEN.
-    FILTER(LANG(?itemLabelEN) = "en")
-    }}
-
-    OPTIONAL {{
-        ?item rdfs:label ?itemLabelFR.
-        FILTER(LANG(?itemLabelFR) = "fr")
-    }}
-
-    OPTIONAL {{
-        ?item rdfs:label ?itemLabelLA.
-        FILTER(LANG(?itemLabelLA) = "la")
-    }}
-      
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasEnglish.
-        FILTER(LANG(?aliasEnglish) = "en")
-    }}
-
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasFrench.
-        FILTER(LANG(?aliasFrench) = "fr")
-    }}
-
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasLatin.
-        FILTER(LANG(?aliasLatin) = "la")
-    }}
-
-    OPTIONAL {{
-        ?item wdt:P6886 ?writingLang.
-        ?writingLang rdfs:label ?writingLangLabelEN.
-        FILTER(LANG(?writingLangLabelEN) = "en")
-    }}
-    
-    }}
-    GROUP BY ?viafID ?item ?itemLabelEN ?itemLabelFR ?itemLabelLA
-    """
-
-        # Calling the query
-        sparql_setup.setQuery(query)
-        sparql_setup.setReturnFormat(JSON)
-        results = sparql_setup.query().convert()
+        ## (b) Querying Wikidata in chunks (see wikidata_enrichment.py) and processing the results
 
-        # quick check (commented out)
-        # print(json.dumps(results, indent=2)) 
+        # resolving the IDs to QIDs from the crosswalk first (see identifier_crosswalk.py): only the IDs missing from it are matched online
+        crosswalk = load_crosswalk(crosswalk_csv) if crosswalk_csv else None
+        matches, lookup_errors = ids_to_qids(crosswalk, author_ids, 'viaf_id', sparql_setup) if crosswalk else (None, [])
+        if crosswalk and crosswalk['changed']:
+            save_crosswalk(crosswalk, crosswalk_csv)
+        # IDs whose lookup failed go to the error_log (to be queried again), not to the unmatched IDs
+        error_log.extend(lookup_errors)
+        failed_ids = {id_ for error in lookup_errors for id_ in error["external_ids"]}
 
-        ## (b) Processing the results of the SPARQL query on Wikidata and saving the results as a CSV
+        records, matched_viaf_ids, not_matched_automatically_viaf_ids, chunk_errors = enrich_by_external_id(
+            [id_ for id_ in author_ids if id_ not in failed_ids], EXTERNAL_ID_PROPERTIES['viaf_id'], sparql_setup, matches=matches
+        )
+        error_log.extend(chunk_errors)
 
-        # checking which viaf_ids were matched or not matched
-        # collecting the matched viaf_ids
-        matched_viaf_ids = {result["viafID"]["value"] for result in results["results"]["bindings"]}
-        
         # keeping track of progress
         print(f"[i] The query matched {len(matched_viaf_ids)} VIAF cluster IDs from the MEDIATE 'cleaned_results' list of authors, out of {len(author_ids)}.")
-        
-        # creating a list of not atched viaf_ids
-        not_matched_automatically_viaf_ids = [id_ for id_ in author_ids if id_ not in matched_viaf_ids]
-        
-        # keeping track of progress
         print(f"[i] The query was unable to match {len(not_matched_automatically_viaf_ids)} VIAF cluster IDs from the MEDIATE 'cleaned_results' list of authors, out of {len(author_ids)}.")
         print(f"[i] Will now create a DataFrame to hold the information retrieved from Wikidata for the matched VIAF cluster IDs.")
 
+        # indexing the input rows by viaf_id once, instead of filtering the whole df for every result
+        source_rows_by_viaf_id = df_authors_input.assign(viaf_id_str=df_authors_input["viaf_id"].astype(str)).drop_duplicates(subset="viaf_id_str").set_index("viaf_id_str")
+
         # saving the data of the results as a list of dictionaries before creating the dataframe
         data = []
 
-        for result in results["results"]["bindings"]:
+        for record in records:
             try:
-                viaf_id = result["viafID"]["value"]
-
-                # getting the main author labels in English, French and Latin (standard label)
-                en_label = result.get("itemLabelEN", {}).get("value", "")
-                fr_label = result.get("itemLabelFR", {}).get("value", "")
-                la_label = result.get("itemLabelLA", {}).get("value", "")
-
-                # Getting the QID for each queried author (to allow for cross-database comparison later)
-                qid_uri = result.get("item", {}).get("value", "")
-                qid = qid_uri.split("/")[-1] if qid_uri else None
+                viaf_id = record["external_id"]
+                qid = record["q_identifier"]
                 if not qid:
                     print(f"|!| No QID found for viaf_id: {viaf_id}") # safety check but likely useless
 
-                # Getting the writing language(s) for every author
-                writing_lang_labels = result.get("writingLanguages", {}).get("value", "").split(", ")
-                writing_languages = list(set(filter(None, writing_lang_labels)))  # remove empty strings and duplicates (although unlikely), then transform back into list
-
-                # Getting alternative author labels (aliases) and putting them in the right format for CSV storage
-                aliases_en = result.get("aliasesEnglish", {}).get("value", "").split(", ")
-                aliases_fr = result.get("aliasesFrench", {}).get("value", "").split(", ")
-                aliases_la = result.get("aliasesLatin", {}).get("value", "").split(", ")
-
-                # again, removing empty strings, duplicates and returning everything as lists
-                aliases_en = list(set(filter(None, aliases_en)))
-                aliases_fr = list(set(filter(None, aliases_fr)))
-                aliases_la = list(set(filter(None, aliases_la)))
-
                 # mapping matched viaf_id back to the initial df_authors_input to extract some information from there and use it in the last CSV
-                source_row = df_authors_input.loc[df_authors_input["viaf_id"].astype(str) == str(viaf_id)] # returns a filtered 'DataFrame' with the row for which viaf_id value matches the viaf_id under consideration
-                source_label = source_row["short_name"].iloc[0] if not source_row.empty else None
-                viaf_id = source_row["viaf_id"].iloc[0] if not source_row.empty else None
-                source_nb_items = source_row["nb_items"].iloc[0] if not source_row.empty else None
-                source_nb_collections = source_row["nb_collections"].iloc[0] if not source_row.empty else None
+                source_row = source_rows_by_viaf_id.loc[viaf_id] if viaf_id in source_rows_by_viaf_id.index else None
 
                 # Storing everything in the output data_dictionary for each author found
                 data.append({
-                    "english_label": en_label,
-                    "french_label": fr_label,
-                    "latin_label": la_label,
+                    "english_label": record["english_label"],
+                    "french_label": record["french_label"],
+                    "latin_label": record["latin_label"],
                     "q_identifier": qid,
-                    f"{source}_label": source_label,
-                    f"viaf_id": viaf_id,
-                    f"{source}_nb_items": source_nb_items,
-                    f"{source}_nb_collections": source_nb_collections,
-                    "english_aliases": aliases_en,
-                    "french_aliases": aliases_fr,
-                    "latin_aliases": aliases_la,
-                    "writing_languages": writing_languages,
+                    f"{source}_label": source_row["short_name"] if source_row is not None else None,
+                    f"viaf_id": source_row["viaf_id"] if source_row is not None else None,
+                    f"{source}_nb_items": source_row["nb_items"] if source_row is not None else None,
+                    f"{source}_nb_collections": source_row["nb_collections"] if source_row is not None else None,
+                    "english_aliases": record["english_aliases"],
+                    "french_aliases": record["french_aliases"],
+                    "latin_aliases": record["latin_aliases"],
+                    "writing_languages": record["writing_languages"],
                 })
 
             # tracking errors inside the results loop
             except Exception as e:
                 error_log.append({
-                "viaf_id": result.get("viafID", {}).get("value", "N/A"),
+                "viaf_id": record.get("external_id", "N/A"),
                 "error": str(e),
                 "traceback": traceback.format_exc()
                 })
@@ -275,7 +203,7 @@ Returns:
     
     # now dealing with the not matched (automatically) viaf_ids from earlier
     if not_matched_automatically_viaf_ids:
-        print(f"|!| Unable to automatically match {len(not_matched_automatically_viaf_ids)} author(s) from the list with their VIAF IDs. Check the CSV and update manually (or use the function defined in 2.2.).")
+        print(f"|!| Unable to automatically match {len(not_matched_automatically_viaf_ids)} author(s) from the list with their VIAF IDs. Check the CSV and update manually (or use the review queue defined in 2.2.).")
 
         # saving the rows to a CSV
         # creating a df holding those rows
@@ -309,114 +237,141 @@ Returns:
 
     return df_ancient_authors_output, output_csv_path, df_not_matched_automatically
 
-## 2.2.: Defining the function to deal with df_not_matched_automatically
+## 2.2.: Defining the function to deal with df_not_matched_automatically (without stopping the pipeline)
 
-def complete_unmatched_with_manual_viaf_interactive(df_matched, df_not_matched, source, sparql_setup, output_csv_dir, error_log_dir, timestamp=None):
+# Columns of the review queue: the reviewer only fills in 'new_viaf_id' (or writes 'skip' in 'status'); 'applied_viaf_id' (last VIAF ID queried) and 'status' are then kept up to date by 2.3.
+REVIEW_QUEUE_COLUMNS = ['short_name', 'viaf_id', 'first_names', 'surname', 'date_of_birth', 'date_of_death', 'nb_items', 'nb_collections', 'wikidata_search', 'new_viaf_id', 'applied_viaf_id', 'status']
+
+def review_patch_rows_path(review_queue_csv, source):
+    # every row currently added to the last CSV by a review decision, with the VIAF ID of its review queue entry ('review_viaf_id'), next to the review queue
+    return os.path.join(os.path.dirname(review_queue_csv), f"02_{source}_viaf_id_review_patch_rows.csv")
+
+def queue_unmatched_for_review(df_matched, df_not_matched, source, output_csv_dir, timestamp=None):
     """
-    Description:
-    Prompts user interactively to input missing VIAF cluster IDs for unmatched authors.
-    These should be searched for on Wikidata (for instance), manually.
-    Then the function re-queries Wikidata for those authors and appends the new matches and their information
-    to the original matched dataframe. Saves the combined result as a new CSV.
-
-    Argumentss:
-        df_matched (pd.DataFrame): DataFrame of already matched authors.
-        df_not_matched (pd.DataFrame): DataFrame of authors not matched in query of previous run.
-        source (str): Used for file naming and column tracking.
-        sparql_setup: SPARQLWrapper setup.
-        output_csv_dir (str): Where to save the CSVs.
-        timestamp (str, optional): To reuse the same timestamp as previous function. Defaults to today's date.
-
-    Returns:
-        last_df: The last DataFrame comibining automatically and semi-automatically queried authors (with VIAF cluster IDs).
+Description:
+Saves the automatically matched authors as the 'last' CSV straight away, so that steps 03-06 can run on it, and writes the authors that were not matched automatically to a review queue (CSV).
+The rows added by review decisions already applied (see 2.3.) are merged back into the last CSV, with their MEDIATE label and counts recomputed from the current input,
+unless the author is now matched automatically.
+The review queue is kept from one run to the next: decisions already taken are preserved and only newly unmatched authors are appended as 'pending'.
+Reviewers can then search for the missing VIAF cluster IDs (on Wikidata for instance) in a separate session and fill in the 'new_viaf_id' column (or write 'skip' in the 'status' column).
+The decisions are applied later with apply_review_decisions() (see 2.3.).
+
+Arguments:
+    df_matched (pd.DataFrame): DataFrame of already matched authors.
+    df_not_matched (pd.DataFrame): DataFrame of authors not matched in query of previous run.
+    source (str): Used for file naming and column tracking.
+    output_csv_dir (str): Where to save the CSVs.
+    timestamp (str, optional): To reuse the same timestamp as previous function. Defaults to today's date.
+
+Returns:
+    tuple: (path to the last CSV, path to the review queue CSV)
+"""
+
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y%m%d')
+
+    output_csv_subdir = f'02_{source}_ancient_authors_csv_wiki'
+    review_queue_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, INTERMEDIATE_TAG)
+    os.makedirs(review_queue_subdir_path, exist_ok=True)
+    review_queue_path = os.path.join(review_queue_subdir_path, f"02_{source}_viaf_id_review_queue.csv")
+
+    # merging back the rows of the review decisions already applied: only for authors still not matched automatically (an automatic match replaces the decision)
+    df_last = df_matched
+    patch_rows_path = review_patch_rows_path(review_queue_path, source)
+    if os.path.exists(patch_rows_path) and not df_not_matched.empty:
+        df_patch_rows = pd.read_csv(patch_rows_path, dtype=str)
+        df_sources = df_not_matched.assign(viaf_id=df_not_matched["viaf_id"].astype(str)).drop_duplicates(subset="viaf_id").set_index("viaf_id")
+        df_patch_rows = df_patch_rows[df_patch_rows["review_viaf_id"].isin(df_sources.index) & ~df_patch_rows["viaf_id"].isin(df_matched.get("viaf_id", pd.Series(dtype=str)).astype(str))].copy()
+
+        # recomputing the columns derived from the MEDIATE input (label and counts may have changed since the decision was applied)
+        for column, source_column in ((f"{source}_label", "short_name"), (f"{source}_nb_items", "nb_items"), (f"{source}_nb_collections", "nb_collections")):
+            df_patch_rows[column] = df_patch_rows["review_viaf_id"].map(df_sources[source_column]).values
+
+        df_last = pd.concat([df_matched, df_patch_rows.drop(columns="review_viaf_id")], ignore_index=True)
+        print(f"[i] Merged back {len(df_patch_rows)} row(s) from the review decisions already applied.")
+
+    # saving the matched authors as the 'last' CSV without waiting for the review
+    last_output_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, LAST_TAG)
+    os.makedirs(last_output_subdir_path, exist_ok=True)
+    last_output_path = os.path.join(last_output_subdir_path, f"02_{timestamp}_{source}_ancient_authors_wiki_labelled_last.csv")
+    df_last.to_csv(last_output_path, index=False)
+    print(f"|Y| Last results saved to: {last_output_path} (total entries: {len(df_last)}). Steps 03-06 can run on it while the unmatched authors are being reviewed.")
+
+    # loading the existing review queue (if any) so that decisions from previous sessions are kept
+
+    if os.path.exists(review_queue_path):
+        df_review_queue = pd.read_csv(review_queue_path, dtype=str)
+    else:
+        df_review_queue = pd.DataFrame(columns=REVIEW_QUEUE_COLUMNS)
+
+    # appending only the authors that are not in the queue yet (based on their initial viaf_id)
+    df_new_entries = df_not_matched[~df_not_matched["viaf_id"].astype(str).isin(df_review_queue["viaf_id"].astype(str))].copy()
+    df_new_entries = df_new_entries.reindex(columns=REVIEW_QUEUE_COLUMNS)
+    df_new_entries["wikidata_search"] = df_new_entries["short_name"].astype(str).map(lambda label: f"https://www.wikidata.org/wiki/Special:Search?search={label.replace(' ', '+')}")
+    df_new_entries["status"] = "pending"
+
+    df_review_queue = pd.concat([df_review_queue, df_new_entries.astype(str).replace('nan', '')], ignore_index=True)
+    df_review_queue.to_csv(review_queue_path, index=False)
+
+    nb_pending = (df_review_queue["status"] == "pending").sum()
+    print(f"[i] Added {len(df_new_entries)} author(s) to the review queue ({nb_pending} pending in total): {review_queue_path}.")
+    print(f"[guidelines] Fill in 'new_viaf_id' for the authors you find (or write 'skip' in 'status'), then run apply_review_decisions() (see APPLY_REVIEW_DECISIONS).")
+
+    return last_output_path, review_queue_path
+
+## 2.3.: Defining the function to apply the decisions of a review session as an incremental patch
+
+def apply_review_decisions(last_csv, review_queue_csv, source, sparql_setup, output_csv_dir, error_log_dir, timestamp=None):
     """
+Description:
+Applies the decisions entered in the review queue (see 2.2.) to the last CSV. Only the VIAF cluster IDs that were newly entered since the last application are re-queried on Wikidata,
+and only the corresponding rows of the last CSV are replaced or added. The review queue is then updated ('applied' or 'not_matched') and the patch is saved separately
+so that the affected rows can be traced downstream.
+Limitation: the patch stops at the step 02 CSV. It is not propagated row by row through the later steps: steps 04 to 06, which read the last CSV of step 02
+(directly or through step 05), have to be re-run on the patched CSV (step 03 does not depend on it).
+
+Arguments:
+    last_csv (str): Path to the last CSV to patch (output of 2.2. or of a previous call to this function).
+    review_queue_csv (str): Path to the review queue CSV (output of 2.2.).
+    source (str): Used for file naming and column tracking.
+    sparql_setup: SPARQLWrapper setup.
+    output_csv_dir (str): Where to save the CSVs.
+    error_log_dir (str): Path to the directory to save error logs.
+    timestamp (str, optional): Defaults to today's date.
+
+Returns:
+    last_df: The patched DataFrame combining automatically and semi-automatically queried authors (with VIAF cluster IDs).
+"""
 
     if timestamp is None:
         timestamp = datetime.now().strftime('%Y%m%d')
 
-    # creating a list to hold the dictionaries containing the information regarding viaf_ids to be entered manually
-    manual_entries = []
+    df_review_queue = pd.read_csv(review_queue_csv, dtype=str).fillna('')
+    last_df = pd.read_csv(last_csv, dtype={"viaf_id": str, "q_identifier": str})
 
-    # creating a list to hold the dictionaries containing information of skipped entries
-    skipped_entries = []
-    
-    print(f"\n>>>> Proceeding to correct viaf_ids manually <<<<")
-    print(f"[guidelines] For each unmatched author, you can paste a valid VIAF ID from Wikidata (or leave empty to skip).\n")
-
-    for i, (_, row) in enumerate(df_not_matched.iterrows(), start=1):
-        label = row.get("short_name", "N/A")
-        dob = row.get("date_of_birth", "N/A")
-        dod = row.get("date_of_death", "N/A")
-        first_names = row.get("first_names", "N/A")
-        surname = row.get("surname", "N/A")
-        items = row.get("nb_items", "N/A")
-        collections = row.get("nb_collections", "N/A")
-        initial_id = row.get("viaf_id", "N/A")
-        
-        print(f"[{i}/{len(df_not_matched)}] Processing author {i}:")
-        print(f"[{i}/{len(df_not_matched)}] Short name: {label}")
-        print(f"[{i}/{len(df_not_matched)}] Full name: {first_names}, {surname}")
-        print(f"[{i}/{len(df_not_matched)}] DOB: {dob} | DOD: {dod}")
-        print(f"[{i}/{len(df_not_matched)}] Search on: https://www.wikidata.org/wiki/Special:Search?search={label.replace(' ', '+')}")
-        
-        viaf_id = input("[ACTION REQUIRED] Enter new VIAF ID (or press Enter to skip): ").strip()
-
-        if viaf_id:
-            manual_entries.append({
-                "short_name": label,
-                "new_viaf_id": viaf_id,
-                "nb_items": items,
-                "nb_collections": collections
-            })
-        else:
-            skipped_entries.append({
-                "short_name": label,
-                "initial_viaf_id": initial_id,
-                "first_names": first_names,
-                "surname": surname,
-                "date_of_birth": dob,
-                "date_of_death": dod,
-                "nb_items": items,
-                "nb_collections": collections
-            })
-
-    if not manual_entries:
-        print("|!| No VIAF IDs entered. Skipping re-query.")
-        return df_matched, df_not_matched
-
-    # saving skipped entries before proceeding to the re-query
-    if skipped_entries:
-        print(f"[i] Skipped {len(skipped_entries)} entries from the not_matched_automatically_csv. Saving those separately.")
-        
-        # creating the df
-        df_skipped_not_matched_authors = pd.DataFrame(skipped_entries)
-
-        # creating the appropriate subdir and path
-        output_csv_subdir = f'02_{source}_ancient_authors_csv_wiki'
-        output_csv_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, INTERMEDIATE_TAG)
-        os.makedirs(output_csv_subdir_path, exist_ok=True)
-        skipped_not_matched_authors_csv_path = os.path.join(output_csv_subdir_path, f"02_{timestamp}_{source}_skipped_authors_not_matched_viaf_ids.csv")
-        
-        # saving the df to CSV
-        df_skipped_not_matched_authors.to_csv(skipped_not_matched_authors_csv_path, index=False)
-        
-        # keeping track of progress
-        print(f"[i] Skipped authors (no VIAF entered) successfully saved to: {skipped_not_matched_authors_csv_path}.")
+    # only the decisions that have not been applied yet (new or corrected VIAF IDs)
+    new_decisions = (df_review_queue["new_viaf_id"].str.strip() != "") & (df_review_queue["new_viaf_id"].str.strip() != df_review_queue["applied_viaf_id"].str.strip()) & (df_review_queue["status"] != "skip")
+    df_decisions = df_review_queue[new_decisions].copy()
+    df_decisions["new_viaf_id"] = df_decisions["new_viaf_id"].str.strip()
+
+    if df_decisions.empty:
+        print("|!| No new VIAF IDs entered in the review queue. Nothing to patch.")
+        return last_df
 
-    # converting results to a dataframe to re-run the query
-    print(f"[i] Will now create a DF to hold the results from the re-query of manually entered VIAF cluster IDs.")
-    df_manually_entered_viaf_ids = pd.DataFrame(manual_entries)
+    print(f"[i] Applying {len(df_decisions)} new decision(s) from the review queue.")
 
-    # running the initial SPARQL query on the updated entries
+    # saving the entries as the input of the re-query (same format as the cleaned results: short_name, viaf_id, nb_items, nb_collections)
     output_csv_subdir = f'02_{source}_ancient_authors_csv_wiki'
     output_csv_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, INTERMEDIATE_TAG)
     os.makedirs(output_csv_subdir_path, exist_ok=True)
     output_manually_entered_viaf_ids_csv_path = os.path.join(output_csv_subdir_path, f"02_{timestamp}_{source}_authors_manually_added_viaf_ids.csv")
+
+    df_manually_entered_viaf_ids = df_decisions[["short_name", "new_viaf_id", "nb_items", "nb_collections"]].rename(columns={"new_viaf_id": "viaf_id"})
     df_manually_entered_viaf_ids.to_csv(output_manually_entered_viaf_ids_csv_path, index=False)
 
-    print("[i] Querying Wikidata for manually entered VIAF IDs...\n")
+    print("[i] Querying Wikidata for the newly entered VIAF IDs only...\n")
 
-    df_semi_manually_queried_authors, _, _ = retrieve_qids_aliases_lang_wikidata(
+    df_patch, _, _ = retrieve_qids_aliases_lang_wikidata(
         input_author_list=output_manually_entered_viaf_ids_csv_path,
         source=source,
         sparql_setup=sparql_setup,
@@ -425,34 +380,69 @@ def complete_unmatched_with_manual_viaf_interactive(df_matched, df_not_matched,
         specific_ids=df_manually_entered_viaf_ids["viaf_id"].tolist()
     )
 
-    # combining the initially matched viaf_ids authors with the newly corrected ones
-    last_df = pd.concat([df_matched, df_semi_manually_queried_authors], ignore_index=True)
+    matched_viaf_ids = set(df_patch["viaf_id"].astype(str)) if not df_patch.empty else set()
+
+    # replacing only the affected rows: rows from a previously applied (now corrected) decision are dropped, new matches are added
+    superseded_viaf_ids = set(df_decisions["applied_viaf_id"]) - {""}
+    affected_viaf_ids = superseded_viaf_ids | matched_viaf_ids
+    last_df = pd.concat([last_df[~last_df["viaf_id"].astype(str).isin(affected_viaf_ids)], df_patch], ignore_index=True)
+
+    # keeping every applied row with the VIAF ID of its review queue entry, so that a full re-run of 2.1. and 2.2. merges it back into the last CSV
+    patch_rows_path = review_patch_rows_path(review_queue_csv, source)
+    df_patch_rows = pd.read_csv(patch_rows_path, dtype=str) if os.path.exists(patch_rows_path) else pd.DataFrame(columns=["viaf_id", "review_viaf_id"])
+    review_viaf_ids = dict(zip(df_decisions["new_viaf_id"], df_decisions["viaf_id"]))
+    df_new_rows = df_patch.assign(review_viaf_id=df_patch["viaf_id"].astype(str).map(review_viaf_ids)) if not df_patch.empty else pd.DataFrame(columns=["viaf_id", "review_viaf_id"])
+    df_patch_rows = pd.concat([df_patch_rows[~df_patch_rows["viaf_id"].isin(affected_viaf_ids)], df_new_rows], ignore_index=True)
+    df_patch_rows.to_csv(patch_rows_path, index=False)
+
+    # updating the review queue
+    for index, row in df_decisions.iterrows():
+        df_review_queue.loc[index, "applied_viaf_id"] = row["new_viaf_id"] # keeping track of the VIAF IDs already tried so that they are not re-queried
+        if row["new_viaf_id"] in matched_viaf_ids:
+            df_review_queue.loc[index, "status"] = "applied"
+        else:
+            df_review_queue.loc[index, "status"] = "not_matched" # the entered VIAF ID did not match either: enter another one in a later review session
+
+    df_review_queue.to_csv(review_queue_csv, index=False)
+    print(f"[i] Review queue updated: {(df_review_queue['status'] == 'applied').sum()} applied, {(df_review_queue['status'] == 'not_matched').sum()} not matched, {(df_review_queue['status'] == 'pending').sum()} pending.")
 
-    # saving the concatanated df as a CSV holding the updated mediate_ancient_authors_wiki_labelled_all
-    # creating the appropriate subdir and path
+    # saving the patch itself (rows added or replaced in this session)
+    patch_path = os.path.join(output_csv_subdir_path, f"02_{timestamp}_{source}_review_patch.csv")
+    df_patch.to_csv(patch_path, index=False)
+    print(f"[i] Patch ({len(df_patch)} rows) saved to: {patch_path}.")
+
+    # saving the patched last CSV
     last_output_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, LAST_TAG)
     os.makedirs(last_output_subdir_path, exist_ok=True)
-    last_output_name = f"02_{timestamp}_{source}_ancient_authors_wiki_labelled_last.csv"
-    last_output_path = os.path.join(last_output_subdir_path, last_output_name)
+    last_output_path = os.path.join(last_output_subdir_path, f"02_{timestamp}_{source}_ancient_authors_wiki_labelled_last.csv")
     last_df.to_csv(last_output_path, index=False)
 
-    print(f"|Y| Last combined results saved to: {last_output_path}. Total entries in last_df: {len(last_df)}.")
+    print(f"|Y| Patched last results saved to: {last_output_path}. Total entries in last_df: {len(last_df)}.")
 
     return last_df
 
 
-### Step 3: Calling both functions
+### Step 3: Calling the functions
 
 if __name__ == "__main__":
-    df_matched, _, df_not_matched = retrieve_qids_aliases_lang_wikidata(
-        INPUT_AUTHOR_LIST, SOURCE, SPARQL, OUTPUT_CSV_DIR, ERROR_LOG_DIR
-    )
-
-    last_df = complete_unmatched_with_manual_viaf_interactive(
-        df_matched=df_matched,
-        df_not_matched=df_not_matched,
-        source=SOURCE,
-        sparql_setup=SPARQL,
-        output_csv_dir=OUTPUT_CSV_DIR,
-        error_log_dir=ERROR_LOG_DIR
-    )
+    if APPLY_REVIEW_DECISIONS:
+        # applying the decisions of a separate review session to the last CSV (no full re-query)
+        last_df = apply_review_decisions(
+            last_csv=LAST_CSV_TO_PATCH,
+            review_queue_csv=REVIEW_QUEUE_CSV,
+            source=SOURCE,
+            sparql_setup=SPARQL,
+            output_csv_dir=OUTPUT_CSV_DIR,
+            error_log_dir=ERROR_LOG_DIR
+        )
+    else:
+        df_matched, _, df_not_matched = retrieve_qids_aliases_lang_wikidata(
+            INPUT_AUTHOR_LIST, SOURCE, SPARQL, OUTPUT_CSV_DIR, ERROR_LOG_DIR, crosswalk_csv=CROSSWALK_CSV
+        )
+
+        last_csv_path, review_queue_csv_path = queue_unmatched_for_review(
+            df_matched=df_matched,
+            df_not_matched=df_not_matched,
+            source=SOURCE,
+            output_csv_dir=OUTPUT_CSV_DIR
+        )
@@ -4,10 +4,12 @@
 import os
 import pandas as pd
 import json
-from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper import SPARQLWrapper
 
 from datetime import datetime
 import traceback
+from wikidata_enrichment import enrich_by_external_id, EXTERNAL_ID_PROPERTIES
+from identifier_crosswalk import load_crosswalk, save_crosswalk, ids_to_qids
 
 
 ### Step 1: Defining relevant directories, file paths and variables
@@ -26,6 +28,7 @@ ERROR_LOG_DIR = r'path_to\use-case-2\output\error_logs'
 ## 1.4. SPARQL endpoint
 SPARQL = SPARQLWrapper("https://query.wikidata.org/sparql",
                        agent="your_role - your_email@email.com")
+CROSSWALK_CSV = r'path_to\use-case-2\output\identifier_crosswalk\identifier_crosswalk.csv' # TM IDs already known locally (see identifier_crosswalk.py) are not matched online again; set to None to match every ID online
 ## 1.5. Other
 
 INTERMEDIATE_TAG = '03_intermediate'
@@ -33,7 +36,7 @@ LAST_TAG = '03_last'
 
 ### Step 2: Defining the function to get the QID, the English, French and Latin labels, the English, French, Latin aliases and the writing language(s) from the authors listed
 
-def retrieve_qids_aliases_lang_trismegistos_wikidata(input_authors_list, source, sparql_setup, output_directory, error_log_dir, specific_ids=None, nb_ids=None):
+def retrieve_qids_aliases_lang_trismegistos_wikidata(input_authors_list, source, sparql_setup, output_directory, error_log_dir, specific_ids=None, nb_ids=None, crosswalk_csv=None):
 
     """
 Queries Wikidata for authors in a Trismegistos CSV using their TM ID, retrieving English, French and Lain labels & aliases,
@@ -47,6 +50,7 @@ Arguments:
     error_log_dir (str): Directory to save error logs.
     specific_ids (list, optional): List of TM IDs to filter. Defaults to None.
     nb_ids (int, optional): Limit number of authors to query. Defaults to None.
+    crosswalk_csv (str, optional): Path to the identifier crosswalk; TM IDs found there are not matched online again. Defaults to None.
 
 Returns:
     tuple: (DataFrame of results, path to output CSV)
@@ -55,6 +59,7 @@ Returns:
     df_ancient_authors_output = pd.DataFrame()  # empty dataframe as fallback
     output_csv_path = None
     output_name = None
+    unmatched_tm_ids = []
 
     # creating the timestamp early for naming purposes
     timestamp = datetime.now().strftime('%Y%m%d')
@@ -83,136 +88,53 @@ Returns:
             print("|!| No author_ids found. Check CSV or default parameter specific_ids = [].")
             return None
 
-        # feeding the target author ids to the SPARQL query
-        values_block = " ".join(f'"{id}"' for id in author_ids)
+        ## (b) Querying Wikidata in chunks (see wikidata_enrichment.py) and processing the results
 
-        # setting up the SPARQL query
+        # resolving the IDs to QIDs from the crosswalk first (see identifier_crosswalk.py): only the IDs missing from it are matched online
+        crosswalk = load_crosswalk(crosswalk_csv) if crosswalk_csv else None
+        matches, lookup_errors = ids_to_qids(crosswalk, author_ids, 'trismegistos_id', sparql_setup) if crosswalk else (None, [])
+        if crosswalk and crosswalk['changed']:
+            save_crosswalk(crosswalk, crosswalk_csv)
+        # IDs whose lookup failed go to the error_log (to be queried again), not to the unmatched IDs
+        error_log.extend(lookup_errors)
+        failed_ids = {id_ for error in lookup_errors for id_ in error["external_ids"]}
 
-        query = f"""
+        records, matched_tm_ids, unmatched_tm_ids, chunk_errors = enrich_by_external_id(
+            [id_ for id_ in author_ids if id_ not in failed_ids], EXTERNAL_ID_PROPERTIES['trismegistos_id'], sparql_setup, matches=matches
+        )
+        error_log.extend(chunk_errors)
 
-    SELECT ?trismegistosID ?item ?itemLabelEN ?itemLabelFR ?itemLabelLA
-        (GROUP_CONCAT(DISTINCT ?aliasEnglish; SEPARATOR=", ") AS ?aliasesEnglish)
-        (GROUP_CONCAT(DISTINCT ?aliasFrench; SEPARATOR=", ") AS ?aliasesFrench)
-        (GROUP_CONCAT(DISTINCT ?aliasLatin; SEPARATOR=", ") AS ?aliasesLatin)
-        (GROUP_CONCAT(DISTINCT ?writingLangLabelEN; SEPARATOR=", ") AS ?writingLanguages)
-
-    WHERE {{
-    
-    VALUES ?trismegistosID {{ {values_block} }}
-    ?item wdt:P11252 ?trismegistosID.
-
-    OPTIONAL {{
-    ?item rdfs:label ?itemLabelEN.
-    FILTER(LANG(?itemLabelEN) = "en")
-    }}
-
-    OPTIONAL {{
-        ?item rdfs:label ?itemLabelFR.
-        FILTER(LANG(?itemLabelFR) = "fr")
-    }}
-
-    OPTIONAL {{
-        ?item rdfs:label ?itemLabelLA.
-        FILTER(LANG(?itemLabelLA) = "la")
-    }}
-      
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasEnglish.
-        FILTER(LANG(?aliasEnglish) = "en")
-    }}
-
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasFrench.
-        FILTER(LANG(?aliasFrench) = "fr")
-    }}
-
-    OPTIONAL {{
-        ?item skos:altLabel ?aliasLatin.
-        FILTER(LANG(?aliasLatin) = "la")
-    }}
-
-    OPTIONAL {{
-        ?item wdt:P6886 ?writingLang.
-        ?writingLang rdfs:label ?writingLangLabelEN.
-        FILTER(LANG(?writingLangLabelEN) = "en")
-    }}
-
-    }}
-    GROUP BY ?trismegistosID ?item ?itemLabelEN ?itemLabelFR ?itemLabelLA
-    """
-
-
-        # Calling the query
-        sparql_setup.setQuery(query)
-        sparql_setup.setReturnFormat(JSON)
-        results = sparql_setup.query().convert()
-
-        # quick check (commented out)
-        # print(json.dumps(results, indent=2)) 
-
-        # checking which viaf_ids were matched or unmatched
-        # collecting the matched tm_ids
-        matched_tm_ids = {result["trismegistosID"]["value"] for result in results["results"]["bindings"]}
-        
-        # creating a list of unmatched viaf_ids
-        unmatched_tm_ids = [id_ for id_ in author_ids if id_ not in matched_tm_ids]
-
-        ## (b) Processing the results of the SPARQL query on Wikidata and saving the results as a CSV
+        # indexing the input rows by TM ID once, instead of filtering the whole df for every result
+        source_labels_by_tm_id = df_authors_input.assign(tm_id_str=df_authors_input["ID"].astype(str)).drop_duplicates(subset="tm_id_str").set_index("tm_id_str")["Author Name"]
 
         # saving the data of the results as a list of dictionaries before creating the dataframe
         data = []
 
-        for result in results["results"]["bindings"]:
+        for record in records:
             try:
-                tm_id = result["trismegistosID"]["value"]
-                
-                # getting the English, French and Latin labels for matched authors
-                en_label = result.get("itemLabelEN", {}).get("value", "")
-                fr_label = result.get("itemLabelFR", {}).get("value", "")
-                la_label = result.get("itemLabelLA", {}).get("value", "")
-
-                # Getting the QID for each queried author (to allow for cross-database comparison later)
-                qid_uri = result.get("item", {}).get("value", "")
-                qid = qid_uri.split("/")[-1] if qid_uri else None
+                tm_id = record["external_id"]
+                qid = record["q_identifier"]
                 if not qid:
                     print(f"|!| No QID found for tm_id: {tm_id}") # unlikely since here we are only dealing with 'matched' TM IDs
 
-                # Getting the writing language(s) for every author
-                writing_lang_labels = result.get("writingLanguages", {}).get("value", "").split(", ")
-                writing_languages = list(set(filter(None, writing_lang_labels)))  # remove empty strings and deduplicate
-
-                # Getting alternative author labels (aliases) and putting them in the right format for CSV storage
-                aliases_en = result.get("aliasesEnglish", {}).get("value", "").split(", ")
-                aliases_fr = result.get("aliasesFrench", {}).get("value", "").split(", ")
-                aliases_la = result.get("aliasesLatin", {}).get("value", "").split(", ")
-
-                # making sure there are no duplicates for each series of aliases
-                aliases_en = list(set(filter(None, aliases_en)))
-                aliases_fr = list(set(filter(None, aliases_fr)))
-                aliases_la = list(set(filter(None, aliases_la)))
-
-                # mapping matched tm_ids back to the initial list to extract some information from there and use it in the final CSV
-                source_row = df_authors_input.loc[df_authors_input["ID"].astype(str) == str(tm_id)]
-                source_label = source_row["Author Name"].iloc[0] if not source_row.empty else None
-
                 # Storing everything in the output data_dictionary for each author found
                 data.append({
-                    "english_label": en_label,
-                    "french_label": fr_label,
-                    "latin_label": la_label,
+                    "english_label": record["english_label"],
+                    "french_label": record["french_label"],
+                    "latin_label": record["latin_label"],
                     "q_identifier": qid,
-                    f"{source}_label": source_label,
+                    f"{source}_label": source_labels_by_tm_id.get(tm_id), # mapping matched tm_ids back to the initial list
                     f"{source}_id": tm_id,
-                    "english_aliases": aliases_en,
-                    "french_aliases": aliases_fr,
-                    "latin_aliases": aliases_la,
-                    "writing_languages": writing_languages
+                    "english_aliases": record["english_aliases"],
+                    "french_aliases": record["french_aliases"],
+                    "latin_aliases": record["latin_aliases"],
+                    "writing_languages": record["writing_languages"]
                 })
 
             # tracking errors inside the results loop
             except Exception as e:
                 error_log.append({
-                "tm_id": result.get("trismegistosID", {}).get("value", "N/A"),
+                "tm_id": record.get("external_id", "N/A"),
                 "error": str(e),
                 "traceback": traceback.format_exc()
                 })
@@ -306,4 +228,4 @@ Returns:
 ### Step 3: Calling the function to retrieve QIDs, labels, aliases and writing languages associated with authors from the Trismegistos list
 
 if __name__ == "__main__":
-    retrieve_qids_aliases_lang_trismegistos_wikidata(INPUT_AUTHORS_LIST, SOURCE, SPARQL, OUTPUT_CSV_DIR, ERROR_LOG_DIR)
\ No newline at end of file
+    retrieve_qids_aliases_lang_trismegistos_wikidata(INPUT_AUTHORS_LIST, SOURCE, SPARQL, OUTPUT_CSV_DIR, ERROR_LOG_DIR, crosswalk_csv=CROSSWALK_CSV)
\ No newline at end of file
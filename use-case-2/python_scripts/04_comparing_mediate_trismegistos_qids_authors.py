@@ -5,6 +5,9 @@ import os
 import pandas as pd
 from datetime import datetime
 import traceback
+from SPARQLWrapper import SPARQLWrapper
+from identifier_resolver import load_redirect_cache, save_redirect_cache, rewrite_identifier_column
+from identity_graph import build_identity_clusters, edges_from_dataframe, edges_from_wikidata_ids_csv, edges_from_with_precision_csv, cluster_of
 
 ### Step 1: Defining relevant directories, file paths and variables
 
@@ -13,12 +16,22 @@ import traceback
 TRISMEGISTOS_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\03_trismegistos_ancient_authors_csv_wiki\03_last\03_20250914_trismegistos_ancient_authors_wiki_labelled.csv'
 MEDIATE_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\02_mediate_ancient_authors_csv_wiki\02_last\02_20250912_mediate_ancient_authors_wiki_labelled_last.csv'
 
+# identifier tables from use case 3, used to link QIDs that share identifiers (see identity_graph.py); set to None to only use the identifiers of both lists
+WIKIDATA_IDS_CSV = r'path_to\use-case-3\ancient_authors_wikidata_ids.csv'
+WIKIDATA_WITH_PRECISION_CSV = r'path_to\use-case-3\ancient_authors_wikidata_with_precision.csv'
+
 ## 1.2. Directories
 
 OUTPUT_CSV_DIR = r'path_to\use-case-2\output\authors_csv'
 ERROR_LOG_DIR = r'path_to\use-case-2\output\error_logs'
 
-## 1.3. Other
+## 1.3. Resolving redirected and merged QIDs before comparing (see identifier_resolver.py); set REDIRECTS_CACHE_CSV to None to skip
+
+REDIRECTS_CACHE_CSV = r'path_to\use-case-2\output\identifier_redirects\identifier_redirects_cache.csv'
+SPARQL = SPARQLWrapper("https://query.wikidata.org/sparql",
+                       agent="your_role - your_email@email.com")
+
+## 1.4. Other
 
 INTERMEDIATE_TAG = '04_intermediate'
 LAST_TAG = '04_last'
@@ -27,17 +40,24 @@ LAST_TAG = '04_last'
 
 ## 2.1. : Defining the function to compare both CSVs, save lists of exclusive authors, intersection and union (new 'master', but incomplete (nb_items, nb_collections), CSV)
 
-def comparing_mediate_and_trismegistos_authors(trismegistos_authors_csv, mediate_authors_csv, output_csv_dir, error_log_dir):
+def comparing_mediate_and_trismegistos_authors(trismegistos_authors_csv, mediate_authors_csv, output_csv_dir, error_log_dir, wikidata_ids_csv=None, with_precision_csv=None, redirects_cache_csv=None, sparql_setup=None):
     """
 Description:
 Using previously obtained lists of MEDIATE and Trismegistos authors enriched with Wikidata information, compares both lists using QIDs in order to obtain lists of exclusive authors for both sources, 
 as well as the intersection and the union of both lists.
+QIDs are first grouped into identity clusters (see identity_graph.py): QIDs sharing a VIAF, Trismegistos (or, with the use case 3 tables, BnF, Perseus, ...) ID belong to the same author.
+The comparison is made on these clusters: rows of the same QID within one list are collapsed into one (instead of being thrown away), and clusters holding several QIDs are saved for review
+and left out of the comparison.
 
 Arguments:
 trismegistos_authors_csv: list of canonical Trismegistos authors enriched with Wikidata QIDs, labels, aliases and writing languages (CSV).
 mediate_authors_csv: list of MEDIATE ancient authors enriched with Wikidata QIDs, labels, aliases and writing languages (CSV).
 output_csv_dir: directory where the 4 resulting CSVs should be saved.
 error_log_dir: directory where the potentially encountered errors should be saved as CSV.
+wikidata_ids_csv (optional): path to ancient_authors_wikidata_ids.csv (use case 3) to add its identifiers to the identity graph. Defaults to None.
+with_precision_csv (optional): path to ancient_authors_wikidata_with_precision.csv (use case 3) to add its VIAF and BnF IDs to the identity graph. Defaults to None.
+redirects_cache_csv (optional): path to the cache of resolved identifiers; if given, QIDs of both lists are rewritten to their current (non-redirected) QID before comparing. Defaults to None.
+sparql_setup (optional): SPARQLWrapper setup used to look up QIDs missing from the cache. Defaults to None (cache only).
 
 Returns:
 df_exclusive_trismegistos: the DataFrame containing information regarding exclusive authors from the Trismegistos list (based on QID comparison)
@@ -64,15 +84,39 @@ df_union: the DataFrame containing the information regarding authors comprising
         df_trismegistos["q_identifier"] = df_trismegistos["q_identifier"].astype(str).str.strip()
         df_mediate["q_identifier"] = df_mediate["q_identifier"].astype(str).str.strip()
 
+        # rewriting redirected QIDs (merged Wikidata items) to their target, otherwise the same author would be compared under two QIDs
+        if redirects_cache_csv:
+            redirect_cache = load_redirect_cache(redirects_cache_csv)
+            rewrite_identifier_column(df_trismegistos, "q_identifier", "qid", redirect_cache, sparql_setup, online=sparql_setup is not None)
+            rewrite_identifier_column(df_mediate, "q_identifier", "qid", redirect_cache, sparql_setup, online=sparql_setup is not None)
+            save_redirect_cache(redirect_cache, redirects_cache_csv)
+
+        # grouping QIDs into identity clusters (union-find over QID - VIAF - Trismegistos (- use case 3 IDs) edges) and tagging every row with the canonical ID of its cluster
+        identity_edges = edges_from_dataframe(df_trismegistos, "q_identifier", {"viaf_id": "viaf", "trismegistos_id": "trismegistos"}) + edges_from_dataframe(df_mediate, "q_identifier", {"viaf_id": "viaf", "trismegistos_id": "trismegistos"})
+        if wikidata_ids_csv:
+            identity_edges += edges_from_wikidata_ids_csv(wikidata_ids_csv)
+        if with_precision_csv:
+            identity_edges += edges_from_with_precision_csv(with_precision_csv)
+        node_to_cluster, _ = build_identity_clusters(identity_edges)
+
+        # rows without a cluster (no valid QID) get a key of their own, so that they are neither collapsed together nor matched with rows of the other list
+        df_trismegistos["identity_cluster"] = [cluster_of(node_to_cluster, "qid", qid) or f"unclustered_trismegistos_{position}" for position, qid in enumerate(df_trismegistos["q_identifier"])]
+        df_mediate["identity_cluster"] = [cluster_of(node_to_cluster, "qid", qid) or f"unclustered_mediate_{position}" for position, qid in enumerate(df_mediate["q_identifier"])]
+
         # checking for duplicate QIDs in Trismegistos list (by creating a df holding them)
-        duplicate_qids_trismegistos = df_trismegistos[df_trismegistos.duplicated(subset=["q_identifier"], keep=False)]
-        print(f"[!] Found {len(duplicate_qids_trismegistos)} duplicate q_identifiers in df_trismegistos:")
-        print(duplicate_qids_trismegistos.sort_values("q_identifier"))
+        duplicate_qids_trismegistos = df_trismegistos[df_trismegistos.duplicated(subset=["identity_cluster"], keep=False)]
+        print(f"[!] Found {len(duplicate_qids_trismegistos)} rows of df_trismegistos sharing their identity cluster (same QID or QIDs sharing identifiers):")
+        print(duplicate_qids_trismegistos.sort_values("identity_cluster"))
 
         # checking for duplicate QIDs in MEDIATE list (by creating a df holding them)
-        duplicate_qids_mediate = df_mediate[df_mediate.duplicated(subset=["q_identifier"], keep=False)]
-        print(f"[!] Found {len(duplicate_qids_mediate)} duplicate q_identifiers in df_mediate:")
-        print(duplicate_qids_mediate.sort_values("q_identifier"))
+        duplicate_qids_mediate = df_mediate[df_mediate.duplicated(subset=["identity_cluster"], keep=False)]
+        print(f"[!] Found {len(duplicate_qids_mediate)} rows of df_mediate sharing their identity cluster (same QID or QIDs sharing identifiers):")
+        print(duplicate_qids_mediate.sort_values("identity_cluster"))
+
+        # identifying the clusters holding several QIDs (different Wikidata items linked, possibly transitively, through shared identifiers): keeping any one of them
+        # could throw the wrong author away, so they are parked for review (as the VIAF IDs matching several QIDs in step 05) instead of being collapsed
+        multiple_qids_trismegistos = df_trismegistos[df_trismegistos.groupby("identity_cluster")["q_identifier"].transform("nunique") > 1]
+        multiple_qids_mediate = df_mediate[df_mediate.groupby("identity_cluster")["q_identifier"].transform("nunique") > 1]
         
         # saving the duplicates from each list in separate CSVs
         if len(duplicate_qids_trismegistos) > 0 or len(duplicate_qids_mediate) >0:
@@ -89,9 +133,16 @@ df_union: the DataFrame containing the information regarding authors comprising
                 duplicate_qids_trismegistos.to_csv(duplicates_trismegistos_path, index=False)
                 print(f"[i] Successfully saved {len(duplicate_qids_trismegistos)} duplicates from the Trismegistos list based on QIDs in a separate CSV for later assessment. See: {duplicates_trismegistos_path}")
 
-                # removing identified duplicates from df_trismegistos
-                df_trismegistos = df_trismegistos[~df_trismegistos["q_identifier"].isin(duplicate_qids_trismegistos["q_identifier"])]
-                print(f"[i] Successfully removed {len(duplicate_qids_trismegistos)} duplicates from df_trismegistos.")
+                # parking the clusters holding several QIDs for review
+                if len(multiple_qids_trismegistos) > 0:
+                    multiple_qids_trismegistos_path = os.path.join(duplicates_subdir_path, f"04_{timestamp}_multiple_qids_trismegistos_identity_clusters.csv")
+                    multiple_qids_trismegistos.sort_values("identity_cluster").to_csv(multiple_qids_trismegistos_path, index=False)
+                    df_trismegistos = df_trismegistos.drop(index=multiple_qids_trismegistos.index)
+                    print(f"|!| Warning: {multiple_qids_trismegistos['identity_cluster'].nunique()} identity clusters of df_trismegistos hold more than one QID ({len(multiple_qids_trismegistos)} rows). Left them out of the comparison and saved them for later review. See: {multiple_qids_trismegistos_path}")
+
+                # collapsing the remaining duplicates in df_trismegistos (rows of the same QID)
+                df_trismegistos = df_trismegistos.drop_duplicates(subset=["identity_cluster"], keep="first")
+                print(f"[i] Successfully collapsed the rows of df_trismegistos sharing the same QID into one row per identity cluster.")
 
 
             if len(duplicate_qids_mediate) > 0:
@@ -100,24 +151,31 @@ df_union: the DataFrame containing the information regarding authors comprising
                 duplicate_qids_mediate.to_csv(duplicates_mediate_path, index=False)
                 print(f"[i] Successfully saved {len(duplicate_qids_mediate)} duplicates from the MEDIATE list based on QIDs in a separate CSV for later assessment. See: {duplicates_mediate_path}")
 
-                # removing identified duplicates from df_mediate
-                df_mediate = df_mediate[~df_mediate["q_identifier"].isin(duplicate_qids_mediate["q_identifier"])]
-                print(f"[i] Successfully removed {len(duplicate_qids_mediate)} duplicates from df_mediate.")
+                # parking the clusters holding several QIDs for review
+                if len(multiple_qids_mediate) > 0:
+                    multiple_qids_mediate_path = os.path.join(duplicates_subdir_path, f"04_{timestamp}_multiple_qids_mediate_identity_clusters.csv")
+                    multiple_qids_mediate.sort_values("identity_cluster").to_csv(multiple_qids_mediate_path, index=False)
+                    df_mediate = df_mediate.drop(index=multiple_qids_mediate.index)
+                    print(f"|!| Warning: {multiple_qids_mediate['identity_cluster'].nunique()} identity clusters of df_mediate hold more than one QID ({len(multiple_qids_mediate)} rows). Left them out of the comparison and saved them for later review. See: {multiple_qids_mediate_path}")
+
+                # collapsing the remaining duplicates in df_mediate (rows of the same QID)
+                df_mediate = df_mediate.drop_duplicates(subset=["identity_cluster"], keep="first")
+                print(f"[i] Successfully collapsed the rows of df_mediate sharing the same QID into one row per identity cluster.")
 
         # checking that there are no duplicate QIDs within each df (redundant so commented out, but could be useful)
-        # assert df_trismegistos["q_identifier"].is_unique
-        # assert df_mediate["q_identifier"].is_unique
+        # assert df_trismegistos["identity_cluster"].is_unique
+        # assert df_mediate["identity_cluster"].is_unique
 
-        # identifying exclusive rows for each dataframe
-        df_exclusive_trismegistos = df_trismegistos[~df_trismegistos["q_identifier"].isin(df_mediate["q_identifier"])] # returns the "q_identifier" values from df_trismegistos that are not in df_mediate
-        df_exclusive_mediate = df_mediate[~df_mediate["q_identifier"].isin(df_trismegistos["q_identifier"])] # returns the "q_identifier" values from df_mediate that are not in df_trismegistos
+        # identifying exclusive rows for each dataframe (comparing identity clusters, so that an author recorded under two merged or duplicate QIDs is not counted as exclusive)
+        df_exclusive_trismegistos = df_trismegistos[~df_trismegistos["identity_cluster"].isin(df_mediate["identity_cluster"])].copy() # returns the rows of df_trismegistos whose author is not in df_mediate
+        df_exclusive_mediate = df_mediate[~df_mediate["identity_cluster"].isin(df_trismegistos["identity_cluster"])].copy() # returns the rows of df_mediate whose author is not in df_trismegistos
 
         # printing info statement
         print(f"[i] Found a total of {len(df_exclusive_trismegistos) + len(df_exclusive_mediate)} exclusive rows between both dfs. {len(df_exclusive_trismegistos)} are unique to df_trismegistos and {len(df_exclusive_mediate)} are unique to df_mediate.")
 
         # creating intersection
         # df_shared_mediate = df_mediate[df_mediate["q_identifier"].isin(df_trismegistos["q_identifier"])] # saves the intersection of "q_identifiers" but with the metadata from the df_mediate dataframe
-        df_intersection = pd.merge(df_mediate, df_trismegistos, on="q_identifier", how="inner", suffixes=("_mediate", "_trismegistos")) # returns a df with all columns, hence when columns share the same name, "_mediate" and "_trismegistos" are added to differentiate them
+        df_intersection = pd.merge(df_mediate, df_trismegistos, on="identity_cluster", how="inner", suffixes=("_mediate", "_trismegistos")) # returns a df with all columns, hence when columns share the same name, "_mediate" and "_trismegistos" are added to differentiate them
         print(f"[i] df_mediate and df_trismegistos share a total of {len(df_intersection)} rows based on Q identifiers.")
         print(df_intersection.head())
 
@@ -129,7 +187,7 @@ df_union: the DataFrame containing the information regarding authors comprising
         print(df_intersection.head())
 
         # creating union
-        df_union = pd.merge(df_mediate, df_trismegistos, on="q_identifier", how="outer", suffixes=("_mediate", "_trismegistos"))
+        df_union = pd.merge(df_mediate, df_trismegistos, on="identity_cluster", how="outer", suffixes=("_mediate", "_trismegistos"))
         print(f"[i] While df_trismegistos contained {len(df_trismegistos)} rows and df_mediate contained {len(df_mediate)} rows, df_union contains a total of {len(df_union)} unique rows (based on Q identifiers).")
         print(df_union.shape)
         print(df_union.head())
@@ -162,6 +220,10 @@ df_union: the DataFrame containing the information regarding authors comprising
         print(df_union.shape)
         print(df_union.head())
 
+        # giving the rows without a cluster their empty identity_cluster back
+        for df in (df_exclusive_trismegistos, df_exclusive_mediate, df_intersection, df_union):
+            df.loc[df["identity_cluster"].str.startswith("unclustered_"), "identity_cluster"] = None
+
         # creating the subdirectory that will hold all the dataframes
         output_csv_subdir = f"04_comparing_mediate_and_trismegistos_ancient_authors_qids"
         clean_csv_subdir_path = os.path.join(output_csv_dir, output_csv_subdir, LAST_TAG)
@@ -212,5 +274,5 @@ df_union: the DataFrame containing the information regarding authors comprising
 
 if __name__ == "__main__":
     df_exclusive_trismegistos, df_exclusive_mediate, df_intersection, df_union = comparing_mediate_and_trismegistos_authors(
-        TRISMEGISTOS_AUTHORS_CSV, MEDIATE_AUTHORS_CSV, OUTPUT_CSV_DIR, ERROR_LOG_DIR
+        TRISMEGISTOS_AUTHORS_CSV, MEDIATE_AUTHORS_CSV, OUTPUT_CSV_DIR, ERROR_LOG_DIR, WIKIDATA_IDS_CSV, WIKIDATA_WITH_PRECISION_CSV, REDIRECTS_CACHE_CSV, SPARQL
     )
\ No newline at end of file
@@ -4,10 +4,14 @@
 import os
 import json
 import pandas as pd
-from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper import SPARQLWrapper
 import traceback
 from datetime import datetime
 from collections import defaultdict
+from identifier_resolver import load_redirect_cache, save_redirect_cache, resolve_identifiers, rewrite_identifier_column
+from identity_graph import build_identity_clusters, edges_from_dataframe, edges_from_with_precision_csv, cluster_of, normalise_id_value
+from identifier_crosswalk import load_crosswalk, save_crosswalk, qids_to_ids
+from wikidata_enrichment import run_chunk_query
 
 ### Step 1: Defining important file paths, directories and variables
 
@@ -16,6 +20,10 @@ from collections import defaultdict
 ALL_MEDIATE_AUTHORS_RAW_TABLE_JSON = r'path_to\use-case-2\input\initial_author_lists\mediate\json\mediate_all_authors_table_raw\mediate_all_authors_table_raw.json'
 EXCLUSIVE_TRISMEGISTOS_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\04_comparing_mediate_and_trismegistos_ancient_authors_qids\04_last\04_20250914_exclusive_trismegistos_authors_qids.csv'
 MEDIATE_ANCIENT_AUTHORS_WIKI_LABELLED = r'path_to\use-case-2\output\authors_csv\02_mediate_ancient_authors_csv_wiki\02_last\02_20250912_mediate_ancient_authors_wiki_labelled_last.csv'
+REDIRECTS_CACHE_CSV = r'path_to\use-case-2\output\identifier_redirects\identifier_redirects_cache.csv' # VIAF cluster IDs are rewritten to their current cluster before matching (see identifier_resolver.py); set to None to skip
+RESOLVE_VIAF_IDS_ONLINE = False # looks the VIAF IDs missing from the cache up on viaf.org (one request each); by default only the cache (and the local stand-in of identifier_resolver.py) is used
+WIKIDATA_WITH_PRECISION_CSV = r'path_to\use-case-3\ancient_authors_wikidata_with_precision.csv' # adds the VIAF IDs known in use case 3 to the identity graph used for matching (set to None to only use those retrieved in 2.2.)
+CROSSWALK_CSV = r'path_to\use-case-2\output\identifier_crosswalk\identifier_crosswalk.csv' # the VIAF IDs of the exclusive TM authors are read from the crosswalk (see identifier_crosswalk.py), only QIDs missing from it are queried; set to None to query them all
 
 ## 1.2. Directories
 
@@ -126,7 +134,7 @@ formatted_mediate_json_table_path: the path to the new JSON table containing for
 
 ## 2.2.: retrieving the viaf_ids of the authors in the exclusive_trismegistos_authors_qids
 
-def viaf_ids_trismegistos_authors(exclusive_trimegistos_authors_csv, output_csv_dir, sparql_endpoint, error_log_dir):
+def viaf_ids_trismegistos_authors(exclusive_trimegistos_authors_csv, output_csv_dir, sparql_endpoint, error_log_dir, crosswalk_csv=None):
     """
 Description:
 This functions queries Wikidata for the possible VIAF cluster IDs associated with the set of exclusive Trismegistos authors, using their QIDs (obtained previously).
@@ -138,6 +146,7 @@ exclusive_trismegistos_authors_csv (str): the path to the list containing the se
 output_csv_dir (str): path to the directory where the resulting enriched table of exclusive Trismegistos authors (with their respective VIAF cluster IDs) should be saved.
 sparql_endpoint (SPARQLWrapper): SPARQLWrapper containing endpoint and agent.
 error_log_dir (str): path to the directory where the potentially encountered errors should be saved as CSV.
+crosswalk_csv (str, optional): path to the identifier crosswalk. If given, the VIAF IDs are read from it and only the QIDs it does not know are queried. Defaults to None.
 
 
 Returns:
@@ -156,61 +165,73 @@ trismegistos_exclusive_authors_w_viaf_ids_csv_path (str): the path to the list o
     # getting the list of Qidentifiers from those authors to query them on Wikidata
     exclusive_qids_list = df_exclusive_trismegistos_authors["q_identifier"].tolist()
 
-    # formatting the list so that it is usable in a SPARQL query
-    values_block = " ".join(f"wd:{qid}" for qid in exclusive_qids_list)
+    if crosswalk_csv:
+        # translating the QIDs locally, with one query for the QIDs missing from the crosswalk only (see identifier_crosswalk.py)
+        crosswalk = load_crosswalk(crosswalk_csv)
+        qids_to_viaf_ids, lookup_errors = qids_to_ids(crosswalk, exclusive_qids_list, 'viaf_id', sparql_endpoint)
+        qids_to_viaf_ids_dict = defaultdict(list, qids_to_viaf_ids)
+        if crosswalk['changed']:
+            save_crosswalk(crosswalk, crosswalk_csv)
 
-    # setting the Wikidata query to retrieve the VIAF cluster IDs of those authors
-    # writing the query
-    query = f"""
+        # QIDs whose lookup failed go to the error_log and are left out (rather than counted as authors without VIAF IDs)
+        error_log.extend(lookup_errors)
+        failed_qids = {qid for error in lookup_errors for qid in error["q_identifiers"]}
+        df_exclusive_trismegistos_authors = df_exclusive_trismegistos_authors[~df_exclusive_trismegistos_authors["q_identifier"].isin(failed_qids)]
+
+    else:
+        # formatting the list so that it is usable in a SPARQL query
+        values_block = " ".join(f"wd:{qid}" for qid in exclusive_qids_list)
+
+        # setting the Wikidata query to retrieve the VIAF cluster IDs of those authors
+        # writing the query
+        query = f"""
     
-    SELECT ?item ?itemLabelEN ?viafID
+        SELECT ?item ?itemLabelEN ?viafID
     
-    WHERE {{
-    VALUES ?item {{ {values_block} }}
+        WHERE {{
+        VALUES ?item {{ {values_block} }}
 
-    OPTIONAL {{
-    ?item wdt:P214 ?viafID.
-    }}
+        OPTIONAL {{
+        ?item wdt:P214 ?viafID.
+        }}
 
-    OPTIONAL {{
-    ?item rdfs:label ?itemLabelEN.
-    FILTER(LANG(?itemLabelEN) = "en")
-    }}
+        OPTIONAL {{
+        ?item rdfs:label ?itemLabelEN.
+        FILTER(LANG(?itemLabelEN) = "en")
+        }}
     
-    }}
-    """
+        }}
+        """
 
-    # calling the Wikidata query
-    sparql_endpoint.setQuery(query)
-    sparql_endpoint.setReturnFormat(JSON)
-    results = sparql_endpoint.query().convert()
+        # calling the Wikidata query (on the pool of endpoints of sparql_endpoint, see sparql_endpoints.py)
+        results = run_chunk_query(sparql_endpoint.endpoint, sparql_endpoint.agent, query)
 
-    # quick results check (commented out)
-    # print(json.dumps(results, indent=2)) 
+        # quick results check (commented out)
+        # print(json.dumps(results, indent=2)) 
 
-    # saving the data of the results as a dictionary of lists (QIDs as keys and lists of viaf_ids as values)
-    # this step is necessary because if multiple VIAF cluster IDs available for same QID, the query will return one row per VIAF ID associated with this QID (hence several rows for the same QID)
-    qids_to_viaf_ids_dict = defaultdict(list) # creates a special type of dictionary where each key automatically gets an empty list as value - if a key is accessed that does not exist, it creates it
+        # saving the data of the results as a dictionary of lists (QIDs as keys and lists of viaf_ids as values)
+        # this step is necessary because if multiple VIAF cluster IDs available for same QID, the query will return one row per VIAF ID associated with this QID (hence several rows for the same QID)
+        qids_to_viaf_ids_dict = defaultdict(list) # creates a special type of dictionary where each key automatically gets an empty list as value - if a key is accessed that does not exist, it creates it
 
-    for result in results["results"]["bindings"]:
-        try:
-            # retrieving q_identifier from the URI
-            q_identifier = result["item"]["value"].split("/")[-1]  # QID
-            # retrieving the corresponding viaf_id (if available)
-            viaf_id = result.get("viafID", {}).get("value")
+        for result in results["results"]["bindings"]:
+            try:
+                # retrieving q_identifier from the URI
+                q_identifier = result["item"]["value"].split("/")[-1]  # QID
+                # retrieving the corresponding viaf_id (if available)
+                viaf_id = result.get("viafID", {}).get("value")
 
-            # adding to dictionary while preventing duplicate VIAF cluster IDs for the same QID
-            if viaf_id and viaf_id not in qids_to_viaf_ids_dict[q_identifier]:
-                qids_to_viaf_ids_dict[q_identifier].append(viaf_id)
+                # adding to dictionary while preventing duplicate VIAF cluster IDs for the same QID
+                if viaf_id and viaf_id not in qids_to_viaf_ids_dict[q_identifier]:
+                    qids_to_viaf_ids_dict[q_identifier].append(viaf_id)
 
 
-        except Exception as e:
-            print(f'|!| Ran into an error processing QID {result["item"]["value"].split("/")[-1]}: {e}. Saving error to error_log.')
-            error_log.append({
-            "q_identifier": result["item"]["value"].split("/")[-1],
-            "error": str(e),
-            "traceback": traceback.format_exc()
-            })
+            except Exception as e:
+                print(f'|!| Ran into an error processing QID {result["item"]["value"].split("/")[-1]}: {e}. Saving error to error_log.')
+                error_log.append({
+                "q_identifier": result["item"]["value"].split("/")[-1],
+                "error": str(e),
+                "traceback": traceback.format_exc()
+                })
 
     # creating a copy of the initial df_unique_trismegistos to amend it
     df_exclusive_trismegistos_authors_w_viaf_ids = df_exclusive_trismegistos_authors.copy()
@@ -273,12 +294,13 @@ trismegistos_exclusive_authors_w_viaf_ids_csv_path (str): the path to the list o
 
 ## 2.3.: Matching the viaf_ids retrieved for trismegistos_exclusive_authors_w_viaf_ids to the VIAF cluster IDs found in the formatted MEDIATE authors JSON table, and saving matches to a separate CSV (and concatenating with main MEDIATE CSV).
 
-def matching_viaf_ids_trismegistos_exclusive_to_mediate_authors_JSON_table(trismegistos_exclusive_authors_w_viaf_ids_csv, mediate_ancient_authors_wiki_labelled_csv, formatted_mediate_json_table, output_csv_dir, error_log_dir):
+def matching_viaf_ids_trismegistos_exclusive_to_mediate_authors_JSON_table(trismegistos_exclusive_authors_w_viaf_ids_csv, mediate_ancient_authors_wiki_labelled_csv, formatted_mediate_json_table, output_csv_dir, error_log_dir, with_precision_csv=None, redirects_cache_csv=None, resolve_online=False):
     """
 Description:
 This function uses the VIAF cluster IDs collected in 2.2. for exclusive Trismegistos authors to match them against all MEDIATE authors, based on the formatted JSON table holding the information on all entries from MEDIATE (including viaf_id).
 It then concatenates the results with the mediate_ancient_authors_labelled_wiki CSV to obtain the 'last', extended table of MEDIATE ancient authors
 (since we add previously undetected and nonetheless existingMEDIATE authors thanks to the comparison with the Trismegistos list) at which we could arrive 'automatically' or 'semi-automatically'.
+VIAF IDs are matched through the identity graph (see identity_graph.py): every MEDIATE VIAF ID is looked up once in the cluster index instead of being compared with every Trismegistos author.
 
 Arguments:
 trismegistos_exclusive_authors_w_viaf_ids_csv (str): path to the list containing the set of exclusive Trismegistos authors for which VIAF IDs have been found in 2.2.
@@ -286,6 +308,9 @@ mediate_ancient_authors_wiki_labelled_csv (str): path to the list of MEDIATE aut
 formatted_mediate_json_table (str): the path to the new JSON table (obtained in 2.1.) containing formatted information regarding all authors, authors (attributed) and authors (possible) found on MEDIATE database (including viaf_id)
 output_csv_dir (str): path to the directory where the resulting last concatenated MEDIATE DataFrame (and all other intermediate results) should be saved.
 error_log_dir (str): path to the directory where the potentially encountered errors should be saved as CSV.
+with_precision_csv (str, optional): path to ancient_authors_wikidata_with_precision.csv (use case 3) to add its VIAF IDs to the identity graph. Defaults to None.
+redirects_cache_csv (str, optional): path to the cache of resolved identifiers; if given, the VIAF cluster IDs of both sides are rewritten to their current cluster (MEDIATE's VIAF IDs are not stable) before matching. Defaults to None.
+resolve_online (bool, optional): set to True to look the VIAF IDs missing from the cache up on viaf.org; only the MEDIATE VIAF IDs not already shared with an exclusive Trismegistos author are looked up. Defaults to False.
 
 Returns:
 concatenated_mediate_ancient_authors_csv_path: path to the last CSV holding the concatenated DataFrames with initial enriched MEDIATE authors list (with QIDs, labels, aliases, writing languages) and with matched exclusive Trismegistos authors based on their retrieved VIAF cluster IDs.
@@ -348,8 +373,29 @@ concatenated_mediate_ancient_authors_csv_path: path to the last CSV holding the
     with open(formatted_mediate_json_table, 'r', encoding='utf-8') as file:
         data = json.load(file)
 
-    # creating the dictionary to hold Trismegistos q_identifiers as keys and viaf_id lists as values (to then transform target_viaf_id into a matching q_id)
-    trismegistos_viaf_ids_to_qids_dict = df_trismegistos_exclusive_authors_w_viaf_ids.set_index('q_identifier')['viaf_id'].to_dict()
+    # rewriting merged or redirected VIAF cluster IDs on both sides to their current cluster, so that an old MEDIATE cluster ID still meets the Wikidata one
+    if redirects_cache_csv:
+        redirect_cache = load_redirect_cache(redirects_cache_csv)
+        rewrite_identifier_column(df_trismegistos_exclusive_authors_w_viaf_ids, 'viaf_id', 'viaf', redirect_cache, online=resolve_online)
+
+        # a MEDIATE VIAF ID already shared with an exclusive Trismegistos author matches as it is: only the others can be brought to the join by a redirect
+        trismegistos_viaf_ids = {normalise_id_value(viaf_id) for viaf_ids in df_trismegistos_exclusive_authors_w_viaf_ids['viaf_id'] for viaf_id in viaf_ids}
+        mediate_viaf_ids = [normalise_id_value(entry.get("viaf_id")) for entry in data]
+        resolved_mediate_viaf_ids = resolve_identifiers([viaf_id for viaf_id in mediate_viaf_ids if viaf_id and viaf_id not in trismegistos_viaf_ids], 'viaf', redirect_cache, online=resolve_online)
+        for entry, viaf_id in zip(data, mediate_viaf_ids):
+            if viaf_id in resolved_mediate_viaf_ids:
+                entry["viaf_id"] = resolved_mediate_viaf_ids[viaf_id]
+        save_redirect_cache(redirect_cache, redirects_cache_csv)
+
+    # building the identity graph (QID - VIAF ID edges) of the exclusive Trismegistos authors, and indexing their QIDs by identity cluster (to then transform target_viaf_id into a matching q_id with a single lookup)
+    identity_edges = edges_from_dataframe(df_trismegistos_exclusive_authors_w_viaf_ids, 'q_identifier', {'viaf_id': 'viaf'})
+    if with_precision_csv:
+        identity_edges += edges_from_with_precision_csv(with_precision_csv)
+    node_to_cluster, _ = build_identity_clusters(identity_edges)
+
+    trismegistos_qids_by_cluster = defaultdict(list)
+    for q_identifier in df_trismegistos_exclusive_authors_w_viaf_ids['q_identifier']:
+        trismegistos_qids_by_cluster[cluster_of(node_to_cluster, 'qid', q_identifier)].append(q_identifier)
 
     # computing total_entries from formatted_mediate_json_table for tracking purposes
     total_entries = len(data)
@@ -357,12 +403,14 @@ concatenated_mediate_ancient_authors_csv_path: path to the last CSV holding the
     # defining a function to match QIDs of exclusive Trismegistos authors if one corresponding VIAF ID (in dict values) matches the VIAF cluster ID of one of the formatted_mediate_json_table viaf_id
     
     # defining the function
-    def find_qids_by_viaf_id(qids_to_viaf_dict, target_viaf_id, multiple_qids_list):
-        matched_qids = [q_identifier for q_identifier, viaf_ids in qids_to_viaf_dict.items() if target_viaf_id in viaf_ids]
+    def find_qids_by_viaf_id(qids_by_cluster, target_viaf_id, multiple_qids_list):
+        identity_cluster = cluster_of(node_to_cluster, 'viaf', target_viaf_id)
+        matched_qids = qids_by_cluster.get(identity_cluster, []) if identity_cluster else []
         if len(matched_qids) > 1:
             matched_tm_labels = df_trismegistos_exclusive_authors_w_viaf_ids.loc[df_trismegistos_exclusive_authors_w_viaf_ids['q_identifier'].isin(matched_qids), 'trismegistos_label'].tolist()
             multiple_qids_list.append({
                 "viaf_id": target_viaf_id,
+                "identity_cluster": identity_cluster,
                 "matched_trismegistos_qids": matched_qids,
                 "matched_trismegistos_labels": matched_tm_labels,
             })
@@ -393,7 +441,7 @@ concatenated_mediate_ancient_authors_csv_path: path to the last CSV holding the
                 print(f"|!| [{entry_nb}/{total_entries}] Entry {entry_nb}, for author ({short_name}) has no VIAF ID. Skipping.")
                 continue
 
-            q_identifier = find_qids_by_viaf_id(trismegistos_viaf_ids_to_qids_dict, viaf_id, multiple_qids_matched)
+            q_identifier = find_qids_by_viaf_id(trismegistos_qids_by_cluster, viaf_id, multiple_qids_matched)
 
             if not q_identifier:
                 print(f"|!| [{entry_nb}/{total_entries}] No matching q_identifier found for VIAF ID {viaf_id} (entry {entry_nb}, author ({short_name})).") # still not interested in logging because taking from 'all MEDIATE authors' file
@@ -584,7 +632,8 @@ if __name__ == "__main__":
             exclusive_trimegistos_authors_csv=EXCLUSIVE_TRISMEGISTOS_AUTHORS_CSV,
             output_csv_dir=OUTPUT_CSV_DIR,
             sparql_endpoint=SPARQL_ENDPOINT,
-            error_log_dir=ERROR_LOG_DIR
+            error_log_dir=ERROR_LOG_DIR,
+            crosswalk_csv=CROSSWALK_CSV
         )
         
         print(f">>>> [3/3] Calling third function: matching_viaf_ids_trismegistos_exclusive_to_mediate_authors_JSON_table() to match exclusive TM authors to existing MEDIATE authors based on VIAF IDs.<<<<")
@@ -593,7 +642,10 @@ if __name__ == "__main__":
             mediate_ancient_authors_wiki_labelled_csv=MEDIATE_ANCIENT_AUTHORS_WIKI_LABELLED,
             formatted_mediate_json_table=new_mediate_json_path,
             output_csv_dir=OUTPUT_CSV_DIR,
-            error_log_dir=ERROR_LOG_DIR
+            error_log_dir=ERROR_LOG_DIR,
+            with_precision_csv=WIKIDATA_WITH_PRECISION_CSV,
+            redirects_cache_csv=REDIRECTS_CACHE_CSV,
+            resolve_online=RESOLVE_VIAF_IDS_ONLINE
         )
 
         print(f"|Y| Pipeline completed successfully. Final output saved to:\n{final_csv_path}")
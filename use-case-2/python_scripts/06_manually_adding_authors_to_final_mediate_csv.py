@@ -5,12 +5,16 @@ import os
 import pandas as pd
 import json
 from datetime import datetime
+from name_candidate_index import rank_candidates_for_unmatched_authors
+from canon_ranking import sort_by_weighted_score
 
 ### Step 1: Defining important file paths, directories and variables
 
 ## 1.1.: File paths
 
 INPUT_MEDIATE_ANCIENT_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\05_matching_exclusive_trismegistos_authors_to_mediate_authors\05_last\05_20250914_concatenated_mediate_ancient_authors.csv'
+UNMATCHED_EXCLUSIVE_TRISMEGISTOS_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\05_matching_exclusive_trismegistos_authors_to_mediate_authors\05_intermediate\05_20250914_unmatched_exclusive_trismegistos_authors.csv'
+FORMATTED_MEDIATE_JSON_TABLE = r'path_to\use-case-2\input\initial_author_lists\mediate\json\mediate_all_authors_table_formatted_viaf_ids\mediate_all_authors_table_formatted_viaf_ids.json'
 
 ## 1.2.: Directories
 
@@ -20,6 +24,8 @@ OUTPUT_CSV_DIR = r'path_to\use-case-2\output\authors_csv'
 
 INTERMEDIATE_TAG = '06_intermediate'
 LAST_TAG = '06_last'
+SORT_WEIGHTS = {'mediate_nb_collections': 1.0} # criteria (and weights) of the final sorting, e.g. {'mediate_nb_collections': 0.5, 'mediate_nb_items': 0.5} (see canon_ranking.py)
+RANK_CANDIDATES = False # set to True to rank MEDIATE candidates for every unmatched author first (see name_candidate_index.py), then back to False once LIST_AUTHORS_AS_DICTS is filled in from the reviewed candidates
 
 ### Step 2: Defining the new rows we want to add manually as dictionaries and storing them in a list
 
@@ -277,7 +283,7 @@ Arguments:
 input_mediate_ancient_authors_csv (str): path to the concatenated mediate_ancient_authors.csv from previous step (05) in the process
 output_csv_dir (str): path to the output directory where to save the CSVs containing the lists of authors
 list_authors_as_dicts (list): a list containing the authors to be added to the main mediate_ancient_authors.csv as dictionaries holding relevant information as fields
-sort=True: default parameter to sort the concatenated DFS (the input_mediate_ancient_authors_csv and the manually added authors) according to 'mediate_nb_collections'
+sort=True: default parameter to sort the concatenated DFS (the input_mediate_ancient_authors_csv and the manually added authors) according to SORT_WEIGHTS (by default 'mediate_nb_collections')
 
 Returns:
 updated_mediate_ancient_authors_csv_path (str): path to the last (final?) CSV containing all relevant MEDIATE ancient authors based on those initially found on the database with DOB filters, and the ones retrieved thanks to comparison with Trismegistos list
@@ -350,8 +356,8 @@ updated_mediate_ancient_authors_csv_path (str): path to the last (final?) CSV co
     
     # sorting df_updated_mediate_ancient_authors by nb_collections if sort=True
     if sort:
-        print(f"[i] [sorting] Sorting df_updated_mediate_ancient_authors by 'mediate_nb_collections'. See overview:\n")
-        df_updated_mediate_ancient_authors = df_updated_mediate_ancient_authors.sort_values(by='mediate_nb_collections', ascending=False).reset_index(drop=True)
+        print(f"[i] [sorting] Sorting df_updated_mediate_ancient_authors by the weighted score of {SORT_WEIGHTS}. See overview:\n")
+        df_updated_mediate_ancient_authors = sort_by_weighted_score(df_updated_mediate_ancient_authors, SORT_WEIGHTS)
         print(df_updated_mediate_ancient_authors.head())
     else:
         print((f"[i] [NOT sorting] Sorting was not required for df_updated_mediate_ancient_authors (see function parameters). Proceeding to save df to CSV."))
@@ -380,4 +386,7 @@ updated_mediate_ancient_authors_csv_path (str): path to the last (final?) CSV co
 
 ### Step 4: Calling the function
 if __name__ == '__main__':
-    manually_adding_authors_to_mediate_ancient_authors_csv(INPUT_MEDIATE_ANCIENT_AUTHORS_CSV, OUTPUT_CSV_DIR, LIST_AUTHORS_AS_DICTS, sort=True)
\ No newline at end of file
+    if RANK_CANDIDATES:
+        rank_candidates_for_unmatched_authors(UNMATCHED_EXCLUSIVE_TRISMEGISTOS_AUTHORS_CSV, FORMATTED_MEDIATE_JSON_TABLE, OUTPUT_CSV_DIR, known_authors_csv=INPUT_MEDIATE_ANCIENT_AUTHORS_CSV)
+    else:
+        manually_adding_authors_to_mediate_ancient_authors_csv(INPUT_MEDIATE_ANCIENT_AUTHORS_CSV, OUTPUT_CSV_DIR, LIST_AUTHORS_AS_DICTS, sort=True)
\ No newline at end of file
@@ -0,0 +1,243 @@
+#####------------------------------------------------------------------------Ranking the canon: scoring the authors for many weightings of several criteria at once (vectorised, with cached normalisations)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import itertools
+import numpy as np
+import pandas as pd
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Tables merged into the ranking table (one row per QID)
+
+AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv' # 'mediate_nb_items', 'mediate_nb_collections'
+ITEM_METRICS_CSV = r'path_to\use-case-3\ancient_authors_wikidata_item_metrics.csv' # 'total_sitelinks', 'wikipedia_count' (set to None to skip)
+MENTION_COUNTS_CSV = None # e.g. r'path_to\corpus-matching\output\{corpus}_mention_counts.csv' (see corpus-matching/mention_counts.py), summed per author as 'nb_mentions'
+UC3_SEPARATOR = ';'
+
+## 1.2.: Criteria and weightings
+
+CRITERIA = ['mediate_nb_items', 'mediate_nb_collections', 'total_sitelinks', 'wikipedia_count', 'nb_mentions']
+WEIGHTINGS = { # name -> {criterion: weight}; criteria left out weigh 0
+    'collections': {'mediate_nb_collections': 1.0},
+    'mediate': {'mediate_nb_items': 0.5, 'mediate_nb_collections': 0.5},
+    'reception_today': {'total_sitelinks': 0.5, 'wikipedia_count': 0.5},
+    'balanced': {'mediate_nb_items': 0.2, 'mediate_nb_collections': 0.2, 'total_sitelinks': 0.2, 'wikipedia_count': 0.2, 'nb_mentions': 0.2},
+}
+
+## 1.3.: Other
+
+METHODS = ['minmax', 'log', 'zscore', 'borda', 'reciprocal_rank']
+RECIPROCAL_RANK_K = 60 # 1 / (k + rank): the usual constant of reciprocal rank fusion
+TOP_K = 50
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Building the ranking table
+
+def build_ranking_table(authors_csv, item_metrics_csv=None, mention_counts_csv=None):
+    """
+Description:
+Merges the criteria of every author into one table indexed by QID: MEDIATE items and collections (authors CSV), Wikidata sitelinks (use case 3 item metrics)
+and corpus mentions (summed over years, publications and corpora). Missing values count as 0.
+
+Arguments:
+authors_csv (str): path to the authors CSV of step 06 ('q_identifier', 'english_label', 'mediate_nb_items', 'mediate_nb_collections').
+item_metrics_csv (str, optional): path to ancient_authors_wikidata_item_metrics.csv. Defaults to None.
+mention_counts_csv (str, optional): path to the mention counts of mention_counts.py. Defaults to None.
+
+Returns:
+df_ranking (DataFrame): indexed by 'q_identifier', with 'label' and one column per criterion found.
+"""
+    df_authors = pd.read_csv(authors_csv, dtype={'q_identifier': str}).drop_duplicates(subset='q_identifier').set_index('q_identifier')
+    df_ranking = pd.DataFrame({'label': df_authors['english_label'] if 'english_label' in df_authors.columns else df_authors.index}, index=df_authors.index)
+    for column in ('mediate_nb_items', 'mediate_nb_collections'):
+        if column in df_authors.columns:
+            df_ranking[column] = pd.to_numeric(df_authors[column], errors='coerce')
+
+    if item_metrics_csv:
+        df_metrics = pd.read_csv(item_metrics_csv, sep=UC3_SEPARATOR, dtype={'wikidata_id': str}).drop_duplicates(subset='wikidata_id').set_index('wikidata_id')
+        df_ranking = df_ranking.join(df_metrics[['total_sitelinks', 'wikipedia_count']].apply(pd.to_numeric, errors='coerce'))
+
+    if mention_counts_csv:
+        df_counts = pd.read_csv(mention_counts_csv, dtype={'q_identifier': str})
+        df_ranking = df_ranking.join(df_counts.groupby('q_identifier')['nb_mentions'].sum())
+
+    criteria = [column for column in df_ranking.columns if column != 'label']
+    df_ranking[criteria] = df_ranking[criteria].fillna(0)
+    print(f"[i] Ranking table of {len(df_ranking)} authors and {len(criteria)} criteria ({', '.join(criteria)}).")
+
+    return df_ranking
+
+## 2.2.: Normalising the criteria (once per method, then cached)
+
+def prepare_ranking(df_ranking, criteria=None):
+    """
+Description:
+Prepares the criteria of the ranking table as one matrix (authors x criteria). Its normalisations are computed on first use by normalised_criteria() and cached in the returned dict,
+so that scoring more weightings only costs one matrix product.
+
+Arguments:
+df_ranking (DataFrame): output of build_ranking_table() (or any table with numeric criteria).
+criteria (list, optional): criteria to use. Defaults to the columns of CRITERIA found in the table.
+
+Returns:
+ranking (dict): 'values' (authors x criteria array), 'qids', 'labels', 'criteria', 'normalisations' (cache).
+"""
+    criteria = [criterion for criterion in (criteria or CRITERIA) if criterion in df_ranking.columns]
+    return {
+        "values": df_ranking[criteria].to_numpy(dtype=np.float64),
+        "qids": df_ranking.index.to_numpy(),
+        "labels": (df_ranking['label'] if 'label' in df_ranking.columns else df_ranking.index.to_series()).to_numpy(),
+        "criteria": criteria,
+        "normalisations": {},
+    }
+
+def _scale(values):
+    # every column to [0, 1] (constant columns to 0)
+    low, high = values.min(axis=0), values.max(axis=0)
+    span = np.where(high > low, high - low, 1)
+    return (values - low) / span
+
+def _ranks(values):
+    # rank of every author for every criterion, 1 for the highest value, ties sharing their average rank
+    return pd.DataFrame(values).rank(axis=0, ascending=False, method='average').to_numpy()
+
+def normalised_criteria(ranking, method='minmax'):
+    """
+Description:
+Returns the criteria normalised with the given method (computed once, then read from the cache):
+'minmax' (each criterion scaled to [0, 1]), 'log' (log(1 + x), then scaled), 'zscore' (centred and divided by the standard deviation),
+'borda' (Borda count: (n - rank) / (n - 1), 1 for the first author) or 'reciprocal_rank' (1 / (RECIPROCAL_RANK_K + rank)).
+With the last two, the weighted sum is a weighted rank aggregation.
+"""
+    if method not in ranking["normalisations"]:
+        values = ranking["values"]
+        if method == 'minmax':
+            normalised = _scale(values)
+        elif method == 'log':
+            normalised = _scale(np.log1p(np.clip(values, 0, None)))
+        elif method == 'zscore':
+            deviation = values.std(axis=0)
+            normalised = (values - values.mean(axis=0)) / np.where(deviation > 0, deviation, 1)
+        elif method == 'borda':
+            nb_authors = max(len(values) - 1, 1)
+            normalised = (len(values) - normalised_ranks(ranking)) / nb_authors
+        elif method == 'reciprocal_rank':
+            normalised = 1 / (RECIPROCAL_RANK_K + normalised_ranks(ranking))
+        else:
+            raise ValueError(f"Unknown normalisation: {method} (expected one of {METHODS})")
+        ranking["normalisations"][method] = normalised
+    return ranking["normalisations"][method]
+
+def normalised_ranks(ranking):
+    if 'ranks' not in ranking["normalisations"]:
+        ranking["normalisations"]['ranks'] = _ranks(ranking["values"])
+    return ranking["normalisations"]['ranks']
+
+## 2.3.: Scoring many weightings at once
+
+def weighting_matrix(ranking, weightings):
+    """
+Description:
+Turns weightings ({name: {criterion: weight}}) into a (criteria x weightings) array, each column divided by the sum of its weights.
+"""
+    names = list(weightings)
+    weights = np.zeros((len(ranking["criteria"]), len(names)))
+    for column, name in enumerate(names):
+        for criterion, weight in weightings[name].items():
+            if criterion in ranking["criteria"]:
+                weights[ranking["criteria"].index(criterion), column] = weight
+    totals = np.abs(weights).sum(axis=0)
+    return names, weights / np.where(totals > 0, totals, 1)
+
+def weighting_grid(criteria, step=0.25):
+    """
+Description:
+Every weighting of the criteria whose weights are multiples of step and sum to 1 (e.g. 1001 weightings for 5 criteria and a step of 0.1), to sweep the space of weightings.
+
+Returns:
+weightings (dict): name ('c1=0.2,c2=0.8') -> {criterion: weight}
+"""
+    nb_steps = int(round(1 / step))
+    weightings = {}
+    for counts in itertools.product(range(nb_steps + 1), repeat=len(criteria)):
+        if sum(counts) == nb_steps:
+            weights = {criterion: count / nb_steps for criterion, count in zip(criteria, counts) if count}
+            weightings[",".join(f"{criterion}={weight:g}" for criterion, weight in weights.items())] = weights
+    return weightings
+
+def score_weightings(ranking, weightings, method='minmax'):
+    """
+Description:
+Scores every author for every weighting in one matrix product (normalised criteria x weights).
+
+Arguments:
+ranking (dict): output of prepare_ranking().
+weightings (dict): name -> {criterion: weight} (see WEIGHTINGS and weighting_grid()).
+method (str, optional): normalisation of the criteria (see normalised_criteria()). Defaults to 'minmax'.
+
+Returns:
+tuple: (names (list of the weightings), scores (authors x weightings array))
+"""
+    names, weights = weighting_matrix(ranking, weightings)
+    return names, normalised_criteria(ranking, method) @ weights
+
+def top_k(ranking, names, scores, k=TOP_K):
+    """
+Description:
+The k best authors of every weighting (partial sort of every column of the scores, then a sort of the k best only).
+
+Returns:
+df_top (DataFrame): 'weighting', 'rank', 'q_identifier', 'label' and 'score', k rows per weighting.
+"""
+    k = min(k, scores.shape[0])
+    if not k:
+        return pd.DataFrame(columns=['weighting', 'rank', 'q_identifier', 'label', 'score'])
+    best = np.argpartition(-scores, k - 1, axis=0)[:k] if k < scores.shape[0] else np.tile(np.arange(scores.shape[0])[:, None], (1, scores.shape[1]))
+    best_scores = np.take_along_axis(scores, best, axis=0)
+    order = np.argsort(-best_scores, axis=0, kind='stable')
+    best, best_scores = np.take_along_axis(best, order, axis=0), np.take_along_axis(best_scores, order, axis=0)
+
+    return pd.DataFrame({
+        'weighting': np.repeat(names, k),
+        'rank': np.tile(np.arange(1, k + 1), len(names)),
+        'q_identifier': ranking["qids"][best.T.ravel()],
+        'label': ranking["labels"][best.T.ravel()],
+        'score': best_scores.T.ravel(),
+    })
+
+def sort_by_weighted_score(df, weights, method='minmax'):
+    """
+Description:
+Sorts a table (e.g. the final authors CSV of step 06) by the weighted score of some of its columns, best first (ties keep their order).
+
+Arguments:
+df (DataFrame): the table.
+weights (dict): column -> weight, e.g. {'mediate_nb_collections': 1.0}.
+method (str, optional): normalisation of the columns (see normalised_criteria()). Defaults to 'minmax'.
+
+Returns:
+df_sorted (DataFrame)
+"""
+    ranking = prepare_ranking(df.assign(**{column: pd.to_numeric(df[column], errors='coerce').fillna(0) for column in weights}), criteria=list(weights))
+    _, scores = score_weightings(ranking, {'sort': weights}, method)
+    return df.iloc[np.argsort(-scores[:, 0], kind='stable')].reset_index(drop=True)
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    df_ranking = build_ranking_table(AUTHORS_CSV, ITEM_METRICS_CSV, MENTION_COUNTS_CSV)
+    ranking = prepare_ranking(df_ranking)
+
+    for method in METHODS:
+        names, scores = score_weightings(ranking, WEIGHTINGS, method)
+        print(f"\n[i] Top 10 ({method}):")
+        print(top_k(ranking, names, scores, k=10).pivot(index='rank', columns='weighting', values='label'))
+
+    # sweeping every weighting of the criteria by steps of 0.1
+    grid = weighting_grid(ranking["criteria"], step=0.1)
+    names, scores = score_weightings(ranking, grid, 'borda')
+    df_top = top_k(ranking, names, scores, k=TOP_K)
+    print(f"\n[i] {len(grid)} weightings scored. Authors most often in the top {TOP_K}:")
+    print(df_top['label'].value_counts().head(20))
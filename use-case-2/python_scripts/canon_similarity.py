@@ -0,0 +1,292 @@
+#####------------------------------------------------------------------------Comparing many canons: pairwise overlap, Jaccard, Kendall tau and rank-biased overlap matrices of ranked QID lists (vectorised)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import numpy as np
+import pandas as pd
+from mediate_collection_matrix import load_author_collection_matrix, collections_per_decade
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: Ranked lists compared (set any of them to None to skip it)
+
+TRISMEGISTOS_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\03_trismegistos_ancient_authors_csv_wiki\03_last\03_20250914_trismegistos_ancient_authors_wiki_labelled.csv' # in file order
+MEDIATE_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\06_manually_adding_authors_to_final_mediate_csv\06_last\06_20250914_updated_mediate_ancient_authors.csv' # by number of collections, and by number of items
+COLLECTION_MATRIX_DIR = r'path_to\use-case-2\output\mediate_collection_matrix' # MEDIATE canon of every decade (see mediate_collection_matrix.py)
+MENTION_COUNTS_CSV = None # e.g. r'path_to\corpus-matching\output\{corpus}_mention_counts.csv': press canon of every decade (see corpus-matching/mention_counts.py)
+
+## 1.2.: Directories
+
+OUTPUT_DIR = r'path_to\use-case-2\output\canon_similarity'
+
+## 1.3.: Other
+
+METRICS = ['size', 'intersection', 'jaccard', 'overlap', 'kendall_tau', 'rbo']
+RBO_P = 0.9 # persistence of the rank-biased overlap: the top 10 weigh about 86% of the score
+DEPTH = None # only compares the first DEPTH authors of every list (e.g. 100); None for whole lists
+MIN_SHARED = 3 # Kendall tau is left empty for pairs of lists sharing fewer authors
+NAME = 'canons'
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Building the ranked lists
+
+def ranked_list_from_csv(csv_path, score_column=None, qid_column='q_identifier'):
+    """
+Description:
+Reads a ranked list of QIDs from a CSV: by descending score_column if given (ties keep the file order), otherwise in file order. Empty and repeated QIDs are dropped.
+
+Returns:
+ranked_qids (list)
+"""
+    df = pd.read_csv(csv_path, dtype={qid_column: str})
+    if score_column:
+        df = df.sort_values(by=score_column, ascending=False, kind='stable')
+    return list(dict.fromkeys(df[qid_column].dropna().str.strip().loc[lambda qids: qids != '']))
+
+def ranked_lists_per_slice(df_slices, prefix, id_to_qid=None):
+    """
+Description:
+One ranked list per column of an authors x slices table (e.g. collections_per_decade() or a pivot of the mention counts): the authors with a positive value, by descending value.
+
+Arguments:
+df_slices (DataFrame): authors (index) x slices (columns).
+prefix (str): names of the lists are '{prefix}_{column}'.
+id_to_qid (dict, optional): maps the index (e.g. MEDIATE short names) to QIDs; unmapped authors are dropped. Defaults to None (the index holds QIDs).
+
+Returns:
+lists (dict): name -> ranked QIDs
+"""
+    if id_to_qid is not None:
+        df_slices = df_slices[df_slices.index.isin(list(id_to_qid))]
+        df_slices = df_slices.groupby(df_slices.index.map(id_to_qid)).sum() # several MEDIATE names can belong to one QID
+    lists = {}
+    for column in df_slices.columns:
+        values = df_slices[column]
+        lists[f'{prefix}_{column}'] = list(values[values > 0].sort_values(ascending=False, kind='stable').index)
+    return lists
+
+def mention_lists_per_decade(mention_counts_csv, value='nb_mentions', prefix='press'):
+    """
+Description:
+One ranked list of the authors mentioned in every decade of the corpus (see corpus-matching/mention_counts.py).
+"""
+    df_counts = pd.read_csv(mention_counts_csv, dtype={'q_identifier': str})
+    df_counts = df_counts[df_counts['year'].notna()]
+    df_slices = df_counts.assign(decade=df_counts['year'].astype(int) // 10 * 10).pivot_table(index='q_identifier', columns='decade', values=value, aggfunc='sum', fill_value=0)
+    return ranked_lists_per_slice(df_slices, prefix)
+
+## 2.2.: Encoding the lists
+
+def encode_ranked_lists(lists, depth=None):
+    """
+Description:
+Encodes the lists as integers: every QID of any list gets a column number, and every list a row of a (lists x QIDs) position matrix holding the rank of every QID in it (1 for the first, 0 when absent).
+All the metrics are then computed on this matrix instead of on sets of strings.
+
+Arguments:
+lists (dict): name -> ranked QIDs (e.g. from ranked_list_from_csv() and ranked_lists_per_slice()).
+depth (int, optional): only keeps the first depth QIDs of every list. Defaults to None (whole lists).
+
+Returns:
+encoded (dict): 'names' (lists), 'qids' (columns), 'positions' (int32 array), 'sizes' (length of every list)
+"""
+    names = list(lists)
+    truncated = [list(dict.fromkeys(lists[name]))[:depth] for name in names]
+    sizes = np.array([len(qids) for qids in truncated], dtype=np.int64)
+    codes, qids = pd.factorize(pd.Series([qid for qids in truncated for qid in qids], dtype=object))
+
+    positions = np.zeros((len(names), len(qids)), dtype=np.int32)
+    rows = np.repeat(np.arange(len(names)), sizes)
+    ranks = np.concatenate([np.arange(1, size + 1) for size in sizes]) if len(sizes) else np.zeros(0, dtype=np.int64)
+    positions[rows, codes] = ranks
+
+    return {"names": names, "qids": np.asarray(qids, dtype=object), "positions": positions, "sizes": sizes}
+
+## 2.3.: Computing the similarity matrices
+
+def set_similarities(encoded):
+    """
+Description:
+Number of shared QIDs of every pair of lists (one product of the binary membership matrix with its transpose), and the Jaccard (shared / union) and overlap (shared / smaller list) coefficients derived from it.
+
+Returns:
+tuple: (intersection, jaccard, overlap) (lists x lists arrays)
+"""
+    membership = (encoded["positions"] > 0).astype(np.float32)
+    intersection = np.rint(membership @ membership.T).astype(np.int64)
+    sizes = encoded["sizes"]
+    union = sizes[:, None] + sizes[None, :] - intersection
+    smaller = np.minimum(sizes[:, None], sizes[None, :])
+    jaccard = np.divide(intersection, union, out=np.full(intersection.shape, np.nan), where=union > 0)
+    overlap = np.divide(intersection, smaller, out=np.full(intersection.shape, np.nan), where=smaller > 0)
+    return intersection, jaccard, overlap
+
+def rank_biased_overlap(encoded, p=RBO_P):
+    """
+Description:
+Extrapolated rank-biased overlap (Webber, Moffat and Zobel 2010) of every pair of lists, down to the length k of the shorter list of the pair:
+RBO = X_k / k * p^k + (1 - p) / p * sum over d from 1 to k of X_d / d * p^d, with X_d the number of QIDs shared by the first d authors of both lists.
+For every list, the depth at which each of its QIDs appears in both lists (the larger of its two ranks) is computed against all the other lists at once,
+and counted per depth with one bincount. 1 for identical lists, 0 for disjoint ones.
+
+Returns:
+rbo (lists x lists array)
+"""
+    positions, sizes = encoded["positions"], encoded["sizes"]
+    nb_lists = len(sizes)
+    max_depth = int(sizes.max()) if nb_lists else 0
+    depths = np.arange(1, max_depth + 1)
+    weights = p ** depths / depths
+    rbo = np.full((nb_lists, nb_lists), np.nan)
+
+    for row in range(nb_lists):
+        columns = np.flatnonzero(positions[row]) # the QIDs of this list
+        if not len(columns):
+            continue
+        others = positions[:, columns]
+        shared_depth = np.where(others > 0, np.maximum(others, positions[row, columns]), 0) # 0: not shared
+        counts = np.bincount((shared_depth + np.arange(nb_lists)[:, None] * (max_depth + 1)).ravel(), minlength=nb_lists * (max_depth + 1))
+        overlaps = np.cumsum(counts.reshape(nb_lists, max_depth + 1)[:, 1:], axis=1) # X_d for d = 1 .. max_depth
+
+        k = np.minimum(sizes[row], sizes)
+        valid = k > 0
+        cumulated = np.cumsum(overlaps * weights, axis=1)
+        last = np.clip(k - 1, 0, None)
+        x_k = overlaps[np.arange(nb_lists), last]
+        rbo[row, valid] = (x_k / np.maximum(k, 1) * p ** k + (1 - p) / p * cumulated[np.arange(nb_lists), last])[valid]
+    return rbo
+
+def count_inversions(sequence_nbs, item_nbs, values, nb_sequences):
+    """
+Description:
+Number of inversions (pairs of items in the wrong order) of many sequences at once, with a bottom-up merge sort run on all of them together:
+at every pass, the rank of each item in its block of 2 x width items, minus its rank in its half (the block of the previous pass), is the number of smaller items in the left half.
+
+Arguments:
+sequence_nbs (array): sequence of every item, sorted (as returned by np.nonzero()).
+item_nbs (array): position of every item in its sequence (0, 1, ...).
+values (array): value of every item (distinct non-negative integers within a sequence).
+nb_sequences (int): number of sequences.
+
+Returns:
+inversions (array): one count per sequence
+"""
+    inversions = np.zeros(nb_sequences)
+    nb_items = len(item_nbs)
+    if not nb_items:
+        return inversions
+    longest = int(item_nbs.max()) + 1
+    values = values.astype(np.int64)
+    max_value = int(values.max()) + 1
+    half_ranks = np.zeros(nb_items, dtype=np.int64)
+    width = 1
+    while width < longest:
+        block_keys = sequence_nbs.astype(np.int64) * (longest // (2 * width) + 1) + item_nbs // (2 * width)
+        order = np.argsort(block_keys * max_value + values)
+        sorted_keys = block_keys[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        block_ranks = np.empty(nb_items, dtype=np.int64)
+        block_ranks[order] = np.arange(nb_items) - np.repeat(group_starts, np.diff(np.r_[group_starts, nb_items]))
+
+        right = (item_nbs // width) % 2 == 1
+        smaller_on_the_left = block_ranks[right] - half_ranks[right]
+        inversions += np.bincount(sequence_nbs[right], weights=width - smaller_on_the_left, minlength=nb_sequences) # the left half of a block with a right half is full
+        half_ranks = block_ranks
+        width *= 2
+    return inversions
+
+def kendall_tau(encoded, min_shared=MIN_SHARED):
+    """
+Description:
+Kendall tau of the ranks of the QIDs shared by every pair of lists, NaN when they share fewer than min_shared QIDs.
+As a QID has one rank per list there are no ties, and tau = 1 - 4 * inversions / (n * (n - 1)): for every list, the ranks of its QIDs in all the following lists are taken in its own order,
+and their inversions counted together (see count_inversions()).
+
+Returns:
+tau (lists x lists array)
+"""
+    positions = encoded["positions"]
+    nb_lists = len(positions)
+    tau = np.full((nb_lists, nb_lists), np.nan)
+    for row in range(nb_lists):
+        columns = np.flatnonzero(positions[row])
+        if len(columns) >= min_shared:
+            tau[row, row] = 1.0
+        others = positions[row + 1:, columns[np.argsort(positions[row, columns])]] # the following lists, columns in the order of this list
+        shared = others > 0
+        sequence_nbs, _ = np.nonzero(shared)
+        item_nbs = (np.cumsum(shared, axis=1) - 1)[shared]
+        nb_shared = shared.sum(axis=1)
+        inversions = count_inversions(sequence_nbs, item_nbs, others[shared], len(others))
+        values = 1 - 4 * inversions / np.maximum(nb_shared * (nb_shared - 1), 1)
+        values[nb_shared < max(min_shared, 2)] = np.nan
+        tau[row, row + 1:] = tau[row + 1:, row] = values
+    return tau
+
+def canon_similarity_matrices(lists, metrics=METRICS, depth=DEPTH, p=RBO_P, min_shared=MIN_SHARED):
+    """
+Description:
+Pairwise similarity matrices of many ranked lists of QIDs.
+
+Arguments:
+lists (dict): name -> ranked QIDs.
+metrics (list, optional): among 'size' (authors of the first list), 'intersection', 'jaccard', 'overlap', 'kendall_tau' and 'rbo'. Defaults to METRICS.
+depth (int, optional): only compares the first depth authors of every list. Defaults to DEPTH.
+p (float, optional): persistence of the rank-biased overlap. Defaults to RBO_P.
+min_shared (int, optional): shared QIDs needed for Kendall tau. Defaults to MIN_SHARED.
+
+Returns:
+matrices (dict): metric -> DataFrame (lists x lists)
+"""
+    encoded = encode_ranked_lists(lists, depth)
+    names = encoded["names"]
+    print(f"[i] Comparing {len(names)} lists ({len(encoded['qids'])} distinct QIDs).")
+
+    results = {}
+    if {'intersection', 'jaccard', 'overlap'} & set(metrics):
+        results['intersection'], results['jaccard'], results['overlap'] = set_similarities(encoded)
+    if 'size' in metrics:
+        results['size'] = np.repeat(encoded["sizes"][:, None], len(names), axis=1)
+    if 'rbo' in metrics:
+        results['rbo'] = rank_biased_overlap(encoded, p)
+    if 'kendall_tau' in metrics:
+        results['kendall_tau'] = kendall_tau(encoded, min_shared)
+
+    return {metric: pd.DataFrame(results[metric], index=names, columns=names) for metric in metrics}
+
+def save_similarity_matrices(matrices, output_dir, name=NAME):
+    """
+Description:
+Saves every matrix as '{name}_{metric}.csv' (square, for heatmaps) and all of them as one long table '{name}_pairs.csv' (one row per pair of lists).
+"""
+    os.makedirs(output_dir, exist_ok=True)
+    for metric, df_matrix in matrices.items():
+        df_matrix.to_csv(os.path.join(output_dir, f'{name}_{metric}.csv'), index_label='list')
+    names = list(next(iter(matrices.values())).index) if matrices else []
+    pairs = pd.MultiIndex.from_product([names, names], names=['list_a', 'list_b'])
+    df_pairs = pd.DataFrame({metric: df_matrix.to_numpy().ravel() for metric, df_matrix in matrices.items()}, index=pairs)
+    df_pairs.reset_index().to_csv(os.path.join(output_dir, f'{name}_pairs.csv'), index=False)
+    print(f"|Y| {len(matrices)} similarity matrices of {len(names)} lists saved to {output_dir}.")
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    lists = {}
+    if TRISMEGISTOS_AUTHORS_CSV:
+        lists['trismegistos'] = ranked_list_from_csv(TRISMEGISTOS_AUTHORS_CSV)
+    if MEDIATE_AUTHORS_CSV:
+        lists['mediate_collections'] = ranked_list_from_csv(MEDIATE_AUTHORS_CSV, score_column='mediate_nb_collections')
+        lists['mediate_items'] = ranked_list_from_csv(MEDIATE_AUTHORS_CSV, score_column='mediate_nb_items')
+        if COLLECTION_MATRIX_DIR:
+            # the rows of the collection matrix are MEDIATE short names, mapped to QIDs with the final list
+            df_mediate = pd.read_csv(MEDIATE_AUTHORS_CSV, dtype={'q_identifier': str}).dropna(subset=['mediate_label', 'q_identifier'])
+            collection_matrix = load_author_collection_matrix(COLLECTION_MATRIX_DIR)
+            lists.update(ranked_lists_per_slice(collections_per_decade(collection_matrix), 'mediate', dict(zip(df_mediate['mediate_label'], df_mediate['q_identifier']))))
+    if MENTION_COUNTS_CSV:
+        lists.update(mention_lists_per_decade(MENTION_COUNTS_CSV))
+
+    matrices = canon_similarity_matrices(lists)
+    save_similarity_matrices(matrices, OUTPUT_DIR)
+    print(matrices['rbo'].round(3))
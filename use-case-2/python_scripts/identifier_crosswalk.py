@@ -0,0 +1,284 @@
+#####------------------------------------------------------------------------Crosswalk between QIDs and external identifiers (VIAF, BnF, Trismegistos and the other ancient world IDs), looked up locally with network fallback-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import traceback
+import pandas as pd
+from collections import defaultdict
+from wikidata_enrichment import build_match_query, run_chunk_query
+from identity_graph import normalise_id_value
+
+### Step 1: Defining relevant variables
+
+## 1.1.: Local sources (use case 3) and persisted crosswalk
+
+WIKIDATA_IDS_CSV = r'path_to\use-case-3\ancient_authors_wikidata_ids.csv' # the 18 ancient world IDs, several values '|'-joined
+WIKIDATA_WITH_PRECISION_CSV = r'path_to\use-case-3\ancient_authors_wikidata_with_precision.csv' # 'viaf_id' (comma-separated) and 'bnf_id'
+CROSSWALK_CSV = r'path_to\use-case-2\output\identifier_crosswalk\identifier_crosswalk.csv' # created on first save, holds the local sources and every network lookup
+UC3_SEPARATOR = ';'
+
+## 1.2.: Identifier types (column names of the use case 3 CSVs) and their Wikidata properties
+
+ID_PROPERTIES = {
+    'viaf_id': 'P214',
+    'bnf_id': 'P268',
+    'trismegistos_id': 'P11252',
+    'perseus_id': 'P7041',
+    'lagl_id': 'P12869',
+    'chap_id': 'P11790',
+    'fgrhist_id': 'P7168',
+    'tlg_id': 'P3576',
+    'pinakes_id': 'P6831',
+    'digliblt_id': 'P6862',
+    'phi_id': 'P6941',
+    'mda_id': 'P6999',
+    'dco_id': 'P7038',
+    'lla_id': 'P7042',
+    'clavis_id': 'P7908',
+    'cca_id': 'P7935',
+    'ciris_id': 'P8065',
+    'dll_id': 'P8122',
+    'dk_id': 'P8163',
+    'rspa_id': 'P10536',
+}
+
+## 1.3.: Other
+
+CHUNK_SIZE = 400 # identifiers sent in a single VALUES block on a miss
+CROSSWALK_COLUMNS = ['id_type', 'id_value', 'q_identifier'] # an empty q_identifier (or id_value) records a lookup that found nothing
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Building, loading and saving the crosswalk
+# The crosswalk is a dict of hash maps: 'to_qids' ((id_type, id_value) -> QIDs), 'to_ids' ((QID, id_type) -> values),
+# and 'checked_ids' / 'checked_qids', the keys known to have no match (or all their matches), so that they are not looked up online again.
+
+def new_crosswalk():
+    return {'to_qids': defaultdict(list), 'to_ids': defaultdict(list), 'checked_ids': set(), 'checked_qids': set(), 'changed': False}
+
+def add_mapping(crosswalk, id_type, id_value, qid):
+    """
+Description:
+Adds one identifier - QID pair to both directions of the crosswalk (ignored if either is empty or if the pair is already known).
+"""
+    id_value, qid = normalise_id_value(id_value), normalise_id_value(qid)
+    if not id_value or not qid or qid in crosswalk['to_qids'][(id_type, id_value)]:
+        return
+    crosswalk['to_qids'][(id_type, id_value)].append(qid)
+    crosswalk['to_ids'][(qid, id_type)].append(id_value)
+    crosswalk['changed'] = True
+
+def pairs_from_uc3_csvs(wikidata_ids_csv=None, with_precision_csv=None):
+    """
+Description:
+Reads the identifier - QID pairs of the use case 3 CSVs. The QIDs of a CSV are complete for its identifier types (every value of a property is kept), so they are returned as checked too.
+
+Returns:
+tuple: (pairs (list of (id_type, id_value, QID) tuples), checked_qids (set of (QID, id_type) pairs))
+"""
+    pairs, checked_qids = [], set()
+
+    sources = []
+    if wikidata_ids_csv and os.path.exists(wikidata_ids_csv):
+        sources.append((wikidata_ids_csv, '|'))
+    if with_precision_csv and os.path.exists(with_precision_csv):
+        sources.append((with_precision_csv, ','))
+
+    for csv_path, separator in sources:
+        df = pd.read_csv(csv_path, sep=UC3_SEPARATOR, dtype=str)
+        id_types = [column for column in df.columns if column in ID_PROPERTIES]
+        for row in df[['wikidata_id'] + id_types].itertuples(index=False):
+            qid = normalise_id_value(row[0])
+            if not qid:
+                continue
+            for id_type, value in zip(id_types, row[1:]):
+                checked_qids.add((qid, id_type))
+                if isinstance(value, str):
+                    pairs.extend((id_type, single_value, qid) for single_value in value.split(separator))
+
+    return pairs, checked_qids
+
+def load_crosswalk(crosswalk_csv=CROSSWALK_CSV, wikidata_ids_csv=WIKIDATA_IDS_CSV, with_precision_csv=WIKIDATA_WITH_PRECISION_CSV):
+    """
+Description:
+Loads the crosswalk from its CSV (if it exists) and from the identifier tables of use case 3 (which may be newer).
+
+Arguments:
+crosswalk_csv (str, optional): path to the persisted crosswalk. Defaults to CROSSWALK_CSV.
+wikidata_ids_csv (str, optional): path to ancient_authors_wikidata_ids.csv (None to skip). Defaults to WIKIDATA_IDS_CSV.
+with_precision_csv (str, optional): path to ancient_authors_wikidata_with_precision.csv (None to skip). Defaults to WIKIDATA_WITH_PRECISION_CSV.
+
+Returns:
+crosswalk (dict)
+"""
+    crosswalk = new_crosswalk()
+
+    if crosswalk_csv and os.path.exists(crosswalk_csv):
+        df_crosswalk = pd.read_csv(crosswalk_csv, dtype=str).fillna('')
+        for id_type, id_value, qid in df_crosswalk[CROSSWALK_COLUMNS].itertuples(index=False):
+            if id_value and qid:
+                add_mapping(crosswalk, id_type, id_value, qid)
+            elif id_value:
+                crosswalk['checked_ids'].add((id_type, id_value))
+            elif qid:
+                crosswalk['checked_qids'].add((qid, id_type))
+
+    pairs, checked_qids = pairs_from_uc3_csvs(wikidata_ids_csv, with_precision_csv)
+    for id_type, id_value, qid in pairs:
+        add_mapping(crosswalk, id_type, id_value, qid)
+    crosswalk['checked_qids'] |= checked_qids
+    crosswalk['changed'] = not (crosswalk_csv and os.path.exists(crosswalk_csv)) # saved on first use, so that other scripts can read it
+
+    print(f"[i] Loaded {len(crosswalk['to_qids'])} identifiers and {len(crosswalk['to_ids'])} (QID, identifier type) pairs into the crosswalk.")
+
+    return crosswalk
+
+def save_crosswalk(crosswalk, crosswalk_csv=CROSSWALK_CSV):
+    """
+Description:
+Saves the crosswalk (pairs and empty lookups) to CSV, so that later runs and other scripts (e.g. use case 1 'query-1.py') find the network lookups locally.
+"""
+    rows = [(id_type, id_value, qid) for (id_type, id_value), qids in crosswalk['to_qids'].items() for qid in qids]
+    rows += [(id_type, id_value, '') for id_type, id_value in crosswalk['checked_ids'] if not crosswalk['to_qids'].get((id_type, id_value))]
+    rows += [(id_type, '', qid) for qid, id_type in crosswalk['checked_qids'] if not crosswalk['to_ids'].get((qid, id_type))]
+
+    os.makedirs(os.path.dirname(crosswalk_csv) or '.', exist_ok=True)
+    pd.DataFrame(rows, columns=CROSSWALK_COLUMNS).to_csv(crosswalk_csv, index=False)
+    crosswalk['changed'] = False
+    print(f"[i] Saved {len(rows)} crosswalk rows to {crosswalk_csv}.")
+
+## 2.2.: Looking up misses online
+
+def query_qids_for_ids(crosswalk, id_values, id_type, sparql_setup, chunk_size=CHUNK_SIZE):
+    """
+Description:
+Looks up on Wikidata the QIDs of identifiers missing from the crosswalk (chunks of chunk_size) and adds the results, empty ones included, to the crosswalk.
+
+Returns:
+error_log (list): one dictionary per failed chunk ('id_type', 'external_ids', 'error', 'traceback'); its identifiers are neither matched nor unmatched, and are looked up again next time.
+"""
+    error_log = []
+    for i in range(0, len(id_values), chunk_size):
+        chunk = id_values[i:i + chunk_size]
+        try:
+            results = run_chunk_query(sparql_setup.endpoint, sparql_setup.agent, build_match_query(chunk, ID_PROPERTIES[id_type]))
+        except Exception as e:
+            print(f"|!| Could not look up {id_type} {i + 1} to {i + len(chunk)}: {e}. Saving them to error_log.")
+            error_log.append({"id_type": id_type, "external_ids": chunk, "error": str(e), "traceback": traceback.format_exc()})
+            continue
+        for result in results["results"]["bindings"]:
+            add_mapping(crosswalk, id_type, result["externalID"]["value"], result["item"]["value"])
+        crosswalk['checked_ids'].update((id_type, id_value) for id_value in chunk)
+        crosswalk['changed'] = True
+    return error_log
+
+def query_ids_for_qids(crosswalk, qids, id_type, sparql_setup, chunk_size=CHUNK_SIZE):
+    """
+Description:
+Looks up on Wikidata the identifiers of QIDs missing from the crosswalk (chunks of chunk_size) and adds the results, empty ones included, to the crosswalk.
+
+Returns:
+error_log (list): one dictionary per failed chunk ('id_type', 'q_identifiers', 'error', 'traceback'), looked up again next time.
+"""
+    error_log = []
+    for i in range(0, len(qids), chunk_size):
+        chunk = qids[i:i + chunk_size]
+        values_block = " ".join(f"wd:{qid}" for qid in chunk)
+        query = f"""
+        SELECT ?item ?value WHERE {{
+        VALUES ?item {{ {values_block} }}
+        ?item wdt:{ID_PROPERTIES[id_type]} ?value.
+        }}
+        """
+        try:
+            results = run_chunk_query(sparql_setup.endpoint, sparql_setup.agent, query)
+        except Exception as e:
+            print(f"|!| Could not look up the {id_type} of QIDs {i + 1} to {i + len(chunk)}: {e}. Saving them to error_log.")
+            error_log.append({"id_type": id_type, "q_identifiers": chunk, "error": str(e), "traceback": traceback.format_exc()})
+            continue
+        for result in results["results"]["bindings"]:
+            add_mapping(crosswalk, id_type, result["value"]["value"], result["item"]["value"])
+        crosswalk['checked_qids'].update((qid, id_type) for qid in chunk)
+        crosswalk['changed'] = True
+    return error_log
+
+## 2.3.: Translating identifiers in bulk
+
+def ids_to_qids(crosswalk, id_values, id_type, sparql_setup=None):
+    """
+Description:
+Translates identifiers of one type into QIDs: hash lookups in the crosswalk, and one chunked query for the misses only (if sparql_setup is given).
+
+Arguments:
+crosswalk (dict): output of load_crosswalk().
+id_values (iterable): the identifiers (empty values are dropped).
+id_type (str): key of ID_PROPERTIES (e.g. 'viaf_id', 'trismegistos_id').
+sparql_setup (optional): SPARQLWrapper setup with endpoint and agent, used for the misses. Defaults to None (local only).
+
+Returns:
+tuple: (matches (dict): identifier -> list of QIDs (empty if none was found), error_log (list): the failed lookups (see query_qids_for_ids()), whose identifiers are left out of matches
+       so that callers do not report them as unmatched)
+"""
+    # keyed by the identifiers as given (e.g. '1234.0' read from a float column), looked up normalised ('1234')
+    values = {str(value).strip(): normalise_id_value(value) for value in id_values if normalise_id_value(value)}
+    misses = list(dict.fromkeys(value for value in values.values() if not crosswalk['to_qids'].get((id_type, value)) and (id_type, value) not in crosswalk['checked_ids']))
+    print(f"[i] {len(set(values.values())) - len(misses)} out of {len(set(values.values()))} {id_type} found in the crosswalk, {len(misses)} {'to look up online' if sparql_setup else 'unknown'}.")
+
+    error_log = query_qids_for_ids(crosswalk, misses, id_type, sparql_setup) if misses and sparql_setup is not None else []
+    failed = {value for error in error_log for value in error["external_ids"]}
+    for error in error_log:
+        # reported as given, so that callers can find them in their own lists
+        error["external_ids"] = [given for given, value in values.items() if value in error["external_ids"]]
+
+    matches = {given: list(crosswalk['to_qids'].get((id_type, value), [])) for given, value in values.items() if value not in failed}
+    return matches, error_log
+
+def qids_to_ids(crosswalk, qids, id_type, sparql_setup=None):
+    """
+Description:
+Translates QIDs into the identifiers of one type: hash lookups in the crosswalk, and one chunked query for the misses only (if sparql_setup is given).
+
+Arguments:
+crosswalk (dict): output of load_crosswalk().
+qids (iterable): the QIDs (duplicates and empty values are dropped).
+id_type (str): key of ID_PROPERTIES (e.g. 'viaf_id').
+sparql_setup (optional): SPARQLWrapper setup with endpoint and agent, used for the misses. Defaults to None (local only).
+
+Returns:
+tuple: (matches (dict): QID -> list of identifiers (empty if none was found), error_log (list): the failed lookups (see query_ids_for_qids()), whose QIDs are left out of matches)
+"""
+    qids = list(dict.fromkeys(filter(None, (normalise_id_value(qid) for qid in qids))))
+    misses = [qid for qid in qids if not crosswalk['to_ids'].get((qid, id_type)) and (qid, id_type) not in crosswalk['checked_qids']]
+    print(f"[i] {len(qids) - len(misses)} out of {len(qids)} QIDs found in the crosswalk for {id_type}, {len(misses)} {'to look up online' if sparql_setup else 'unknown'}.")
+
+    error_log = query_ids_for_qids(crosswalk, misses, id_type, sparql_setup) if misses and sparql_setup is not None else []
+    failed = {qid for error in error_log for qid in error["q_identifiers"]}
+
+    matches = {qid: list(crosswalk['to_ids'].get((qid, id_type), [])) for qid in qids if qid not in failed}
+    return matches, error_log
+
+def translate_column(crosswalk, column, id_type, to='qid', sparql_setup=None, first_only=True):
+    """
+Description:
+Translates a whole DataFrame column (identifiers to QIDs, or QIDs to identifiers) with ids_to_qids() or qids_to_ids(), keeping its index.
+
+Arguments:
+crosswalk (dict): output of load_crosswalk().
+column (Series): the values to translate.
+id_type (str): key of ID_PROPERTIES.
+to (str, optional): 'qid' (identifiers -> QIDs) or 'id' (QIDs -> identifiers). Defaults to 'qid'.
+sparql_setup (optional): used for the misses. Defaults to None (local only).
+first_only (bool, optional): first match (or None) if True, list of matches otherwise. Defaults to True.
+
+Returns:
+tuple: (translated (Series), error_log (list)); values whose lookup failed are NaN, not None or [] (not found)
+"""
+    translate = ids_to_qids if to == 'qid' else qids_to_ids
+    matches, error_log = translate(crosswalk, column.tolist(), id_type, sparql_setup)
+    translated = column.map(lambda value: matches.get(str(value).strip() if to == 'qid' else normalise_id_value(value), []))
+    failed = {value for error in error_log for value in error.get("external_ids", error.get("q_identifiers", []))}
+    is_failed = column.map(lambda value: (str(value).strip() if to == 'qid' else normalise_id_value(value)) in failed)
+    # built as a list, as Series.map() would turn the None of identifiers without match into NaN
+    translated = [float('nan') if failed_value else (values[0] if values else None) if first_only else values for values, failed_value in zip(translated, is_failed)]
+    return pd.Series(translated, index=column.index, dtype=object), error_log
@@ -0,0 +1,238 @@
+#####------------------------------------------------------------------------Resolving redirected and merged identifiers (Wikidata QIDs, VIAF cluster IDs) in bulk, with a persistent local cache-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import json
+import urllib.request
+import urllib.error
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from wikidata_enrichment import run_chunk_query
+from name_candidate_index import parse_list_column
+from identity_graph import normalise_id_value
+
+### Step 1: Defining relevant variables
+
+## 1.1.: Cache and local stand-in
+
+REDIRECTS_CACHE_CSV = r'path_to\use-case-2\output\identifier_redirects\identifier_redirects_cache.csv' # created on first use
+LOCAL_REDIRECTS_CSV = None # optional local stand-in (e.g. extracted from a Wikidata or VIAF dump) with 'id_type', 'old_id' and 'new_id' columns
+
+## 1.2.: Other
+
+QID_CHUNK_SIZE = 400 # QIDs sent in a single VALUES block
+VIAF_MAX_WORKERS = 8 # VIAF clusters are looked up one by one, a few at a time
+VIAF_CLUSTER_URL = 'https://viaf.org/viaf/{}/viaf.json'
+CACHE_COLUMNS = ['id_type', 'id_value', 'canonical_value', 'resolved_on']
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Loading and saving the cache
+
+def load_redirect_cache(cache_csv, local_redirects_csv=None):
+    """
+Description:
+Loads the persistent cache of resolved identifiers (and, optionally, a local table of known redirects used as a stand-in for online lookups).
+
+Arguments:
+cache_csv (str): path to the cache CSV (an empty cache is returned if it does not exist yet).
+local_redirects_csv (str, optional): path to a CSV with 'id_type', 'old_id' and 'new_id' columns. Defaults to None.
+
+Returns:
+cache (dict): (id_type, id_value) -> canonical_value
+"""
+    cache = {}
+
+    if cache_csv and os.path.exists(cache_csv):
+        df_cache = pd.read_csv(cache_csv, dtype=str)
+        cache.update(zip(zip(df_cache['id_type'], df_cache['id_value']), df_cache['canonical_value']))
+
+    if local_redirects_csv:
+        df_local = pd.read_csv(local_redirects_csv, dtype=str)
+        for id_type, old_id, new_id in zip(df_local['id_type'], df_local['old_id'], df_local['new_id']):
+            old_id, new_id = normalise_id_value(old_id), normalise_id_value(new_id)
+            if old_id and new_id:
+                cache[(id_type, old_id)] = new_id
+
+    print(f"[i] Loaded {len(cache)} resolved identifiers from cache.")
+
+    return cache
+
+def save_redirect_cache(cache, cache_csv):
+    """
+Description:
+Saves the cache of resolved identifiers to CSV so that later runs only look up new identifiers.
+
+Arguments:
+cache (dict): (id_type, id_value) -> canonical_value
+cache_csv (str): path to the cache CSV.
+
+Returns:
+None
+"""
+    os.makedirs(os.path.dirname(cache_csv) or '.', exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d')
+    df_cache = pd.DataFrame([(id_type, id_value, canonical_value, timestamp) for (id_type, id_value), canonical_value in cache.items()], columns=CACHE_COLUMNS)
+    df_cache.to_csv(cache_csv, index=False)
+    print(f"[i] Saved {len(df_cache)} resolved identifiers to {cache_csv}.")
+
+## 2.2.: Looking up redirects online
+
+def query_qid_redirects(qids, sparql_setup, chunk_size=QID_CHUNK_SIZE):
+    """
+Description:
+Asks Wikidata which of the given QIDs are redirects (merged items are exposed as owl:sameAs on the query service), in chunks of chunk_size.
+
+Arguments:
+qids (list): the QIDs to check.
+sparql_setup: SPARQLWrapper setup with endpoint and agent (only used for its endpoint and agent).
+chunk_size (int, optional): number of QIDs per query. Defaults to QID_CHUNK_SIZE.
+
+Returns:
+tuple: (redirects (dict: old QID -> target QID), checked (set of QIDs whose chunk succeeded))
+"""
+    redirects = {}
+    checked = set()
+
+    for i in range(0, len(qids), chunk_size):
+        chunk = qids[i:i + chunk_size]
+        values_block = " ".join(f"wd:{qid}" for qid in chunk)
+        query = f"""
+        SELECT ?old ?new WHERE {{
+        VALUES ?old {{ {values_block} }}
+        ?old owl:sameAs ?new.
+        }}
+        """
+        try:
+            results = run_chunk_query(sparql_setup.endpoint, sparql_setup.agent, query)
+        except Exception as e:
+            print(f"|!| Could not check QIDs {i + 1} to {i + len(chunk)} for redirects: {e}. They will be checked again next time.")
+            continue
+
+        for result in results["results"]["bindings"]:
+            redirects[result["old"]["value"].split("/")[-1]] = result["new"]["value"].split("/")[-1]
+        checked.update(chunk)
+
+    return redirects, checked
+
+def query_viaf_redirect(viaf_id):
+    """
+Description:
+Looks up a VIAF cluster ID on viaf.org. Clusters merged into another one are answered with a 'redirect' record pointing to the new cluster.
+
+Arguments:
+viaf_id (str): the VIAF cluster ID.
+
+Returns:
+canonical_viaf_id (str or None): the current cluster ID (the same ID if it was not redirected, or unknown to VIAF, so that it is cached), or None if the lookup failed.
+"""
+    request = urllib.request.Request(VIAF_CLUSTER_URL.format(viaf_id), headers={'Accept': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            data = json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            print(f"|!| VIAF cluster {viaf_id} was not found on viaf.org. Keeping it as it is.")
+            return viaf_id
+        print(f"|!| Could not look up VIAF cluster {viaf_id}: {e}.")
+        return None
+    except Exception as e:
+        print(f"|!| Could not look up VIAF cluster {viaf_id}: {e}.")
+        return None
+
+    redirect = data.get('redirect') or data.get('ns1:redirect') or {}
+    new_id = redirect.get('directto') or redirect.get('ns1:directto')
+    return normalise_id_value(new_id) or viaf_id
+
+## 2.3.: Resolving whole lists of identifiers
+
+def canonical_identifier(cache, id_type, value):
+    """
+Description:
+Follows a chain of redirects in the cache (A -> B -> C) and returns its end, shortening the chain for later lookups.
+"""
+    seen = [value]
+    while (id_type, seen[-1]) in cache and cache[(id_type, seen[-1])] not in seen:
+        seen.append(cache[(id_type, seen[-1])])
+    for old_value in seen[:-1]:
+        cache[(id_type, old_value)] = seen[-1]
+    return seen[-1]
+
+def resolve_identifiers(values, id_type, cache, sparql_setup=None, online=True):
+    """
+Description:
+Resolves a list of identifiers ('qid' or 'viaf') to their current canonical form. Identifiers already in the cache are resolved locally;
+the others are looked up in bulk (QIDs in chunked SPARQL queries, VIAF clusters concurrently) and added to the cache.
+Identifiers whose lookup failed are returned unchanged and not cached.
+
+Arguments:
+values (iterable): the identifiers to resolve.
+id_type (str): 'qid' or 'viaf'.
+cache (dict): output of load_redirect_cache() (updated in place).
+sparql_setup (optional): SPARQLWrapper setup with endpoint and agent, needed to look up QIDs online. Defaults to None.
+online (bool, optional): set to False to only use the cache and the local stand-in. Defaults to True.
+
+Returns:
+resolved (dict): identifier -> canonical identifier (only for non-empty identifiers)
+"""
+    ids = list(dict.fromkeys(filter(None, (normalise_id_value(value) for value in values))))
+    missing = [id_ for id_ in ids if (id_type, id_) not in cache]
+
+    if missing and online:
+        print(f"[i] Looking up {len(missing)} {id_type} identifier(s) missing from the cache ({len(ids) - len(missing)} resolved from cache).")
+
+        if id_type == 'qid' and sparql_setup is not None:
+            redirects, checked = query_qid_redirects(missing, sparql_setup)
+            for qid in checked:
+                cache[(id_type, qid)] = redirects.get(qid, qid)
+
+        elif id_type == 'viaf':
+            with ThreadPoolExecutor(max_workers=VIAF_MAX_WORKERS) as executor:
+                for viaf_id, canonical_viaf_id in zip(missing, executor.map(query_viaf_redirect, missing)):
+                    if canonical_viaf_id:
+                        cache[(id_type, viaf_id)] = canonical_viaf_id
+
+    resolved = {id_: canonical_identifier(cache, id_type, id_) for id_ in ids}
+
+    nb_rewritten = sum(1 for id_, canonical_id in resolved.items() if id_ != canonical_id)
+    print(f"[i] {nb_rewritten} out of {len(ids)} {id_type} identifier(s) are redirected or merged.")
+
+    return resolved
+
+def rewrite_identifier_column(df, column, id_type, cache, sparql_setup=None, online=True):
+    """
+Description:
+Rewrites a column of identifiers (single values or lists, e.g. the 'viaf_id' lists of step 05) to their canonical form, before the column is used in a join.
+
+Arguments:
+df (DataFrame): the table (modified in place).
+column (str): the column to rewrite.
+id_type (str): 'qid' or 'viaf'.
+cache (dict): output of load_redirect_cache() (updated in place).
+sparql_setup (optional): see resolve_identifiers().
+online (bool, optional): see resolve_identifiers().
+
+Returns:
+df (DataFrame)
+"""
+    def values_of(cell):
+        if isinstance(cell, list):
+            return cell
+        if isinstance(cell, str) and cell.strip().startswith('['):
+            return parse_list_column(cell)
+        return [cell]
+
+    resolved = resolve_identifiers([value for cell in df[column] for value in values_of(cell)], id_type, cache, sparql_setup, online)
+
+    def rewrite(cell):
+        if isinstance(cell, list):
+            return list(dict.fromkeys(resolved.get(normalise_id_value(value), value) for value in cell))
+        if isinstance(cell, str) and cell.strip().startswith('['):
+            return json.dumps(list(dict.fromkeys(resolved.get(normalise_id_value(value), value) for value in parse_list_column(cell))))
+        return resolved.get(normalise_id_value(cell), cell)
+
+    df[column] = df[column].apply(rewrite)
+
+    return df
@@ -0,0 +1,315 @@
+#####------------------------------------------------------------------------Identity graph: clustering QIDs, VIAF cluster IDs, BnF IDs, Trismegistos IDs (and other ancient world IDs) into one cluster per author (union-find)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import re
+import json
+import pandas as pd
+from datetime import datetime
+from name_candidate_index import parse_list_column
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: File paths to the identifier tables (use case 3) and to the use case 2 outputs
+
+WIKIDATA_IDS_CSV = r'path_to\use-case-3\ancient_authors_wikidata_ids.csv'
+WIKIDATA_WITH_PRECISION_CSV = r'path_to\use-case-3\ancient_authors_wikidata_with_precision.csv'
+MEDIATE_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\02_mediate_ancient_authors_csv_wiki\02_last\02_20250912_mediate_ancient_authors_wiki_labelled_last.csv'
+TRISMEGISTOS_AUTHORS_CSV = r'path_to\use-case-2\output\authors_csv\03_trismegistos_ancient_authors_csv_wiki\03_last\03_20250914_trismegistos_ancient_authors_wiki_labelled.csv'
+
+## 1.2.: Directories
+
+OUTPUT_CSV_DIR = r'path_to\use-case-2\output\authors_csv'
+
+## 1.3.: Other
+
+OUTPUT_CSV_SUBDIR = 'identity_graph'
+UC3_SEPARATOR = ';' # the use case 3 CSVs are saved with ';'
+MULTI_VALUED_UC3_COLUMNS = ['viaf_id', 'bnf_id'] # comma-separated (GROUP_CONCAT) in ancient_authors_wikidata_with_precision.csv; other IDs (e.g. dco_id) may contain commas themselves
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Union-find (disjoint set) with path halving and union by size
+
+def find_root(parent, node):
+    """
+Description:
+Returns the root of the set holding node, halving the path on the way (amortised near-constant time).
+
+Arguments:
+parent (dict): node -> parent node (roots point to themselves).
+node (str): the node to look up (added as its own set if unknown).
+
+Returns:
+root (str)
+"""
+    parent.setdefault(node, node)
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+def union_nodes(parent, size, node_a, node_b):
+    """
+Description:
+Merges the sets holding node_a and node_b, hanging the smaller set under the larger one.
+
+Arguments:
+parent (dict): node -> parent node.
+size (dict): root -> number of nodes in its set.
+node_a (str), node_b (str): the two nodes of the edge.
+
+Returns:
+None
+"""
+    root_a, root_b = find_root(parent, node_a), find_root(parent, node_b)
+    if root_a == root_b:
+        return
+    if size.get(root_a, 1) < size.get(root_b, 1):
+        root_a, root_b = root_b, root_a
+    parent[root_b] = root_a
+    size[root_a] = size.get(root_a, 1) + size.pop(root_b, 1)
+
+## 2.2.: Turning identifier tables into edges
+
+def normalise_id_value(value):
+    """
+Description:
+Normalises an identifier read from a CSV (strips spaces, drops the '.0' pandas adds to integer IDs read as floats, keeps only the QID of Wikidata URIs).
+
+Arguments:
+value: the raw identifier.
+
+Returns:
+identifier (str or None): None for empty values.
+"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    value = str(value).strip()
+    if value in ('', 'nan', '<NA>', 'None'):
+        return None
+    value = re.sub(r'\.0$', '', value)
+    return value.split('/')[-1] if value.startswith('http://www.wikidata.org/entity/') else value
+
+def identity_node(id_type, value):
+    """
+Description:
+Builds the node name of an identifier in the graph, e.g. ('viaf', '23387750') -> 'viaf:23387750'.
+
+Arguments:
+id_type (str): the type of identifier ('qid', 'viaf', 'bnf', 'trismegistos', 'perseus', ...).
+value: the identifier.
+
+Returns:
+node (str or None): None for empty values.
+"""
+    value = normalise_id_value(value)
+    return f"{id_type}:{value}" if value else None
+
+def edges_from_dataframe(df, qid_column, id_columns, multi_valued_columns=()):
+    """
+Description:
+Creates one edge (QID node, ID node) for every identifier found in the given columns of every row.
+Columns holding lists (json.dumps or Python lists, as in steps 02 to 06) are read with parse_list_column(); multi_valued_columns are split on commas.
+
+Arguments:
+df (DataFrame): the table.
+qid_column (str): the column holding the QID.
+id_columns (dict): column -> id type (e.g. {'viaf_id': 'viaf', 'trismegistos_id': 'trismegistos'}).
+multi_valued_columns (list, optional): columns holding comma-separated identifiers. Defaults to ().
+
+Returns:
+edges (list): list of (node_a, node_b) tuples. Rows without identifiers still give a (QID node, QID node) edge so that every QID gets a cluster.
+"""
+    edges = []
+
+    for row in df.to_dict('records'):
+        qid_node = identity_node('qid', row[qid_column])
+        if not qid_node:
+            continue
+        edges.append((qid_node, qid_node))
+
+        for column, id_type in id_columns.items():
+            value = row.get(column)
+            if isinstance(value, str) and value.strip().startswith('['):
+                values = parse_list_column(value)
+            elif column in multi_valued_columns and isinstance(value, str):
+                values = value.split(',')
+            else:
+                values = value if isinstance(value, list) else [value]
+
+            for single_value in values:
+                id_node = identity_node(id_type, single_value)
+                if id_node:
+                    edges.append((qid_node, id_node))
+
+    return edges
+
+def edges_from_wikidata_ids_csv(wikidata_ids_csv):
+    """
+Description:
+Edges between every QID of ancient_authors_wikidata_ids.csv (use case 3) and its ancient world identifiers (Trismegistos, Perseus, TLG, PHI, ...).
+
+Arguments:
+wikidata_ids_csv (str): path to ancient_authors_wikidata_ids.csv.
+
+Returns:
+edges (list)
+"""
+    df_ids = pd.read_csv(wikidata_ids_csv, sep=UC3_SEPARATOR, dtype=str)
+    id_columns = {column: column.removesuffix('_id') for column in df_ids.columns if column != 'wikidata_id'}
+    for column in id_columns:
+        df_ids[column] = df_ids[column].map(lambda value: value.split('|') if isinstance(value, str) else value) # several values of one property are '|'-joined (IDs such as dco_id may contain commas)
+    return edges_from_dataframe(df_ids, 'wikidata_id', id_columns)
+
+def edges_from_with_precision_csv(with_precision_csv):
+    """
+Description:
+Edges between every QID of ancient_authors_wikidata_with_precision.csv (use case 3) and its VIAF and BnF identifiers.
+
+Arguments:
+with_precision_csv (str): path to ancient_authors_wikidata_with_precision.csv.
+
+Returns:
+edges (list)
+"""
+    df_with_precision = pd.read_csv(with_precision_csv, sep=UC3_SEPARATOR, dtype=str)
+    return edges_from_dataframe(df_with_precision, 'wikidata_id', {'viaf_id': 'viaf', 'bnf_id': 'bnf'}, MULTI_VALUED_UC3_COLUMNS)
+
+def edges_from_authors_csv(authors_csv):
+    """
+Description:
+Edges between every QID of a use case 2 authors CSV (outputs of steps 02 to 06) and its VIAF and Trismegistos IDs (single values or lists).
+
+Arguments:
+authors_csv (str): path to the CSV (with 'q_identifier' and 'viaf_id' and/or 'trismegistos_id').
+
+Returns:
+edges (list)
+"""
+    df_authors = pd.read_csv(authors_csv, dtype=str)
+    return edges_from_dataframe(df_authors, 'q_identifier', {'viaf_id': 'viaf', 'trismegistos_id': 'trismegistos'})
+
+## 2.3.: Computing the clusters
+
+def qid_sort_key(node):
+    # lowest QID number first (the oldest item, which is usually the one kept when Wikidata items are merged)
+    value = node.split(':', 1)[1]
+    return (0, int(value[1:])) if value[1:].isdigit() else (1, value)
+
+def build_identity_clusters(edges):
+    """
+Description:
+Computes the connected components of the identity graph with union-find and describes every component as one cluster (one real-world author).
+The canonical ID of a cluster is its lowest QID (or its first identifier if it holds no QID).
+Clusters holding several QIDs (e.g. two items sharing a VIAF cluster ID) are flagged with nb_qids > 1 for review.
+
+Arguments:
+edges (list): list of (node_a, node_b) tuples (see 2.2.), from any number of sources.
+
+Returns:
+tuple: (node_to_cluster (dict: node -> canonical cluster ID), df_clusters (DataFrame, one row per cluster with one JSON list column per ID type))
+"""
+    parent, size = {}, {}
+    for node_a, node_b in edges:
+        union_nodes(parent, size, node_a, node_b)
+
+    members = {}
+    for node in parent:
+        members.setdefault(find_root(parent, node), []).append(node)
+
+    node_to_cluster = {}
+    rows = []
+    for nodes in members.values():
+        qid_nodes = sorted((node for node in nodes if node.startswith('qid:')), key=qid_sort_key)
+        cluster_id = (qid_nodes[0] if qid_nodes else sorted(nodes)[0]).split(':', 1)[1]
+
+        row = {"cluster_id": cluster_id, "nb_qids": len(qid_nodes), "nb_identifiers": len(nodes), "q_identifiers": [node.split(':', 1)[1] for node in qid_nodes]}
+        for node in sorted(nodes):
+            node_to_cluster[node] = cluster_id
+            id_type, value = node.split(':', 1)
+            if id_type != 'qid':
+                row.setdefault(f"{id_type}_ids", []).append(value)
+        rows.append(row)
+
+    df_clusters = pd.DataFrame(rows)
+
+    print(f"[i] Built {len(df_clusters)} identity clusters from {len(edges)} edges ({len(node_to_cluster)} identifiers). {int((df_clusters['nb_qids'] > 1).sum())} cluster(s) hold more than one QID.")
+
+    return node_to_cluster, df_clusters
+
+def cluster_of(node_to_cluster, id_type, value):
+    """
+Description:
+Returns the canonical cluster ID of an identifier (e.g. cluster_of(node_to_cluster, 'viaf', '23387750')), or None if it is not in the graph.
+"""
+    node = identity_node(id_type, value)
+    return node_to_cluster.get(node) if node else None
+
+## 2.4.: Building the graph from all sources and saving the clusters
+
+def building_identity_graph(wikidata_ids_csv, with_precision_csv, authors_csvs, output_csv_dir):
+    """
+Description:
+Builds the identity graph from the use case 3 identifier tables and any number of use case 2 authors CSVs, and saves one row per cluster
+(identity_clusters.csv) as well as the cluster of every identifier (identity_cluster_members.csv), so that later steps can join on cluster_id instead of scanning tables pairwise.
+
+Arguments:
+wikidata_ids_csv (str or None): path to ancient_authors_wikidata_ids.csv.
+with_precision_csv (str or None): path to ancient_authors_wikidata_with_precision.csv.
+authors_csvs (list): paths to use case 2 authors CSVs (e.g. outputs of steps 02 and 03).
+output_csv_dir (str): path to the output directory.
+
+Returns:
+tuple: (node_to_cluster (dict), path to identity_clusters.csv)
+"""
+    timestamp = datetime.now().strftime('%Y%m%d')
+
+    edges = []
+    if wikidata_ids_csv:
+        edges.extend(edges_from_wikidata_ids_csv(wikidata_ids_csv))
+    if with_precision_csv:
+        edges.extend(edges_from_with_precision_csv(with_precision_csv))
+    for authors_csv in authors_csvs:
+        edges.extend(edges_from_authors_csv(authors_csv))
+
+    node_to_cluster, df_clusters = build_identity_clusters(edges)
+
+    # saving the list columns as JSON strings (remember to use json.loads when reloading)
+    id_list_columns = [column for column in df_clusters.columns if column.endswith('_ids') or column == 'q_identifiers']
+    for column in id_list_columns:
+        df_clusters[column] = df_clusters[column].apply(lambda values: json.dumps(values if isinstance(values, list) else []))
+
+    output_csv_subdir_path = os.path.join(output_csv_dir, OUTPUT_CSV_SUBDIR)
+    os.makedirs(output_csv_subdir_path, exist_ok=True)
+
+    clusters_csv_path = os.path.join(output_csv_subdir_path, f"{timestamp}_identity_clusters.csv")
+    df_clusters.sort_values(["nb_qids", "cluster_id"], ascending=[False, True]).to_csv(clusters_csv_path, index=False)
+
+    df_members = pd.DataFrame([(node.split(':', 1)[0], node.split(':', 1)[1], cluster_id) for node, cluster_id in node_to_cluster.items()], columns=["id_type", "id_value", "cluster_id"])
+    members_csv_path = os.path.join(output_csv_subdir_path, f"{timestamp}_identity_cluster_members.csv")
+    df_members.to_csv(members_csv_path, index=False)
+
+    print(f"|Y| Identity clusters saved to {clusters_csv_path} and their members to {members_csv_path}.")
+
+    return node_to_cluster, clusters_csv_path
+
+def load_identity_cluster_members(members_csv):
+    """
+Description:
+Reloads the node -> cluster mapping saved by building_identity_graph().
+
+Arguments:
+members_csv (str): path to identity_cluster_members.csv.
+
+Returns:
+node_to_cluster (dict)
+"""
+    df_members = pd.read_csv(members_csv, dtype=str)
+    return dict(zip(df_members["id_type"] + ':' + df_members["id_value"], df_members["cluster_id"]))
+
+### Step 3: Calling the function
+
+if __name__ == "__main__":
+    building_identity_graph(WIKIDATA_IDS_CSV, WIKIDATA_WITH_PRECISION_CSV, [MEDIATE_AUTHORS_CSV, TRISMEGISTOS_AUTHORS_CSV], OUTPUT_CSV_DIR)
@@ -0,0 +1,261 @@
+#####------------------------------------------------------------------------Author x collection matrix of the MEDIATE catalogues (sparse), with per-decade slicing, co-occurrences and similar authors-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+### Step 1: Defining relevant directories, file paths and variables
+
+## 1.1.: File paths
+
+MEDIATE_RAW_RESULTS_CSV = r'path_to\use-case-2\input\initial_author_lists\mediate\csv\raw_results\ancient_authors_-900_500_mediate_raw_results.csv' # saved by step 01, all the MEDIATE columns
+COLLECTIONS_METADATA_CSV = None # optional table of the MEDIATE collections ('collection_id' or 'collection', 'year', 'place'); otherwise the year and place are read from the collection titles
+OUTPUT_DIR = r'path_to\use-case-2\output\mediate_collection_matrix'
+
+## 1.2.: Parsing the 'Collections' column
+
+RAW_COLUMNS = {'short_name': 'Short name', 'viaf_id': 'VIAF ID (https://viaf.org)', 'collections': 'Collections'} # column names of the raw results
+COLLECTION_SEPARATOR = re.compile(r'\s*(?:;|\||\n)\s*') # between the collections of an author
+COLLECTION_ID_PATTERN = re.compile(r'/collections?/(\d+)|^#?(\d+)\b') # MEDIATE collection URL or leading number
+COLLECTION_YEAR_PATTERN = re.compile(r'(?<!\d)(1[6-8]\d\d)(?!\d)') # the catalogues date from 1665 to 1830
+COLLECTION_PLACE_PATTERN = re.compile(r"([A-Z][\w'\-. ]+?),?\s*\(?(?:1[6-8]\d\d)") # 'Catalogue ... , Amsterdam, 1742' -> 'Amsterdam'
+
+## 1.3.: Other
+
+MATRIX_NAME = 'mediate_author_collection'
+CHUNK_SIZE = 2000 # authors per block in the co-occurrence and similarity computations (bounds the memory used)
+TOP_K = 10
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Parsing the collections of an author
+
+def parse_collection_entry(entry):
+    """
+Description:
+Reads one collection of the 'Collections' column: its key (MEDIATE collection ID if there is one, else the normalised title), title, year and place (None if not found).
+
+Arguments:
+entry (str): one collection, e.g. 'https://mediate18.nl/collections/123 Catalogue de la bibliothèque de M. X, Paris, 1742'.
+
+Returns:
+tuple: (key, title, year, place)
+"""
+    match = COLLECTION_ID_PATTERN.search(entry)
+    collection_id = next((group for group in match.groups() if group), None) if match else None
+    title = re.sub(r'https?://\S+', '', entry).strip(' ,.-')
+    year = COLLECTION_YEAR_PATTERN.search(title)
+    place = COLLECTION_PLACE_PATTERN.search(title)
+    key = collection_id or re.sub(r'\s+', ' ', title.casefold())
+    return key, title, int(year.group(1)) if year else None, place.group(1).strip() if place else None
+
+def split_collections(value):
+    """
+Description:
+Splits the 'Collections' cell of an author into its collections (empty list for empty cells).
+"""
+    if not isinstance(value, str):
+        return []
+    return [entry for entry in COLLECTION_SEPARATOR.split(value) if entry.strip()]
+
+## 2.2.: Building, saving and loading the matrix
+
+def build_author_collection_matrix(df_authors, author_column='short_name', collections_column='collections', metadata_csv=None):
+    """
+Description:
+Parses the collections of every author into a sparse author x collection matrix (scipy CSR; a collection listed n times for an author counts n).
+The columns are sorted by year, so that the collections of a period are a contiguous block of columns (see slice_years()); undated collections come last.
+
+Arguments:
+df_authors (DataFrame): one row per author with the author label and the 'Collections' cell.
+author_column (str, optional): column identifying the authors (rows). Defaults to 'short_name'.
+collections_column (str, optional): column holding the collections. Defaults to 'collections'.
+metadata_csv (str, optional): table of the collections ('collection_id' or 'collection', 'year', 'place') overriding the year and place read from the titles. Defaults to None.
+
+Returns:
+collection_matrix (dict): 'matrix' (csr_matrix), 'authors' (row labels), 'collections' (column keys), 'titles', 'years' (int array, -1 if unknown), 'places' (array of str)
+"""
+    rows, keys, metadata, parsed = [], [], {}, {}
+    for row_nb, value in enumerate(df_authors[collections_column]):
+        for entry in split_collections(value):
+            if entry not in parsed: # the same collections come back for many authors
+                parsed[entry] = parse_collection_entry(entry)
+            key, title, year, place = parsed[entry]
+            rows.append(row_nb)
+            keys.append(key)
+            known = metadata.setdefault(key, [title, year, place])
+            known[1], known[2] = known[1] or year, known[2] or place
+
+    if metadata_csv:
+        df_metadata = pd.read_csv(metadata_csv, dtype=str)
+        key_column = 'collection_id' if 'collection_id' in df_metadata.columns else 'collection'
+        for key, year, place in zip(df_metadata[key_column], pd.to_numeric(df_metadata['year'], errors='coerce'), df_metadata['place']):
+            key = str(key).strip() if key_column == 'collection_id' else re.sub(r'\s+', ' ', str(key).casefold().strip())
+            if key in metadata:
+                metadata[key][1] = int(year) if pd.notna(year) else metadata[key][1]
+                metadata[key][2] = place if isinstance(place, str) else metadata[key][2]
+
+    collections = sorted(metadata, key=lambda key: (metadata[key][1] is None, metadata[key][1] or 0, key))
+    columns = pd.Index(collections).get_indexer(keys) if collections else np.array([], dtype=int)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (np.array(rows, dtype=np.int64), columns)), shape=(len(df_authors), len(collections))) # duplicates are summed
+
+    collection_matrix = {
+        "matrix": matrix,
+        "authors": df_authors[author_column].astype(str).tolist(),
+        "collections": collections,
+        "titles": [metadata[key][0] for key in collections],
+        "years": np.array([metadata[key][1] if metadata[key][1] is not None else -1 for key in collections], dtype=np.int64),
+        "places": np.array([metadata[key][2] or '' for key in collections], dtype=object),
+    }
+
+    nb_dated = int((collection_matrix["years"] >= 0).sum())
+    print(f"[i] {matrix.shape[0]} authors x {matrix.shape[1]} collections ({nb_dated} dated), {matrix.nnz} non-zero cells.")
+    if not matrix.shape[1]:
+        print(f"|!| No collection found in '{collections_column}': check that the MEDIATE export includes the collections of the authors.")
+
+    return collection_matrix
+
+def save_author_collection_matrix(collection_matrix, output_dir, name=MATRIX_NAME):
+    """
+Description:
+Saves the matrix as '{name}.npz' (scipy) and its labels and side arrays (collection years and places) as '{name}_labels.json'.
+"""
+    os.makedirs(output_dir, exist_ok=True)
+    sparse.save_npz(os.path.join(output_dir, f'{name}.npz'), collection_matrix["matrix"])
+    with open(os.path.join(output_dir, f'{name}_labels.json'), 'w', encoding='utf-8') as file:
+        json.dump({
+            "authors": collection_matrix["authors"],
+            "collections": collection_matrix["collections"],
+            "titles": collection_matrix["titles"],
+            "years": collection_matrix["years"].tolist(),
+            "places": collection_matrix["places"].tolist(),
+        }, file, ensure_ascii=False)
+    print(f"|Y| Author x collection matrix saved to {os.path.join(output_dir, name + '.npz')}.")
+
+def load_author_collection_matrix(output_dir, name=MATRIX_NAME):
+    """
+Description:
+Loads a matrix saved by save_author_collection_matrix().
+"""
+    with open(os.path.join(output_dir, f'{name}_labels.json'), encoding='utf-8') as file:
+        labels = json.load(file)
+    return {
+        "matrix": sparse.load_npz(os.path.join(output_dir, f'{name}.npz')).tocsr(),
+        "authors": labels["authors"],
+        "collections": labels["collections"],
+        "titles": labels["titles"],
+        "years": np.array(labels["years"], dtype=np.int64),
+        "places": np.array(labels["places"], dtype=object),
+    }
+
+## 2.3.: Querying the matrix
+
+def slice_years(collection_matrix, start, end):
+    """
+Description:
+Keeps the collections dated from start to end (included), e.g. a decade with slice_years(m, 1740, 1749). Since the columns are sorted by year, this is a contiguous block of columns found by binary search.
+
+Returns:
+collection_matrix (dict): same keys, restricted to the collections of the period.
+"""
+    years = collection_matrix["years"]
+    dated = years[:int((years >= 0).sum())] # undated collections (-1) are at the end
+    low, high = np.searchsorted(dated, start, side='left'), np.searchsorted(dated, end, side='right')
+    return {
+        "matrix": collection_matrix["matrix"][:, low:high],
+        "authors": collection_matrix["authors"],
+        "collections": collection_matrix["collections"][low:high],
+        "titles": collection_matrix["titles"][low:high],
+        "years": years[low:high],
+        "places": collection_matrix["places"][low:high],
+    }
+
+def collections_per_decade(collection_matrix, binary=True):
+    """
+Description:
+Number of collections per author and decade, as a DataFrame (authors x decades).
+"""
+    years = collection_matrix["years"]
+    decades = sorted({int(year) // 10 * 10 for year in years if year >= 0})
+    columns = {}
+    for decade in decades:
+        matrix = slice_years(collection_matrix, decade, decade + 9)["matrix"]
+        columns[decade] = np.asarray((matrix > 0).sum(axis=1) if binary else matrix.sum(axis=1)).ravel()
+    return pd.DataFrame(columns, index=collection_matrix["authors"])
+
+def author_cooccurrences(collection_matrix, min_count=1, chunk_size=CHUNK_SIZE):
+    """
+Description:
+Number of collections shared by every pair of authors (A.Aᵀ with A the binary author x collection matrix), computed by blocks of chunk_size authors so that only one block of the result is dense at a time.
+
+Arguments:
+collection_matrix (dict): output of build_author_collection_matrix() (possibly sliced with slice_years()).
+min_count (int, optional): pairs sharing fewer collections are dropped. Defaults to 1.
+chunk_size (int, optional): authors per block. Defaults to CHUNK_SIZE.
+
+Returns:
+cooccurrences (csr_matrix): authors x authors, the diagonal holding the number of collections of every author.
+"""
+    binary = (collection_matrix["matrix"] > 0).astype(np.float32).tocsr()
+    transposed = binary.T.tocsc()
+    blocks = []
+    for start in range(0, binary.shape[0], chunk_size):
+        block = (binary[start:start + chunk_size] @ transposed).tocsr()
+        if min_count > 1:
+            block.data[block.data < min_count] = 0
+            block.eliminate_zeros()
+        blocks.append(block)
+    return sparse.vstack(blocks).tocsr() if blocks else sparse.csr_matrix((0, 0), dtype=np.float32)
+
+def similar_authors(collection_matrix, k=TOP_K, authors=None, chunk_size=CHUNK_SIZE):
+    """
+Description:
+The k authors whose collections are the most similar (cosine of the binary author x collection rows) to every author, by blocks of chunk_size authors.
+
+Arguments:
+collection_matrix (dict): output of build_author_collection_matrix() (possibly sliced with slice_years()).
+k (int, optional): number of similar authors. Defaults to TOP_K.
+authors (list, optional): only these authors (row labels). Defaults to None (all).
+chunk_size (int, optional): authors per block. Defaults to CHUNK_SIZE.
+
+Returns:
+df_similar (DataFrame): 'author', 'similar_author', 'similarity' and 'shared_collections', k rows per author (fewer if less authors share a collection).
+"""
+    binary = (collection_matrix["matrix"] > 0).astype(np.float32).tocsr()
+    counts = np.asarray(binary.sum(axis=1)).ravel()
+    norms = np.sqrt(counts)
+    normalised = sparse.diags(np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)) @ binary
+    transposed = normalised.T.tocsc()
+    labels = collection_matrix["authors"]
+
+    row_nbs = np.arange(binary.shape[0]) if authors is None else pd.Index(labels).get_indexer(authors)
+    row_nbs = row_nbs[row_nbs >= 0]
+
+    results = []
+    for start in range(0, len(row_nbs), chunk_size):
+        block_rows = row_nbs[start:start + chunk_size]
+        similarities = (normalised[block_rows] @ transposed).toarray()
+        similarities[np.arange(len(block_rows)), block_rows] = -1 # not similar to themselves
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k] if similarities.shape[1] > k else np.argsort(-similarities, axis=1)
+        for i, row_nb in enumerate(block_rows):
+            for column in sorted(top[i], key=lambda column: -similarities[i, column]):
+                if similarities[i, column] > 0:
+                    results.append((labels[row_nb], labels[column], round(float(similarities[i, column]), 4), int(round(similarities[i, column] * norms[row_nb] * norms[column]))))
+
+    return pd.DataFrame(results, columns=['author', 'similar_author', 'similarity', 'shared_collections'])
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    df_raw = pd.read_csv(MEDIATE_RAW_RESULTS_CSV).rename(columns={raw: name for name, raw in RAW_COLUMNS.items()})
+    collection_matrix = build_author_collection_matrix(df_raw, metadata_csv=COLLECTIONS_METADATA_CSV)
+    save_author_collection_matrix(collection_matrix, OUTPUT_DIR)
+
+    collections_per_decade(collection_matrix).to_csv(os.path.join(OUTPUT_DIR, f'{MATRIX_NAME}_collections_per_decade.csv'))
+    similar_authors(collection_matrix).to_csv(os.path.join(OUTPUT_DIR, f'{MATRIX_NAME}_similar_authors.csv'), index=False)
+    print(f"|Y| Collections per decade and similar authors saved to {OUTPUT_DIR}.")
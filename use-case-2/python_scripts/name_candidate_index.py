@@ -0,0 +1,278 @@
+#####------------------------------------------------------------------------Trigram index over author names to rank candidate matches for unmatched authors (steps 05 and 06)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import os
+import re
+import ast
+import json
+import unicodedata
+import pandas as pd
+from collections import defaultdict
+from datetime import datetime
+
+### Step 1: Defining relevant variables
+
+TOP_K = 5 # number of candidates kept per unmatched author
+MIN_SCORE = 0.35 # candidates under this Dice score (on trigrams) are not reported
+OUTPUT_CSV_SUBDIR = '06_manually_adding_authors_to_final_mediate_csv'
+INTERMEDIATE_TAG = '06_intermediate'
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Normalising names and splitting them into trigrams
+
+def normalise_name(name):
+    """
+Description:
+Lowercases a name, strips diacritics and replaces punctuation with spaces ('Héliodore d'Émèse' -> 'heliodore d emese').
+
+Arguments:
+name (str): the name to normalise.
+
+Returns:
+normalised_name (str)
+"""
+    name = unicodedata.normalize('NFKD', str(name).casefold())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w]+', ' ', name).split())
+
+def name_trigrams(normalised_name):
+    """
+Description:
+Returns the set of character trigrams of a normalised name, padded with spaces so that the first and last letters count as much as the others.
+
+Arguments:
+normalised_name (str): the output of normalise_name().
+
+Returns:
+trigrams (set)
+"""
+    padded = f"  {normalised_name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def parse_list_column(value):
+    """
+Description:
+Reads a list stored in a CSV cell, whether it was saved with json.dumps() (steps 02, 03, 06) or as a Python list (some step 05 outputs, use case 1 aliases.csv).
+
+Arguments:
+value: the cell value.
+
+Returns:
+values (list): empty list if the cell is empty or unreadable.
+"""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    for parser in (json.loads, ast.literal_eval):
+        try:
+            parsed = parser(value)
+            return parsed if isinstance(parsed, list) else [parsed]
+        except (ValueError, SyntaxError):
+            continue
+    return []
+
+## 2.2.: Collecting the names to index
+
+def mediate_json_name_entries(formatted_mediate_json_table):
+    """
+Description:
+Collects the names of every author of the formatted MEDIATE JSON table (see step 05, 2.1.): short name, first names + surname, and surname alone.
+
+Arguments:
+formatted_mediate_json_table (str): path to the formatted MEDIATE JSON table (with 'viaf_id').
+
+Returns:
+entries (list): list of dictionaries with 'name', 'candidate_id' and the candidate metadata.
+"""
+    with open(formatted_mediate_json_table, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+
+    entries = []
+    for entry in data:
+        short_name = entry.get("short_name") or entry.get("Short name")
+        first_names = entry.get("first_names") or entry.get("First names")
+        surname = entry.get("surname") or entry.get("Surname")
+        candidate = {
+            "candidate_id": f"mediate:{entry.get('viaf_id') or short_name}",
+            "candidate_source": "mediate_json",
+            "candidate_label": short_name,
+            "candidate_viaf_id": entry.get("viaf_id"),
+            "candidate_q_identifier": None,
+            "candidate_nb_items": entry.get("# items"),
+            "candidate_nb_collections": entry.get("# collections"),
+        }
+        names = [short_name, surname, f"{first_names or ''} {surname or ''}"]
+        for name in names:
+            if name and str(name).strip():
+                entries.append({"name": str(name), **candidate})
+
+    return entries
+
+def wikidata_name_entries(authors_csv, source='mediate'):
+    """
+Description:
+Collects the Wikidata labels and aliases (English, French, Latin) of an already enriched list of authors (e.g. output of step 02 or step 05), so that an unmatched author that is in fact already in the list can be spotted.
+
+Arguments:
+authors_csv (str): path to a CSV with 'q_identifier', label and alias columns.
+source (str, optional): source tag of the list (for the '{source}_label' column). Defaults to 'mediate'.
+
+Returns:
+entries (list): list of dictionaries with 'name', 'candidate_id' and the candidate metadata.
+"""
+    df_authors = pd.read_csv(authors_csv, dtype={"q_identifier": str, "viaf_id": str})
+
+    entries = []
+    for _, row in df_authors.iterrows():
+        source_label = row.get(f"{source}_label")
+        candidate = {
+            "candidate_id": f"wikidata:{row['q_identifier']}",
+            "candidate_source": f"{source}_wikidata",
+            "candidate_label": source_label if not pd.isna(source_label) and source_label != '' else row.get("english_label"), # NaN (empty cell) is truthy
+            "candidate_viaf_id": row.get("viaf_id"),
+            "candidate_q_identifier": row["q_identifier"],
+            "candidate_nb_items": row.get(f"{source}_nb_items"),
+            "candidate_nb_collections": row.get(f"{source}_nb_collections"),
+        }
+        names = [row.get("english_label"), row.get("french_label"), row.get("latin_label"), row.get(f"{source}_label")]
+        for column in ("english_aliases", "french_aliases", "latin_aliases"):
+            names.extend(parse_list_column(row.get(column)))
+        for name in names:
+            if isinstance(name, str) and name.strip():
+                entries.append({"name": name, **candidate})
+
+    return entries
+
+## 2.3.: Building and querying the index
+
+def build_name_index(entries):
+    """
+Description:
+Builds an inverted index from character trigrams to the names containing them. Identical normalised names pointing to the same candidate are only indexed once.
+
+Arguments:
+entries (list): output of mediate_json_name_entries() and/or wikidata_name_entries().
+
+Returns:
+index (dict): {'names': normalised names, 'trigram_counts': number of trigrams per name, 'candidate_ids': candidate of every name, 'candidates': candidate metadata, 'postings': trigram -> list of name positions}
+"""
+    index = {"names": [], "trigram_counts": [], "candidate_ids": [], "candidates": {}, "postings": defaultdict(list)}
+    seen = set()
+
+    for entry in entries:
+        normalised = normalise_name(entry["name"])
+        if not normalised or (normalised, entry["candidate_id"]) in seen:
+            continue
+        seen.add((normalised, entry["candidate_id"]))
+
+        trigrams = name_trigrams(normalised)
+        position = len(index["names"])
+        index["names"].append(normalised)
+        index["trigram_counts"].append(len(trigrams))
+        index["candidate_ids"].append(entry["candidate_id"])
+        index["candidates"].setdefault(entry["candidate_id"], {key: value for key, value in entry.items() if key != "name"})
+        for trigram in trigrams:
+            index["postings"][trigram].append(position)
+
+    print(f"[i] Indexed {len(index['names'])} names ({len(index['candidates'])} candidates, {len(index['postings'])} distinct trigrams).")
+
+    return index
+
+def query_name_index(index, query_names, k=TOP_K, min_score=MIN_SCORE):
+    """
+Description:
+Scores every indexed name sharing trigrams with one of the query names (Dice coefficient on trigram sets) and returns the k best candidates.
+A candidate gets the best score over all its names and all the query names.
+
+Arguments:
+index (dict): output of build_name_index().
+query_names (list): the names of the author to match (label(s) and aliases).
+k (int, optional): number of candidates to return. Defaults to TOP_K.
+min_score (float, optional): candidates under this score are dropped. Defaults to MIN_SCORE.
+
+Returns:
+candidates (list): list of (candidate_id, score, matched indexed name, matching query name), best first.
+"""
+    best = {}
+
+    for query_name in query_names:
+        normalised = normalise_name(query_name)
+        if not normalised:
+            continue
+        trigrams = name_trigrams(normalised)
+
+        # counting the shared trigrams with every indexed name through the postings
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for position in index["postings"].get(trigram, ()):
+                shared[position] += 1
+
+        for position, nb_shared in shared.items():
+            score = 2 * nb_shared / (len(trigrams) + index["trigram_counts"][position])
+            candidate_id = index["candidate_ids"][position]
+            if score >= min_score and score > best.get(candidate_id, (0,))[0]:
+                best[candidate_id] = (score, index["names"][position], query_name)
+
+    ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:k]
+    return [(candidate_id, score, matched_name, query_name) for candidate_id, (score, matched_name, query_name) in ranked]
+
+## 2.4.: Ranking candidates for a whole list of unmatched authors (batch job)
+
+def rank_candidates_for_unmatched_authors(unmatched_authors_csv, formatted_mediate_json_table, output_csv_dir, known_authors_csv=None, k=TOP_K, min_score=MIN_SCORE):
+    """
+Description:
+For every author of the unmatched list (e.g. 05_..._unmatched_exclusive_trismegistos_authors.csv), queries the trigram index built over all MEDIATE names
+(and, optionally, over the labels and aliases of the authors already in the list) with the author's labels and aliases, and saves the k best candidates per author to a CSV for review.
+This replaces hand-searching the MEDIATE JSON table before step 06.
+
+Arguments:
+unmatched_authors_csv (str): path to the CSV of unmatched authors (with label and alias columns).
+formatted_mediate_json_table (str): path to the formatted MEDIATE JSON table (see step 05, 2.1.).
+output_csv_dir (str): path to the output directory.
+known_authors_csv (str, optional): path to the current list of MEDIATE ancient authors (e.g. output of step 05) to also flag unmatched authors that are already in it. Defaults to None.
+k (int, optional): number of candidates per author. Defaults to TOP_K.
+min_score (float, optional): minimum score of a reported candidate. Defaults to MIN_SCORE.
+
+Returns:
+candidates_csv_path (str): path to the CSV holding one row per (unmatched author, candidate).
+"""
+    timestamp = datetime.now().strftime('%Y%m%d')
+
+    entries = mediate_json_name_entries(formatted_mediate_json_table)
+    if known_authors_csv:
+        entries.extend(wikidata_name_entries(known_authors_csv))
+    index = build_name_index(entries)
+
+    df_unmatched = pd.read_csv(unmatched_authors_csv, dtype={"q_identifier": str})
+    label_columns = [column for column in df_unmatched.columns if column.endswith("_label")]
+
+    rows = []
+    for _, author in df_unmatched.iterrows():
+        query_names = [author[column] for column in label_columns if isinstance(author[column], str)]
+        for column in ("english_aliases", "french_aliases", "latin_aliases"):
+            query_names.extend(parse_list_column(author.get(column)))
+
+        for rank, (candidate_id, score, matched_name, query_name) in enumerate(query_name_index(index, query_names, k, min_score), 1):
+            rows.append({
+                "q_identifier": author.get("q_identifier"),
+                "english_label": author.get("english_label"),
+                "rank": rank,
+                "score": round(score, 3),
+                "query_name": query_name,
+                "matched_name": matched_name,
+                **index["candidates"][candidate_id],
+            })
+
+    df_candidates = pd.DataFrame(rows)
+    print(f"[i] Ranked candidates for {len(df_unmatched)} unmatched authors ({df_candidates['q_identifier'].nunique() if rows else 0} with at least one candidate).")
+
+    candidates_subdir_path = os.path.join(output_csv_dir, OUTPUT_CSV_SUBDIR, INTERMEDIATE_TAG)
+    os.makedirs(candidates_subdir_path, exist_ok=True)
+    candidates_csv_path = os.path.join(candidates_subdir_path, f"06_{timestamp}_candidate_mediate_authors_for_unmatched_authors.csv")
+    df_candidates.to_csv(candidates_csv_path, index=False)
+    print(f"|Y| Candidates saved to {candidates_csv_path}. Review them and copy the confirmed authors into LIST_AUTHORS_AS_DICTS (step 06).")
+
+    return candidates_csv_path
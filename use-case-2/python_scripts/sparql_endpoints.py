@@ -0,0 +1,220 @@
+#####------------------------------------------------------------------------Pool of SPARQL endpoints: health checks, latency-weighted routing, per-endpoint rate limits and failover-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import time
+import threading
+import http.client
+import urllib.error
+from SPARQLWrapper import SPARQLWrapper, JSON, POST
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError, EndPointNotFound, Unauthorized
+
+### Step 1: Defining relevant variables
+
+## 1.1.: Endpoints (the endpoint of the SPARQLWrapper setup of a script is always part of its pool, see endpoint_pool())
+# weight: share of the traffic relative to the other endpoints at equal latency; max_per_minute and max_concurrent: rate limits of the endpoint
+# a mirror or a local stand-in (e.g. a QLever or Blazegraph instance loaded with a Wikidata dump) is added as one more entry
+
+ENDPOINTS = [
+    {'url': 'https://query.wikidata.org/sparql', 'weight': 1.0, 'max_per_minute': 60, 'max_concurrent': 5},
+    # {'url': 'http://localhost:9999/bigdata/namespace/wdq/sparql', 'weight': 2.0, 'max_per_minute': 600, 'max_concurrent': 8},
+]
+DEFAULT_LIMITS = {'weight': 1.0, 'max_per_minute': 60, 'max_concurrent': 5} # for an endpoint that is not in ENDPOINTS
+
+## 1.2.: Failover
+
+TIMEOUT_SECONDS = 120
+MAX_ATTEMPTS = 8 # attempts of one query, on any endpoint, before giving up
+COOLDOWN_SECONDS = 5 # an endpoint failing (429, 5xx, timeout) is left aside for this long, doubled at every failure in a row (at most MAX_COOLDOWN_SECONDS)
+MAX_COOLDOWN_SECONDS = 300
+LATENCY_SMOOTHING = 0.3 # weight of the last query in the moving average of the latency of an endpoint
+# errors of the endpoint rather than of the query: 429 and 5xx (WDQS answers 500 when a query times out on its side), 401/404 (misconfigured endpoint),
+# timeouts, unreachable endpoints, interrupted answers and truncated JSON (ValueError); any other error (e.g. 400, a malformed query) is raised at once
+FAILOVER_ERRORS = (urllib.error.URLError, TimeoutError, ConnectionError, http.client.HTTPException, EndPointInternalError, EndPointNotFound, Unauthorized, ValueError)
+HEALTH_CHECK_QUERY = 'ASK { <http://www.wikidata.org/entity/Q1> ?property ?value }' # full IRIs: a local stand-in may not predefine the wd: prefix
+CHECK_ON_BUILD = True # the pool of a script checks its endpoints when it is built (see endpoint_pool()), so that a harvest does not start on an endpoint that is down
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Building the pool
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def build_endpoint_pool(endpoints=ENDPOINTS, agent=None):
+    """
+Description:
+Builds a pool of SPARQL endpoints. Every endpoint keeps its limits and its state (moving average of its latency, queries in flight, time of its next free slot, failures in a row, time until which it is left aside).
+
+Arguments:
+endpoints (list, optional): dictionaries with 'url' and optionally 'weight', 'max_per_minute' and 'max_concurrent'. Defaults to ENDPOINTS.
+agent (str, optional): the user agent sent to every endpoint. Defaults to None.
+
+Returns:
+pool (dict): 'agent', 'lock' and 'endpoints' (list of dictionaries).
+"""
+    pool_endpoints = []
+    for endpoint in endpoints:
+        settings = {**DEFAULT_LIMITS, **endpoint}
+        pool_endpoints.append({
+            **settings,
+            'min_interval': 60 / settings['max_per_minute'],
+            'latency': None,
+            'in_flight': 0,
+            'next_slot': 0.0,
+            'failures': 0,
+            'down_until': 0.0,
+            'nb_queries': 0,
+            'nb_failures': 0,
+        })
+    return {'agent': agent, 'lock': threading.Condition(), 'endpoints': pool_endpoints}
+
+def endpoint_pool(endpoint_url, agent=None):
+    """
+Description:
+The shared pool of a script (one per endpoint URL and user agent, so that all its threads share the rate limits): ENDPOINTS, plus endpoint_url if it is not one of them, first.
+Its endpoints are checked with check_endpoints() when it is built, unless CHECK_ON_BUILD is False.
+"""
+    with _POOLS_LOCK:
+        if (endpoint_url, agent) not in _POOLS:
+            endpoints = ENDPOINTS if any(endpoint['url'] == endpoint_url for endpoint in ENDPOINTS) else [{'url': endpoint_url}] + ENDPOINTS
+            _POOLS[(endpoint_url, agent)] = build_endpoint_pool(endpoints, agent)
+            if CHECK_ON_BUILD:
+                check_endpoints(_POOLS[(endpoint_url, agent)])
+        return _POOLS[(endpoint_url, agent)]
+
+## 2.2.: Routing
+
+def _expected_wait(endpoint, now):
+    # time before a query sent to this endpoint would be answered: wait for its next free slot, then its (average) latency divided by its weight
+    latency = endpoint['latency'] if endpoint['latency'] is not None else 1.0
+    return max(endpoint['next_slot'] - now, 0) + latency / endpoint['weight']
+
+def acquire_endpoint(pool):
+    """
+Description:
+Picks the endpoint expected to answer first among those that are up and below their number of concurrent queries, and books its next slot
+(the slots of an endpoint are min_interval = 60 / max_per_minute apart). Waits when every endpoint is down or busy.
+
+Returns:
+tuple: (endpoint (dict), seconds to wait before sending the query)
+"""
+    with pool['lock']:
+        while True:
+            now = time.monotonic()
+            available = [endpoint for endpoint in pool['endpoints'] if endpoint['down_until'] <= now and endpoint['in_flight'] < endpoint['max_concurrent']]
+            if available:
+                endpoint = min(available, key=lambda endpoint: _expected_wait(endpoint, now))
+                slot = max(endpoint['next_slot'], now)
+                endpoint['next_slot'] = slot + endpoint['min_interval']
+                endpoint['in_flight'] += 1
+                return endpoint, slot - now
+            # every endpoint is down or busy: waiting for the first one back (or for a query to end)
+            back = min((endpoint['down_until'] for endpoint in pool['endpoints'] if endpoint['down_until'] > now), default=now + 1)
+            pool['lock'].wait(timeout=max(back - now, 0.05))
+
+def release_endpoint(pool, endpoint, latency=None, failed=False, retry_after=None):
+    """
+Description:
+Records the outcome of a query: the latency of a success goes into the moving average of the endpoint, a failure leaves the endpoint aside
+for retry_after seconds (429) or for a cooldown doubled at every failure in a row.
+"""
+    with pool['lock']:
+        endpoint['in_flight'] -= 1
+        endpoint['nb_queries'] += 1
+        if failed:
+            endpoint['failures'] += 1
+            endpoint['nb_failures'] += 1
+            cooldown = retry_after if retry_after is not None else min(COOLDOWN_SECONDS * 2 ** (endpoint['failures'] - 1), MAX_COOLDOWN_SECONDS)
+            endpoint['down_until'] = time.monotonic() + cooldown
+        else:
+            endpoint['failures'] = 0
+            endpoint['latency'] = latency if endpoint['latency'] is None else (1 - LATENCY_SMOOTHING) * endpoint['latency'] + LATENCY_SMOOTHING * latency
+        pool['lock'].notify_all()
+
+## 2.3.: Running queries
+
+def _retry_after(error):
+    # seconds given by the Retry-After header of a 429 or 503 answer, if any
+    try:
+        return float(error.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def send_query(endpoint_url, agent, query, timeout=TIMEOUT_SECONDS):
+    sparql = SPARQLWrapper(endpoint_url, agent=agent) if agent else SPARQLWrapper(endpoint_url) # SPARQLWrapper's own agent otherwise
+    sparql.setMethod(POST)
+    sparql.setReturnFormat(JSON)
+    sparql.setTimeout(timeout)
+    sparql.setQuery(query)
+    return sparql.query().convert()
+
+def run_query(pool, query, max_attempts=MAX_ATTEMPTS, timeout=TIMEOUT_SECONDS):
+    """
+Description:
+Runs a SPARQL query on the pool: on the endpoint expected to answer first, and on another one (or the same, once back) when it answers 429 or 5xx, times out or cannot be reached.
+Other errors (a malformed query, a query too long...) are raised at once, see FAILOVER_ERRORS.
+
+Arguments:
+pool (dict): output of build_endpoint_pool() or endpoint_pool().
+query (str): the SPARQL query.
+max_attempts (int, optional): attempts before giving up. Defaults to MAX_ATTEMPTS.
+timeout (int, optional): seconds before a query is abandoned. Defaults to TIMEOUT_SECONDS.
+
+Returns:
+results (dict): the JSON results of the query.
+"""
+    for attempt in range(1, max_attempts + 1):
+        endpoint, wait = acquire_endpoint(pool)
+        if wait > 0:
+            time.sleep(wait)
+        started = time.monotonic()
+        try:
+            results = send_query(endpoint['url'], pool['agent'], query, timeout)
+        except FAILOVER_ERRORS as e:
+            retry_after = _retry_after(e) if isinstance(e, urllib.error.HTTPError) and e.code in (429, 503) else None
+            release_endpoint(pool, endpoint, failed=True, retry_after=retry_after)
+            if attempt == max_attempts:
+                raise
+            print(f"|!| Query failed on {endpoint['url']} (attempt {attempt}/{max_attempts}): {e}. Endpoint left aside for {endpoint['down_until'] - time.monotonic():.0f}s.")
+            continue
+        except Exception:
+            release_endpoint(pool, endpoint, failed=True)
+            raise
+        release_endpoint(pool, endpoint, time.monotonic() - started)
+        return results
+
+def check_endpoints(pool, query=HEALTH_CHECK_QUERY, timeout=30):
+    """
+Description:
+Sends a small query to every endpoint of the pool, to measure its latency and leave aside the ones that do not answer before a harvest starts.
+
+Returns:
+health (list): one dictionary per endpoint with 'url', 'up' and 'latency' (seconds).
+"""
+    health = []
+    for endpoint in pool['endpoints']:
+        with pool['lock']:
+            endpoint['in_flight'] += 1
+        started = time.monotonic()
+        try:
+            send_query(endpoint['url'], pool['agent'], query, timeout)
+            release_endpoint(pool, endpoint, time.monotonic() - started)
+            health.append({'url': endpoint['url'], 'up': True, 'latency': round(endpoint['latency'], 3)})
+        except Exception as e:
+            release_endpoint(pool, endpoint, failed=True)
+            health.append({'url': endpoint['url'], 'up': False, 'latency': None})
+            print(f"|!| {endpoint['url']} did not answer the health check: {e}")
+    return health
+
+def pool_summary(pool):
+    # queries, failures and average latency of every endpoint (e.g. printed at the end of a harvest)
+    return [{'url': endpoint['url'], 'queries': endpoint['nb_queries'], 'failures': endpoint['nb_failures'],
+             'latency': round(endpoint['latency'], 3) if endpoint['latency'] is not None else None} for endpoint in pool['endpoints']]
+
+### Step 3: Calling the functions
+
+if __name__ == "__main__":
+    pool = build_endpoint_pool(ENDPOINTS, agent="your_role - your_email@email.com")
+    for endpoint_health in check_endpoints(pool):
+        print(f"[i] {endpoint_health['url']}: {'up' if endpoint_health['up'] else 'DOWN'}" + (f", {endpoint_health['latency']}s" if endpoint_health['up'] else ""))
@@ -0,0 +1,280 @@
+#####------------------------------------------------------------------------Enriching author lists on Wikidata by external identifier (chunked and concurrent SPARQL queries)-----------------------------------------------------------------######
+
+### Step 0: Importing necessary libraries
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sparql_endpoints import ENDPOINTS, DEFAULT_LIMITS, endpoint_pool, run_query
+
+### Step 1: Defining relevant variables
+
+## 1.1. External identifier properties (as used in steps 02 and 03)
+
+EXTERNAL_ID_PROPERTIES = {
+    'viaf_id': 'P214',
+    'trismegistos_id': 'P11252',
+}
+
+## 1.2. Facets that can be requested for every matched item
+# 'kind' decides how the facet is queried: 'label' (rdfs:label, single value), 'aliases' (skos:altLabel, list) or 'property_label' (English label of the values of a property, list)
+
+FACETS = {
+    'english_label': {'kind': 'label', 'lang': 'en'},
+    'french_label': {'kind': 'label', 'lang': 'fr'},
+    'latin_label': {'kind': 'label', 'lang': 'la'},
+    'english_aliases': {'kind': 'aliases', 'lang': 'en'},
+    'french_aliases': {'kind': 'aliases', 'lang': 'fr'},
+    'latin_aliases': {'kind': 'aliases', 'lang': 'la'},
+    'writing_languages': {'kind': 'property_label', 'property': 'P6886'},
+}
+
+DEFAULT_FACETS = list(FACETS)
+
+## 1.3. Other
+
+CHUNK_SIZE = 200 # number of external IDs sent in a single VALUES block
+MAX_WORKERS = sum(endpoint.get('max_concurrent', DEFAULT_LIMITS['max_concurrent']) for endpoint in ENDPOINTS) # number of chunks queried at the same time: as many as the endpoints accept (see sparql_endpoints.py)
+MAX_RETRIES = 5
+GROUP_FACETS = True # one query per facet group (all labels, all aliases, one property) rather than one per facet, see plan_facet_queries()
+
+
+### Step 2: Defining the functions
+
+## 2.1.: Planning the queries of one chunk of external IDs
+# Chaining one OPTIONAL per facet multiplies the rows of an item (3 English aliases x 2 French aliases x 2 writing languages = 12 rows before GROUP_CONCAT).
+# Instead, one query matches the external IDs to QIDs and one narrow query per facet group returns one row per value; the results are merged by QID.
+
+def facet_group(facet):
+    """
+Description:
+Returns the group of a facet: facets of a group are retrieved by the same query (all the labels, all the aliases, the labels of the values of one property).
+"""
+    spec = FACETS[facet]
+    return (spec['kind'], spec.get('property'))
+
+def plan_facet_queries(facets=DEFAULT_FACETS, grouped=True):
+    """
+Description:
+Splits the requested facets into the narrow queries to send for every chunk.
+
+Arguments:
+facets (list, optional): names of the facets to retrieve (keys of FACETS). Defaults to DEFAULT_FACETS.
+grouped (bool, optional): one query per facet group (see facet_group()) if True, one query per facet otherwise. Defaults to True.
+
+Returns:
+plan (list): list of lists of facets, one list per query.
+"""
+    if not grouped:
+        return [[facet] for facet in facets]
+    groups = {}
+    for facet in facets:
+        groups.setdefault(facet_group(facet), []).append(facet)
+    return list(groups.values())
+
+def build_match_query(external_ids, property_id):
+    """
+Description:
+Builds the SPARQL query matching a chunk of external IDs (e.g. VIAF cluster IDs with P214, Trismegistos IDs with P11252) to their QIDs.
+
+Arguments:
+external_ids (list): the external IDs (as strings) of the chunk.
+property_id (str): the Wikidata property holding the external ID (e.g. 'P214').
+
+Returns:
+query (str): the SPARQL query.
+"""
+    values_block = " ".join(f'"{id_}"' for id_ in external_ids)
+
+    return f"""
+    SELECT ?externalID ?item WHERE {{
+    VALUES ?externalID {{ {values_block} }}
+    ?item wdt:{property_id} ?externalID.
+    }}
+    """
+
+def build_facet_query(external_ids, property_id, facets, matches=None):
+    """
+Description:
+Builds the SPARQL query retrieving the values of one facet group for a chunk of external IDs, one row per (external ID, QID, value) and no OPTIONAL,
+so that the size of the response is the number of values and not their product.
+
+Arguments:
+external_ids (list): the external IDs (as strings) of the chunk.
+property_id (str): the Wikidata property holding the external ID (e.g. 'P214').
+facets (list): facets of the same group (see plan_facet_queries()).
+matches (dict, optional): external ID -> QIDs already known (see identifier_crosswalk.py); the (external ID, QID) pairs are then given to the query instead of being matched again. Defaults to None.
+
+Returns:
+query (str): the SPARQL query (variables ?externalID, ?item, ?value and ?lang).
+"""
+    if matches is None:
+        match_block = f"""VALUES ?externalID {{ {" ".join(f'"{id_}"' for id_ in external_ids)} }}
+    ?item wdt:{property_id} ?externalID."""
+    else:
+        match_block = f"""VALUES (?externalID ?item) {{ {" ".join(f'("{id_}" wd:{qid})' for id_ in external_ids for qid in matches.get(id_, []))} }}"""
+    kind, property_ = facet_group(facets[0])
+
+    if kind == 'property_label':
+        pattern = f"""?item wdt:{property_} ?valueItem.
+    ?valueItem rdfs:label ?value.
+    BIND(LANG(?value) AS ?lang)
+    FILTER(?lang = "en")"""
+    else:
+        predicate = 'rdfs:label' if kind == 'label' else 'skos:altLabel'
+        languages = ", ".join(dict.fromkeys(f'"{FACETS[facet]["lang"]}"' for facet in facets))
+        pattern = f"""?item {predicate} ?value.
+    BIND(LANG(?value) AS ?lang)
+    FILTER(?lang IN ({languages}))"""
+
+    return f"""
+    SELECT ?externalID ?item ?value ?lang WHERE {{
+    {match_block}
+    {pattern}
+    }}
+    """
+
+## 2.2.: Running one query on the pool of endpoints of the setup (see sparql_endpoints.py)
+
+def run_chunk_query(endpoint_url, agent, query, max_retries=MAX_RETRIES):
+    """
+Description:
+Runs a SPARQL query on the pool of endpoints of endpoint_url (the endpoint itself and the other endpoints of sparql_endpoints.ENDPOINTS), within their rate limits,
+moving to another endpoint when one answers 429 or 5xx or times out. Queries are sent with POST so that large VALUES blocks do not hit URL-length limits.
+
+Arguments:
+endpoint_url (str): the SPARQL endpoint of the setup.
+agent (str): the user agent to send with the request.
+query (str): the SPARQL query.
+max_retries (int, optional): number of attempts before giving up. Defaults to MAX_RETRIES.
+
+Returns:
+results (dict): the JSON results of the query.
+"""
+    return run_query(endpoint_pool(endpoint_url, agent), query, max_attempts=max_retries)
+
+## 2.3.: Merging the bindings of a chunk into records
+
+def qid_from_binding(result):
+    qid_uri = result.get("item", {}).get("value", "")
+    return qid_uri.split("/")[-1] if qid_uri else None
+
+def merge_facet_bindings(match_bindings, facet_bindings, facets=DEFAULT_FACETS):
+    """
+Description:
+Merges the results of the match query and of the facet queries of a chunk into one record per (external ID, QID) pair, in the order of the match query.
+Labels are kept as strings, aliases and writing languages as deduplicated lists (every value is kept).
+
+Arguments:
+match_bindings (list): results["results"]["bindings"] of build_match_query().
+facet_bindings (list): list of (facets, bindings) pairs, one per query of plan_facet_queries().
+facets (list, optional): names of the facets that were requested. Defaults to DEFAULT_FACETS.
+
+Returns:
+records (list): list of dictionaries with 'external_id', 'q_identifier' and one key per facet.
+"""
+    records = {}
+
+    for result in match_bindings:
+        key = (result["externalID"]["value"], qid_from_binding(result))
+        records[key] = {"external_id": key[0], "q_identifier": key[1]}
+        for facet in facets:
+            records[key][facet] = "" if FACETS[facet]['kind'] == 'label' else []
+
+    for group_facets, bindings in facet_bindings:
+        for result in bindings:
+            record = records.get((result["externalID"]["value"], qid_from_binding(result)))
+            if record is None:
+                continue
+            value, lang = result["value"]["value"], result.get("lang", {}).get("value", "")
+            for facet in group_facets:
+                spec = FACETS[facet]
+                if spec.get('lang', lang) != lang:
+                    continue
+                if spec['kind'] == 'label':
+                    record[facet] = record[facet] or value
+                elif value not in record[facet]:
+                    record[facet].append(value)
+
+    return list(records.values())
+
+## 2.4.: The engine itself: splitting IDs into chunks, querying their facets concurrently and merging the results
+
+def enrich_by_external_id(external_ids, property_id, sparql_setup, facets=DEFAULT_FACETS, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS, grouped=GROUP_FACETS, matches=None):
+    """
+Description:
+Queries Wikidata for a list of external IDs held by a given property (e.g. VIAF cluster IDs with P214, Trismegistos IDs with P11252) and retrieves the QID and the requested facets for every match.
+IDs are split into chunks of chunk_size. Every chunk is sent as one match query plus one narrow query per facet group (see plan_facet_queries()), all queried concurrently,
+and the results are merged by QID in input order, so that the cost grows linearly with the number of IDs and of facets.
+
+Arguments:
+external_ids (list): the external IDs to query (duplicates and NaN values are dropped).
+property_id (str): the Wikidata property holding the external ID (see EXTERNAL_ID_PROPERTIES).
+sparql_setup: SPARQLWrapper setup with endpoint and agent (only used for its endpoint and agent).
+facets (list, optional): names of the facets to retrieve (keys of FACETS). Defaults to DEFAULT_FACETS.
+chunk_size (int, optional): number of IDs per query. Defaults to CHUNK_SIZE.
+max_workers (int, optional): number of queries sent at the same time. Defaults to MAX_WORKERS.
+grouped (bool, optional): one query per facet group rather than one per facet. Defaults to GROUP_FACETS.
+matches (dict, optional): external ID -> QIDs already resolved locally (see ids_to_qids() in identifier_crosswalk.py). The match query is then skipped, IDs without QIDs are unmatched
+    and only the facets of the matched IDs are queried. Defaults to None.
+
+Returns:
+tuple: (records (list of dicts, one per external ID - QID pair), matched_ids (set), unmatched_ids (list, in input order, excluding IDs of failed chunks), error_log (list of dicts for failed chunks))
+"""
+    # normalising the IDs to strings and deduplicating them while keeping the order
+    ids = list(dict.fromkeys(str(id_).strip() for id_ in external_ids if id_ is not None and str(id_).strip() not in ('', 'nan', '<NA>')))
+
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    plan = plan_facet_queries(facets, grouped)
+    print(f"[i] Querying {len(ids)} external IDs ({property_id}) in {len(chunks)} chunk(s) of at most {chunk_size} IDs, {len(plan) + (matches is None)} queries per chunk, {max_workers} at a time.")
+
+    # query 0 of every chunk is the match query, the next ones follow the plan
+    bindings_per_chunk = [[None] * (1 + len(plan)) for _ in chunks]
+    errors_per_chunk = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for chunk_nb, chunk in enumerate(chunks):
+            if matches is None:
+                queries = [build_match_query(chunk, property_id)] + [build_facet_query(chunk, property_id, group_facets) for group_facets in plan]
+            else:
+                # the known (external ID, QID) pairs stand for the results of the match query
+                bindings_per_chunk[chunk_nb][0] = [{"externalID": {"value": id_}, "item": {"value": f"http://www.wikidata.org/entity/{qid}"}} for id_ in chunk for qid in matches.get(id_, [])]
+                queries = [None] + [build_facet_query(chunk, property_id, group_facets, matches) for group_facets in plan if bindings_per_chunk[chunk_nb][0]]
+                if not bindings_per_chunk[chunk_nb][0]:
+                    bindings_per_chunk[chunk_nb][1:] = [[] for _ in plan]
+            for query_nb, query in enumerate(queries):
+                if query is None:
+                    continue
+                futures[executor.submit(run_chunk_query, sparql_setup.endpoint, sparql_setup.agent, query)] = (chunk_nb, query_nb)
+
+        for future in as_completed(futures):
+            chunk_nb, query_nb = futures[future]
+            try:
+                bindings_per_chunk[chunk_nb][query_nb] = future.result()["results"]["bindings"]
+            except Exception as e:
+                if chunk_nb not in errors_per_chunk:
+                    print(f"|!| [{chunk_nb + 1}/{len(chunks)}] Chunk failed: {e}. Saving to error_log.")
+                    errors_per_chunk[chunk_nb] = {
+                        "chunk": chunk_nb,
+                        "external_ids": chunks[chunk_nb],
+                        "error": str(e),
+                        "traceback": traceback.format_exc()
+                    }
+
+    # merging every chunk whose queries all succeeded, in input order
+    records = []
+    for chunk_nb, bindings in enumerate(bindings_per_chunk):
+        if chunk_nb in errors_per_chunk:
+            continue
+        chunk_records = merge_facet_bindings(bindings[0], list(zip(plan, bindings[1:])), facets)
+        print(f"|Y| [{chunk_nb + 1}/{len(chunks)}] Chunk returned {len(chunk_records)} records ({sum(len(b) for b in bindings)} rows).")
+        records.extend(chunk_records)
+    error_log = list(errors_per_chunk.values())
+
+    # IDs of failed chunks are neither matched nor unmatched (they are in the error_log and should simply be queried again)
+    failed_ids = {id_ for error in error_log for id_ in error["external_ids"]}
+    matched_ids = {record["external_id"] for record in records}
+    unmatched_ids = [id_ for id_ in ids if id_ not in matched_ids and id_ not in failed_ids]
+
+    print(f"[i] Matched {len(matched_ids)} out of {len(ids)} external IDs ({property_id}). {len(unmatched_ids)} unmatched, {len(failed_ids)} in failed chunks.")
+
+    return records, matched_ids, unmatched_ids, error_log
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+import pandas as pd
+
+# === CONFIG ===
+INPUT_FILE = "ancient_authors_wikidata_with_precision.csv"
+OUTPUT_FILE = "ancient_authors_wikidata_date_intervals.csv"
+DELIMITER = ";"
+
+# Wikidata time precision -> years a value can be off (6 = millennium, 7 = century, 8 = decade, 9 = year, 10/11 = month/day).
+# The year of a century is not stored consistently (1st century BCE as -100, -99 or -50...), so the margin is taken on both sides.
+PRECISION_MARGINS = {6: 999, 7: 99, 8: 9, 9: 0, 10: 0, 11: 0}
+DEFAULT_PRECISION = 9  # a year without precision is taken as exact
+
+# activity of an author relative to the dates of their life
+MIN_ACTIVE_AGE = 15
+MAX_LIFE_SPAN = 90
+FLORUIT_MARGIN = 0  # years added around the floruit
+
+INTERVAL_COLUMNS = ["wikidata_id", "earliest", "latest", "precision", "sources"]
+
+# "authors active between -100 and 100, dates known at least to the century"
+EXAMPLE_QUERY = {"start": -100, "end": 100, "min_precision": 7}
+
+# === DATES -> INTERVALS ===
+def year_bounds(year, precision):
+    # [lowest, highest] value of a year given its precision (vectorised: Series in, Series out)
+    margin = precision.fillna(DEFAULT_PRECISION).map(lambda p: PRECISION_MARGINS.get(int(p), 0) if p >= 6 else 9999)
+    return year - margin, year + margin
+
+def activity_intervals(df):
+    # every date gives a range the activity of the author must fall in; the ranges are intersected
+    # (or joined, when the dates contradict each other) into one [earliest, latest] interval per author
+    ranges = []
+    for column, before, after in (("birth", MIN_ACTIVE_AGE, MAX_LIFE_SPAN), ("death", MIN_ACTIVE_AGE - MAX_LIFE_SPAN, 0), ("floruit", -FLORUIT_MARGIN, FLORUIT_MARGIN)):
+        year = pd.to_numeric(df[f"{column}_year"], errors="coerce")
+        precision = pd.to_numeric(df[f"{column}_precision"], errors="coerce")
+        low, high = year_bounds(year, precision)
+        ranges.append((column, low + before, high + after, precision.where(year.notna())))
+
+    lows = pd.concat([low for _, low, _, _ in ranges], axis=1)
+    highs = pd.concat([high for _, _, high, _ in ranges], axis=1)
+    earliest, latest = lows.max(axis=1), highs.min(axis=1)
+    contradictory = earliest > latest
+    earliest = earliest.where(~contradictory, lows.min(axis=1))
+    latest = latest.where(~contradictory, highs.max(axis=1))
+
+    precisions = pd.concat([p for _, _, _, p in ranges], axis=1)
+    dated = pd.concat([low.notna().rename(column) for column, low, _, _ in ranges], axis=1)
+    intervals = pd.DataFrame({
+        "wikidata_id": df["wikidata_id"],
+        "earliest": earliest,
+        "latest": latest,
+        "precision": precisions.fillna(DEFAULT_PRECISION).where(dated.values).min(axis=1),  # coarsest precision of the dates used
+        "sources": dated.apply(lambda row: ",".join(c for c in row.index if row[c]), axis=1),
+    })
+    intervals = intervals[intervals["earliest"].notna()]
+    return intervals.astype({"earliest": int, "latest": int, "precision": int}).reset_index(drop=True)
+
+# === SORTED-ENDPOINT INDEX ===
+def build_interval_index(intervals):
+    # intervals sorted by their start; no interval is longer than max_length, so the ones overlapping [start, end]
+    # all start in [start - max_length, end]: two binary searches, then a vectorised check of their ends
+    intervals = intervals.sort_values(["earliest", "latest"], kind="stable")
+    return {
+        "qids": intervals["wikidata_id"].to_numpy(),
+        "starts": intervals["earliest"].to_numpy(),
+        "ends": intervals["latest"].to_numpy(),
+        "precisions": intervals["precision"].to_numpy(),
+        "max_length": int((intervals["latest"] - intervals["earliest"]).max()) if len(intervals) else 0,
+    }
+
+def authors_active_between(index, start, end, min_precision=None, mode="overlap"):
+    # mode: "overlap" (possibly active in [start, end]), "within" (certainly active only in [start, end]), "contains" (active over the whole of [start, end])
+    low = np.searchsorted(index["starts"], start - index["max_length"] if mode != "within" else start, side="left")
+    high = np.searchsorted(index["starts"], end if mode != "contains" else start, side="right")
+    ends = index["ends"][low:high]
+    if mode == "overlap":
+        keep = ends >= start
+    elif mode == "within":
+        keep = ends <= end
+    elif mode == "contains":
+        keep = ends >= end
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    if min_precision is not None:
+        keep &= index["precisions"][low:high] >= min_precision
+    return index["qids"][low:high][keep]
+
+def read_intervals(filename=OUTPUT_FILE):
+    return pd.read_csv(filename, sep=DELIMITER, dtype={"wikidata_id": str})
+
+def main():
+    print(f"📥 Reading dates from: {INPUT_FILE}")
+    df = pd.read_csv(INPUT_FILE, sep=DELIMITER, dtype={"wikidata_id": str})
+    intervals = activity_intervals(df)
+    print(f"🔢 {len(intervals)} of {len(df)} authors dated.")
+
+    intervals.to_csv(OUTPUT_FILE, sep=DELIMITER, index=False, columns=INTERVAL_COLUMNS)
+    print(f"💾 Intervals saved to {OUTPUT_FILE}")
+
+    index = build_interval_index(intervals)
+    started = time.perf_counter()
+    qids = authors_active_between(index, **EXAMPLE_QUERY)
+    print(f"🔍 Active between {EXAMPLE_QUERY['start']} and {EXAMPLE_QUERY['end']} (precision >= {EXAMPLE_QUERY['min_precision']}): "
+          f"{len(qids)} authors in {(time.perf_counter() - started) * 1000:.3f} ms")
+    print("✅ Done.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# === CONFIG ===
+INPUT_FILE = "ancient_authors_wikidata_item_metrics.csv"
+VOCABULARY_FILE = "ancient_authors_wikidata_sitelink_languages.csv"  # project;bit;lang_code, fixed: new codes get the next free bit
+OUTPUT_FILE = "ancient_authors_wikidata_sitelink_bitmaps.npz"
+DELIMITER = ";"
+LANG_SEPARATOR = ","
+WORD_BITS = 64
+
+# "authors with an Arabic and a Persian Wikipedia page"
+EXAMPLE_QUERY = {"project": "wikipedia", "all_of": ["ar", "fa"]}
+
+# === VOCABULARY ===
+def split_langs(value):
+    # 'la,,lez' -> ['la', 'lez']
+    return [code.strip() for code in str(value or "").split(LANG_SEPARATOR) if code.strip()]
+
+def clean_langs(value):
+    return LANG_SEPARATOR.join(dict.fromkeys(split_langs(value)))
+
+def read_vocabulary(filename=VOCABULARY_FILE):
+    # project -> list of language codes, the position of a code being its bit; projects keep the order of the file, so that rewriting it does not reorder it
+    if not os.path.exists(filename):
+        return {}
+    df = pd.read_csv(filename, sep=DELIMITER, dtype={"lang_code": str}, keep_default_na=False).sort_values("bit", kind="stable")
+    return {project: list(group["lang_code"]) for project, group in df.groupby("project", sort=False)}
+
+def write_vocabulary(vocabulary, filename=VOCABULARY_FILE):
+    rows = [(project, bit, code) for project, codes in vocabulary.items() for bit, code in enumerate(codes)]
+    pd.DataFrame(rows, columns=["project", "bit", "lang_code"]).to_csv(filename, sep=DELIMITER, index=False)
+
+def extend_vocabulary(vocabulary, df_metrics):
+    # codes already in the vocabulary keep their bit, new ones are appended (sorted), so stored bitmaps stay valid
+    vocabulary = {project: list(codes) for project, codes in vocabulary.items()}
+    for column in [c for c in df_metrics.columns if c.endswith("_langs")]:
+        codes = vocabulary.setdefault(column[:-len("_langs")], [])
+        known = set(codes)
+        codes.extend(sorted({code for value in df_metrics[column] for code in split_langs(value)} - known))
+    return vocabulary
+
+# === ENCODING ===
+def nb_words(vocabulary, project):
+    return max(1, -(-len(vocabulary.get(project, [])) // WORD_BITS))
+
+def encode_project(values, codes):
+    # one row of uint64 words per author, bit i of the row set when the author has a page in language codes[i]
+    bits = pd.Series(range(len(codes)), index=codes, dtype=np.int64)
+    exploded = pd.Series(list(values)).map(split_langs).explode().dropna()
+    positions = bits.reindex(exploded.to_numpy()).to_numpy()
+    known = ~np.isnan(positions)
+    rows, positions = exploded.index.to_numpy()[known].astype(np.int64), positions[known].astype(np.int64)
+
+    bitmaps = np.zeros((len(values), max(1, -(-len(codes) // WORD_BITS))), dtype=np.uint64)
+    np.bitwise_or.at(bitmaps, (rows, positions // WORD_BITS), np.left_shift(np.uint64(1), (positions % WORD_BITS).astype(np.uint64)))
+    return bitmaps
+
+def encode_sitelinks(df_metrics, vocabulary):
+    return {
+        "qids": df_metrics["wikidata_id"].to_numpy(dtype=str),
+        "vocabulary": vocabulary,
+        "bitmaps": {project: encode_project(df_metrics[f"{project}_langs"], codes)
+                    for project, codes in vocabulary.items() if f"{project}_langs" in df_metrics.columns},
+    }
+
+def save_bitmaps(sitelinks, filename=OUTPUT_FILE):
+    np.savez_compressed(filename, qids=sitelinks["qids"], **{f"bitmap_{project}": bitmaps for project, bitmaps in sitelinks["bitmaps"].items()})
+
+def load_bitmaps(filename=OUTPUT_FILE, vocabulary_file=VOCABULARY_FILE):
+    with np.load(filename) as data:
+        return {
+            "qids": data["qids"],
+            "vocabulary": read_vocabulary(vocabulary_file),
+            "bitmaps": {key[len("bitmap_"):]: data[key] for key in data.files if key.startswith("bitmap_")},
+        }
+
+def write_sitelink_bitmaps(metrics_file=INPUT_FILE, vocabulary_file=VOCABULARY_FILE, output_file=OUTPUT_FILE):
+    # called by the harvesters after writing the item metrics CSV
+    df_metrics = pd.read_csv(metrics_file, sep=DELIMITER, dtype=str, keep_default_na=False)
+    vocabulary = extend_vocabulary(read_vocabulary(vocabulary_file), df_metrics)
+    write_vocabulary(vocabulary, vocabulary_file)
+    sitelinks = encode_sitelinks(df_metrics, vocabulary)
+    save_bitmaps(sitelinks, output_file)
+    print(f"🧮 Sitelink bitmaps of {len(sitelinks['qids'])} authors saved to {output_file} ({sum(len(c) for c in vocabulary.values())} codes in {vocabulary_file})")
+    return sitelinks
+
+# === SET PREDICATES AND COUNTS ===
+def project_codes(sitelinks, project):
+    # a project without any sitelink (e.g. meta, incubator) has no row in the vocabulary file but still has (empty) bitmaps
+    return sitelinks["vocabulary"].get(project, [])
+
+def language_mask(sitelinks, project, codes):
+    mask = np.zeros(sitelinks["bitmaps"][project].shape[1], dtype=np.uint64)
+    vocabulary = project_codes(sitelinks, project)
+    for code in codes:
+        if code in vocabulary:  # a code no author has is left out of the mask (has_all() is then False for everyone, see below)
+            bit = vocabulary.index(code)
+            mask[bit // WORD_BITS] |= np.uint64(1) << np.uint64(bit % WORD_BITS)
+    return mask
+
+def has_all(sitelinks, project, codes):
+    if any(code not in project_codes(sitelinks, project) for code in codes):
+        return np.zeros(len(sitelinks["qids"]), dtype=bool)
+    mask = language_mask(sitelinks, project, codes)
+    return ((sitelinks["bitmaps"][project] & mask) == mask).all(axis=1)
+
+def has_any(sitelinks, project, codes):
+    return ((sitelinks["bitmaps"][project] & language_mask(sitelinks, project, codes)) != 0).any(axis=1)
+
+def has_none(sitelinks, project, codes):
+    return ~has_any(sitelinks, project, codes)
+
+def popcount(words):
+    # number of set bits of every row of uint64 words
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(words.astype("<u8").view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+def count_languages(sitelinks, project, codes=None):
+    # number of languages of every author (among codes, if given)
+    bitmaps = sitelinks["bitmaps"][project]
+    return popcount(bitmaps if codes is None else bitmaps & language_mask(sitelinks, project, codes))
+
+def language_coverage(sitelinks, project, selection=None):
+    # number of authors (of the selection, a boolean array) with a page in every language of the project
+    bitmaps = sitelinks["bitmaps"][project] if selection is None else sitelinks["bitmaps"][project][selection]
+    bits = np.unpackbits(bitmaps.astype("<u8").view(np.uint8), axis=1, bitorder="little").sum(axis=0)
+    codes = project_codes(sitelinks, project)
+    return pd.Series(bits[:len(codes)], index=codes).sort_values(ascending=False, kind="stable")
+
+def languages_of(sitelinks, project, qid):
+    row = np.flatnonzero(sitelinks["qids"] == qid)
+    if not len(row):
+        return []
+    bits = np.unpackbits(sitelinks["bitmaps"][project][row[:1]].astype("<u8").view(np.uint8), axis=1, bitorder="little")[0]
+    return [code for code, bit in zip(project_codes(sitelinks, project), bits) if bit]
+
+def main():
+    print(f"📥 Reading sitelink languages from: {INPUT_FILE}")
+    sitelinks = write_sitelink_bitmaps()
+
+    started = time.perf_counter()
+    selected = has_all(sitelinks, EXAMPLE_QUERY["project"], EXAMPLE_QUERY["all_of"])
+    print(f"🔍 {EXAMPLE_QUERY['project']} in {' and '.join(EXAMPLE_QUERY['all_of'])}: {int(selected.sum())} authors in {(time.perf_counter() - started) * 1000:.3f} ms")
+    print(f"🌍 Most covered {EXAMPLE_QUERY['project']} languages:\n{language_coverage(sitelinks, EXAMPLE_QUERY['project']).head(10).to_string()}")
+    print("✅ Done.")
+
+if __name__ == "__main__":
+    main()
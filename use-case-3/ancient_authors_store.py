@@ -0,0 +1,228 @@
+import csv
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+
+import ancient_authors_sitelink_bitmaps as bitmaps_script
+
+# === CONFIG ===
+DB_FILE = "ancient_authors.sqlite"
+CSV_FILES = {
+    "authors": "ancient_authors_wikidata_with_precision.csv",
+    "ids": "ancient_authors_wikidata_ids.csv",
+    "item_metrics": "ancient_authors_wikidata_item_metrics.csv",
+    "author_languages": "ancient_authors_wikidata_author_languages.csv",
+    "labels_aliases": "ancient_authors_wikidata_labels_aliases.csv",
+    "date_intervals": "ancient_authors_wikidata_date_intervals.csv",  # see ancient_authors_date_intervals.py
+}
+DELIMITER = ";"
+LIST_SEPARATORS = {"labels_aliases": "|"}  # aliases are '|'-joined, the other lists ','-joined
+MULTI_VALUE_SEPARATORS = {"ids": "|", "authors": ","}  # several values of one external ID (some IDs, e.g. dco_id, contain commas)
+
+# column types (the other columns are TEXT)
+INTEGER_COLUMNS = {
+    "authors": ["birth_year", "birth_precision", "death_year", "death_precision", "floruit_year", "floruit_precision"],
+    "item_metrics": ["statements", "identifiers", "total_sitelinks", "wikipedia_count", "wiktionary_count", "wikiquote_count", "wikisource_count",
+                     "wikibooks_count", "wikinews_count", "wikiversity_count", "wikivoyage_count", "commons_count", "meta_count", "wikispecies_count",
+                     "wikidata_count", "incubator_count", "wikifunctions_count"],
+    "date_intervals": ["earliest", "latest", "precision"],
+}
+PRIMARY_KEYS = {
+    "authors": ["wikidata_id"],
+    "ids": ["wikidata_id"],
+    "item_metrics": ["wikidata_id"],
+    "author_languages": ["wikidata_id"],
+    "labels_aliases": ["wikidata_id", "lang_code"],
+    "date_intervals": ["wikidata_id"],
+}
+
+# "authors with a PHI id and a French Wikipedia page, born before 300 BCE"
+EXAMPLE_QUERY = """
+SELECT a.wikidata_id, a.name_en, a.birth_year, i.phi_id
+FROM authors a
+JOIN ids i ON i.wikidata_id = a.wikidata_id
+WHERE i.phi_id IS NOT NULL
+  AND a.birth_year < -300
+  AND EXISTS (SELECT 1 FROM sitelinks s WHERE s.wikidata_id = a.wikidata_id AND s.project = 'wikipedia' AND s.lang_code = 'fr')
+ORDER BY a.birth_year
+"""
+
+def read_csv_rows(filename):
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f, delimiter=DELIMITER)
+        return reader.fieldnames, list(reader)
+
+def convert_value(value, integer):
+    value = (value or "").strip()
+    if not value:
+        return None
+    if integer:
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    return value
+
+def split_values(value, separators):
+    for separator in separators[1:]:
+        value = value.replace(separator, separators[0])
+    return [v.strip() for v in value.split(separators[0]) if v.strip()]
+
+def create_table(connection, table, columns):
+    integers = set(INTEGER_COLUMNS.get(table, []))
+    column_defs = ", ".join(f'"{c}" {"INTEGER" if c in integers else "TEXT"}' for c in columns)
+    primary_key = ", ".join(PRIMARY_KEYS[table])
+    connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+    connection.execute(f'CREATE TABLE "{table}" ({column_defs}, PRIMARY KEY ({primary_key})) WITHOUT ROWID')
+
+def load_table(connection, table, filename):
+    columns, rows = read_csv_rows(filename)
+    integers = set(INTEGER_COLUMNS.get(table, []))
+    create_table(connection, table, columns)
+    placeholders = ", ".join("?" for _ in columns)
+    connection.executemany(
+        f'INSERT OR REPLACE INTO "{table}" VALUES ({placeholders})',
+        ([convert_value(row.get(c), c in integers) for c in columns] for row in rows),
+    )
+    return columns, rows
+
+def build_derived_tables(connection, tables):
+    # long tables for the lookups that the CSV lists do not allow: any external ID -> QID, sitelinks by language, aliases;
+    # and the sitelink languages of every author and project as a bitmap (see ancient_authors_sitelink_bitmaps.py)
+    connection.executescript("""
+        DROP TABLE IF EXISTS external_ids;
+        CREATE TABLE external_ids (id_type TEXT, id_value TEXT, wikidata_id TEXT, PRIMARY KEY (id_type, id_value, wikidata_id)) WITHOUT ROWID;
+        DROP TABLE IF EXISTS sitelinks;
+        CREATE TABLE sitelinks (wikidata_id TEXT, project TEXT, lang_code TEXT, PRIMARY KEY (wikidata_id, project, lang_code)) WITHOUT ROWID;
+        DROP TABLE IF EXISTS aliases;
+        CREATE TABLE aliases (wikidata_id TEXT, lang_code TEXT, alias TEXT, PRIMARY KEY (wikidata_id, lang_code, alias)) WITHOUT ROWID;
+        DROP TABLE IF EXISTS sitelink_languages;
+        CREATE TABLE sitelink_languages (project TEXT, bit INTEGER, lang_code TEXT, PRIMARY KEY (project, bit)) WITHOUT ROWID;
+        DROP TABLE IF EXISTS sitelink_bitmaps;
+        CREATE TABLE sitelink_bitmaps (wikidata_id TEXT, project TEXT, bitmap BLOB, PRIMARY KEY (project, wikidata_id)) WITHOUT ROWID;
+    """)
+
+    external_ids = []
+    if "ids" in tables:
+        columns, rows = tables["ids"]
+        for row in rows:
+            for column in columns[1:]:
+                external_ids.extend((column, v, row["wikidata_id"]) for v in split_values(row.get(column) or "", MULTI_VALUE_SEPARATORS["ids"]))
+    if "authors" in tables:
+        for row in tables["authors"][1]:
+            for column in ("viaf_id", "bnf_id"):
+                external_ids.extend((column, v, row["wikidata_id"]) for v in split_values(row.get(column) or "", MULTI_VALUE_SEPARATORS["authors"]))
+    connection.executemany("INSERT OR IGNORE INTO external_ids VALUES (?, ?, ?)", external_ids)
+
+    if "item_metrics" in tables:
+        columns, rows = tables["item_metrics"]
+        lang_columns = [c for c in columns if c.endswith("_langs")]
+        connection.executemany(
+            "INSERT OR IGNORE INTO sitelinks VALUES (?, ?, ?)",
+            ((row["wikidata_id"], c[:-len("_langs")], lang) for row in rows for c in lang_columns for lang in split_values(row.get(c) or "", ",")),
+        )
+
+        # bits of the fixed vocabulary (codes missing from it are appended); a bitmap is the little-endian bytes of its uint64 words
+        df_metrics = pd.DataFrame(rows, columns=columns).fillna("")
+        vocabulary = bitmaps_script.extend_vocabulary(bitmaps_script.read_vocabulary(), df_metrics)
+        sitelinks = bitmaps_script.encode_sitelinks(df_metrics, vocabulary)
+        connection.executemany("INSERT INTO sitelink_languages VALUES (?, ?, ?)",
+                               ((project, bit, code) for project, codes in vocabulary.items() for bit, code in enumerate(codes)))
+        connection.executemany(
+            "INSERT OR REPLACE INTO sitelink_bitmaps VALUES (?, ?, ?)",
+            ((qid, project, bitmap.astype("<u8").tobytes()) for project, bitmaps in sitelinks["bitmaps"].items() for qid, bitmap in zip(sitelinks["qids"], bitmaps)),
+        )
+
+    if "labels_aliases" in tables:
+        separator = LIST_SEPARATORS["labels_aliases"]
+        connection.executemany(
+            "INSERT OR IGNORE INTO aliases VALUES (?, ?, ?)",
+            ((row["wikidata_id"], row["lang_code"], alias) for row in tables["labels_aliases"][1]
+             for alias in [row.get("label") or ""] + split_values(row.get("aliases") or "", separator) if alias),
+        )
+
+def create_indexes(connection, tables):
+    # secondary indexes: every external ID column, languages, dates and activity intervals
+    statements = [
+        "CREATE INDEX IF NOT EXISTS idx_external_ids_qid ON external_ids (wikidata_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sitelinks_lang ON sitelinks (lang_code, project)",
+        "CREATE INDEX IF NOT EXISTS idx_aliases_alias ON aliases (alias COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_aliases_lang ON aliases (lang_code)",
+    ]
+    if "labels_aliases" in tables:
+        statements.append("CREATE INDEX IF NOT EXISTS idx_labels_aliases_lang ON labels_aliases (lang_code)")
+    if "date_intervals" in tables:
+        statements.append("CREATE INDEX IF NOT EXISTS idx_date_intervals ON date_intervals (earliest, latest, precision)")
+    if "ids" in tables:
+        statements += [f'CREATE INDEX IF NOT EXISTS "idx_ids_{c}" ON ids ("{c}")' for c in tables["ids"][0][1:]]
+    if "authors" in tables:
+        statements += [f'CREATE INDEX IF NOT EXISTS "idx_authors_{c}" ON authors ("{c}")' for c in ("viaf_id", "bnf_id", "birth_year", "death_year", "floruit_year")]
+    for statement in statements:
+        connection.execute(statement)
+
+def build_store(db_file=DB_FILE, csv_files=CSV_FILES):
+    connection = sqlite3.connect(db_file)
+    tables = {}
+    with connection:
+        for table, filename in csv_files.items():
+            try:
+                tables[table] = load_table(connection, table, filename)
+                print(f"📥 {table}: {len(tables[table][1])} rows from {filename}")
+            except FileNotFoundError:
+                print(f"⚠️  {filename} not found, table '{table}' skipped.")
+        build_derived_tables(connection, tables)
+        create_indexes(connection, tables)
+    connection.execute("ANALYZE")
+    return connection
+
+def connect(db_file=DB_FILE):
+    connection = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+def query(connection, sql, params=()):
+    return [dict(row) for row in connection.execute(sql, params)]
+
+def select_columns(connection, table, columns, where="", params=()):
+    # column projection: only the requested columns are read
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    return query(connection, f'SELECT {column_list} FROM "{table}"' + (f" WHERE {where}" if where else ""), params)
+
+def qids_for_external_id(connection, id_type, id_value):
+    return [row["wikidata_id"] for row in query(connection, "SELECT wikidata_id FROM external_ids WHERE id_type = ? AND id_value = ?", (id_type, id_value))]
+
+def load_sitelink_bitmaps(connection, projects=None):
+    # the bitmaps of the store as arrays, for the set predicates of ancient_authors_sitelink_bitmaps.py (has_all(), has_any(), count_languages()...)
+    vocabulary = {}
+    for row in query(connection, "SELECT project, lang_code FROM sitelink_languages ORDER BY project, bit"):
+        vocabulary.setdefault(row["project"], []).append(row["lang_code"])
+    projects = projects or list(vocabulary)
+    qids = [row["wikidata_id"] for row in query(connection, "SELECT DISTINCT wikidata_id FROM sitelink_bitmaps ORDER BY wikidata_id")]
+    bitmaps = {}
+    for project in projects:
+        rows = query(connection, "SELECT bitmap FROM sitelink_bitmaps WHERE project = ? ORDER BY wikidata_id", (project,))
+        bitmaps[project] = np.frombuffer(b"".join(row["bitmap"] for row in rows), dtype="<u8").reshape(len(rows), -1).astype(np.uint64)
+    return {"qids": np.array(qids, dtype=str), "vocabulary": vocabulary, "bitmaps": bitmaps}
+
+def main():
+    started = time.perf_counter()
+    build_store().close()
+    print(f"💾 Store written to {DB_FILE} in {time.perf_counter() - started:.1f}s")
+
+    connection = connect()
+    started = time.perf_counter()
+    rows = query(connection, EXAMPLE_QUERY)
+    print(f"🔍 Example query: {len(rows)} authors in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for row in rows[:10]:
+        print(f"   {row['wikidata_id']}  {row['name_en']}  {row['birth_year']}  phi:{row['phi_id']}")
+
+    sitelinks = load_sitelink_bitmaps(connection, ["wikipedia"])
+    started = time.perf_counter()
+    selected = bitmaps_script.has_all(sitelinks, "wikipedia", ["ar", "fa"])
+    print(f"🔍 Arabic and Persian Wikipedia pages: {int(selected.sum())} authors in {(time.perf_counter() - started) * 1000:.3f} ms")
+    connection.close()
+    print("✅ Done.")
+
+if __name__ == "__main__":
+    main()
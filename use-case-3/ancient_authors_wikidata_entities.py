@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+import ancient_authors_wikidata_ids as ids_script
+import ancient_authors_wikidata_item_metrics as metrics_script
+import ancient_authors_wikidata_labels_aliases as labels_script
+import ancient_authors_wikidata_author_languages as languages_script
+import ancient_authors_sitelink_bitmaps as bitmaps_script
+
+# === CONFIG ===
+API_URL = "https://www.wikidata.org/w/api.php"
+INPUT_FILE = "ancient_authors_wikidata_with_precision.csv"  # must have 'wikidata_id' column
+BACKEND = "api"  # "api" (wbgetentities, cached) or "local" (entity JSON files in LOCAL_ENTITIES_DIR, e.g. for tests)
+CACHE_DIR = "entity_cache"  # one <QID>.json per entity; a filled cache can be used as LOCAL_ENTITIES_DIR
+LOCAL_ENTITIES_DIR = "entity_cache"
+BATCH_SIZE = 50  # wbgetentities limit
+WORKERS = 4
+TIMEOUT_SECONDS = 60
+MAX_RETRIES = 5
+USER_AGENT = "AncientAuthorsBot/1.0 (contact@example.com)"
+OUTPUT_FILES = {  # same names and schemas as the SPARQL scripts
+    "ids": ids_script.OUTPUT_FILE,
+    "metrics": metrics_script.OUTPUT_FILE,
+    "labels_aliases": labels_script.OUTPUT_FILE,
+    "languages": languages_script.OUTPUT_FILE,
+}
+
+PROJECTS = ["wikipedia", "wiktionary", "wikiquote", "wikisource", "wikibooks", "wikinews", "wikiversity", "wikivoyage",
+            "commons", "meta", "wikispecies", "wikidata", "incubator", "wikifunctions"]
+# same order as the nested IF of build_metrics_query(): the first matching pattern wins
+PROJECT_URL_PATTERNS = [(".wikipedia.org", "wikipedia"), (".wiktionary.org", "wiktionary"), (".wikiquote.org", "wikiquote"),
+                        (".wikisource.org", "wikisource"), (".wikibooks.org", "wikibooks"), (".wikinews.org", "wikinews"),
+                        (".wikiversity.org", "wikiversity"), (".wikivoyage.org", "wikivoyage"), ("commons.wikimedia.org", "commons"),
+                        ("meta.wikimedia.org", "meta"), ("species.wikimedia.org", "wikispecies"), (".wikidata.org", "wikidata"),
+                        ("incubator.wikimedia.org", "incubator"), (".wikifunctions.org", "wikifunctions")]
+LANGUAGE_PROPS = [("P1412", "spoken_written"), ("P6886", "writing"), ("P103", "native")]
+LIST_SEPARATOR = "|"  # several values of one identifier property
+
+# === FETCHING ENTITIES ===
+def cache_path(directory, qid):
+    return os.path.join(directory, f"{qid}.json")
+
+def fetch_batch_from_api(qids, max_retries=MAX_RETRIES):
+    params = urllib.parse.urlencode({
+        "action": "wbgetentities", "ids": "|".join(qids), "format": "json",
+        "props": "labels|aliases|claims|sitelinks/urls",
+    })
+    request = urllib.request.Request(f"{API_URL}?{params}", headers={"User-Agent": USER_AGENT})
+    delay = 5
+    for attempt in range(1, max_retries + 1):
+        try:
+            with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS) as response:
+                return json.load(response).get("entities", {})
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(f"⚠️  Request failed (attempt {attempt}/{max_retries}): {e}. Retrying in {delay}s...")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+def fetch_entities_from_api(qids, cache_dir=CACHE_DIR, workers=WORKERS):
+    # cached entities are read from disk, the others are fetched by batches of BATCH_SIZE in parallel and cached
+    os.makedirs(cache_dir, exist_ok=True)
+    entities, missing = {}, []
+    for qid in qids:
+        if os.path.exists(cache_path(cache_dir, qid)):
+            with open(cache_path(cache_dir, qid), encoding="utf-8") as f:
+                entities[qid] = json.load(f)
+        else:
+            missing.append(qid)
+    print(f"🗄️ {len(entities)} entities in cache, {len(missing)} to fetch.")
+
+    batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+    with ThreadPoolExecutor(workers) as pool:
+        for batch_nb, (batch, fetched) in enumerate(zip(batches, pool.map(fetch_batch_from_api, batches)), 1):
+            for qid in batch:
+                entity = fetched.get(qid, {})
+                if "missing" in entity:
+                    print(f"⚠️  {qid} does not exist (anymore).")
+                    continue
+                # a redirected QID comes back under the requested ID with the entity of its target
+                entities[qid] = entity
+                with open(cache_path(cache_dir, qid), "w", encoding="utf-8") as f:
+                    json.dump(entity, f, ensure_ascii=False)
+            print(f"🔍 Batch {batch_nb}/{len(batches)}: {len(batch)} entities")
+    return entities
+
+def load_entities_from_dir(qids, directory=LOCAL_ENTITIES_DIR):
+    entities = {}
+    for qid in qids:
+        path = cache_path(directory, qid)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                entities[qid] = json.load(f)
+    print(f"🗄️ {len(entities)} of {len(qids)} entities found in {directory}.")
+    return entities
+
+BACKENDS = {"api": fetch_entities_from_api, "local": load_entities_from_dir}
+
+def get_entities(qids, backend=BACKEND):
+    return BACKENDS[backend](qids)
+
+# === DERIVING THE TABLES ===
+def claim_values(entity, pid):
+    values = []
+    for claim in entity.get("claims", {}).get(pid, []):
+        value = claim.get("mainsnak", {}).get("datavalue", {}).get("value")
+        if isinstance(value, dict):
+            value = value.get("id")
+        if value and value not in values:
+            values.append(value)
+    return values
+
+def entities_to_ids_rows(entities):
+    # multi-valued identifiers are kept, '|'-joined
+    return [[qid] + [LIST_SEPARATOR.join(claim_values(entity, pid)) for pid, _ in ids_script.ID_PROPS] for qid, entity in entities.items()]
+
+def entities_to_labels_aliases_rows(entities):
+    rows = []
+    for qid, entity in entities.items():
+        labels = {lang: value["value"] for lang, value in entity.get("labels", {}).items()}
+        aliases = {lang: [a["value"] for a in values] for lang, values in entity.get("aliases", {}).items()}
+        for lang in sorted(set(labels) | set(aliases)):
+            rows.append([qid, lang, labels.get(lang, ""), "|".join(dict.fromkeys(aliases.get(lang, [])))])
+    return rows
+
+def entities_to_metrics_rows(entities):
+    qids = list(entities)
+    statements = [sum(len(claims) for claims in entities[qid].get("claims", {}).values()) for qid in qids]
+    identifiers = [sum(1 for claims in entities[qid].get("claims", {}).values() for c in claims
+                       if c.get("mainsnak", {}).get("datatype") == "external-id") for qid in qids]
+    df = pd.DataFrame({"wikidata_id": qids, "statements": statements, "identifiers": identifiers,
+                       "total_sitelinks": [len(entities[qid].get("sitelinks", {})) for qid in qids]})
+
+    # one row per sitelink; project and language code derived from the URL as in build_metrics_query()
+    df_links = pd.DataFrame([(qid, link.get("url", "")) for qid in qids for link in entities[qid].get("sitelinks", {}).values()],
+                            columns=["wikidata_id", "url"])
+    df_links["lang_code"] = df_links["url"].str.extract(r"//([^.]*)\.", expand=False).str.lower().fillna("")
+    df_links["project"] = np.select([df_links["url"].str.contains(pattern, regex=False) for pattern, _ in PROJECT_URL_PATTERNS],
+                                    [project for _, project in PROJECT_URL_PATTERNS], default="other") if len(df_links) else []
+
+    counts = pd.crosstab(df_links["wikidata_id"], df_links["project"]).reindex(index=qids, columns=PROJECTS, fill_value=0)
+    langs = (df_links.drop_duplicates(["wikidata_id", "project", "lang_code"])
+             .groupby(["wikidata_id", "project"])["lang_code"].agg(",".join)
+             .unstack().reindex(index=qids, columns=PROJECTS).fillna(""))
+
+    df = df.set_index("wikidata_id").join(counts.add_suffix("_count")).join(langs.add_suffix("_langs"))
+    return df.reset_index().values.tolist()
+
+def entities_to_languages_rows(entities, language_labels):
+    rows = []
+    for qid, entity in entities.items():
+        names = {facet: [language_labels[l] for l in claim_values(entity, pid) if language_labels.get(l)] for pid, facet in LANGUAGE_PROPS}
+        all_names = list(dict.fromkeys(n for facet in names.values() for n in facet))
+        # languages of works need the works pointing to the author (P50), which are not in the author's entity: left empty
+        rows.append([qid, "|".join(names["spoken_written"]), "|".join(names["writing"]), "|".join(names["native"]), "", "|".join(all_names)])
+    return rows
+
+def language_labels_for(entities, backend=BACKEND):
+    lang_qids = sorted({l for entity in entities.values() for pid, _ in LANGUAGE_PROPS for l in claim_values(entity, pid)})
+    lang_entities = get_entities(lang_qids, backend)
+    return {qid: entity.get("labels", {}).get("en", {}).get("value", "") for qid, entity in lang_entities.items()}
+
+def main():
+    print(f"📥 Reading Q-IDs from: {INPUT_FILE}")
+    qids = metrics_script.read_qids_from_csv(INPUT_FILE)
+    print(f"🔢 Found {len(qids)} Q-IDs.")
+
+    started = time.perf_counter()
+    entities = get_entities(qids)
+    print(f"⏱️ Entities loaded in {time.perf_counter() - started:.1f}s")
+
+    ids_script.write_results_to_csv(entities_to_ids_rows(entities), OUTPUT_FILES["ids"])
+    metrics_script.write_csv(entities_to_metrics_rows(entities), OUTPUT_FILES["metrics"])
+    bitmaps_script.write_sitelink_bitmaps(OUTPUT_FILES["metrics"])
+    labels_script.write_csv(entities_to_labels_aliases_rows(entities), OUTPUT_FILES["labels_aliases"])
+    languages_script.write_csv(entities_to_languages_rows(entities, language_labels_for(entities)), OUTPUT_FILES["languages"])
+    print(f"✅ Saved → {', '.join(OUTPUT_FILES.values())}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ ENDPOINT_URL = "https://query.wikidata.org/sparql"
 INPUT_FILE = "ancient_authors_wikidata_with_precision.csv"
 OUTPUT_FILE = "ancient_authors_ids.csv"
 BATCH_SIZE = 100
+LIST_SEPARATOR = "|"  # several values of one property
 ID_PROPS = [
     ("P11252", "trismegistos_id"),
     ("P7041", "perseus_id"),
@@ -30,6 +31,7 @@ ID_PROPS = [
 ]
 
 HEADERS = ["wikidata_id"] + [name for _, name in ID_PROPS]
+PROP_NAMES = {f"http://www.wikidata.org/prop/direct/{pid}": name for pid, name in ID_PROPS}
 
 # === SPARQL SETUP ===
 sparql = SPARQLWrapper(ENDPOINT_URL)
@@ -52,16 +54,15 @@ def run_query_with_backoff(query, max_retries=5):
     raise RuntimeError("🛑 Query failed after max retries.")
 
 def build_id_lookup_query(wikidata_ids):
+    # one row per (author, property, value) instead of one OPTIONAL per property, whose rows multiply for authors with several values
     values = " ".join(f"wd:{qid}" for qid in wikidata_ids)
-    prop_clauses = "\n".join(
-        f"OPTIONAL {{ ?author wdt:{pid} ?{varname} . }}" for pid, varname in ID_PROPS
-    )
-    select_vars = " ".join(f"?{varname}" for _, varname in ID_PROPS)
+    props = " ".join(f"wdt:{pid}" for pid, _ in ID_PROPS)
 
     return f"""
-    SELECT ?author {select_vars} WHERE {{
+    SELECT ?author ?property ?value WHERE {{
       VALUES ?author {{ {values} }}
-      {prop_clauses}
+      VALUES ?property {{ {props} }}
+      ?author ?property ?value .
     }}
     """
 
@@ -81,7 +82,7 @@ def main():
     wikidata_ids = read_wikidata_ids_from_csv(INPUT_FILE)
     print(f"🔢 Found {len(wikidata_ids)} IDs.")
 
-    merged = defaultdict(dict)
+    merged = {}
 
     for i in range(0, len(wikidata_ids), BATCH_SIZE):
         batch = wikidata_ids[i:i + BATCH_SIZE]
@@ -90,16 +91,17 @@ def main():
         query = build_id_lookup_query(batch)
         results = run_query_with_backoff(query)
 
+        for qid in batch:
+            merged.setdefault(qid, defaultdict(list))
+
         for result in results["results"]["bindings"]:
             qid = result["author"]["value"].split("/")[-1]
-            record = merged[qid]
-            record["wikidata_id"] = qid
-
-            for _, name in ID_PROPS:
-                record[name] = result.get(name, {}).get("value", "")
+            values = merged[qid][PROP_NAMES[result["property"]["value"]]]
+            if result["value"]["value"] not in values:
+                values.append(result["value"]["value"])
 
     print(f"💾 Writing results to {OUTPUT_FILE}...")
-    rows = [[record.get(h, "") for h in HEADERS] for record in merged.values()]
+    rows = [[qid] + [LIST_SEPARATOR.join(record[name]) for name in HEADERS[1:]] for qid, record in merged.items()]
     write_results_to_csv(rows, OUTPUT_FILE)
     print("✅ Done.")
 
@@ -2,6 +2,8 @@ import csv
 import time
 from SPARQLWrapper import SPARQLWrapper, JSON, SPARQLExceptions
 
+import ancient_authors_sitelink_bitmaps as bitmaps_script
+
 # === CONFIG ===
 ENDPOINT_URL = "https://query.wikidata.org/sparql"
 INPUT_FILE = "ancient_authors_wikidata_with_precision.csv"  # must have 'wikidata_id' column
@@ -164,6 +166,10 @@ def main():
             def gv(k, default=""):
                 return b.get(k, {}).get("value", default)
 
+            def langs(k):
+                # GROUP_CONCAT keeps the "" of the other projects' sitelinks ('la,,lez')
+                return bitmaps_script.clean_langs(gv(k))
+
             row = [
                 qid,
                 gv("statements"), gv("identifiers"), gv("total_sitelinks", "0"),
@@ -172,11 +178,11 @@ def main():
                 gv("wikiversity_count", "0"), gv("wikivoyage_count", "0"), gv("commons_count", "0"),
                 gv("meta_count", "0"), gv("wikispecies_count", "0"), gv("wikidata_count", "0"),
                 gv("incubator_count", "0"), gv("wikifunctions_count", "0"),
-                gv("wikipedia_langs"), gv("wiktionary_langs"), gv("wikiquote_langs"),
-                gv("wikisource_langs"), gv("wikibooks_langs"), gv("wikinews_langs"),
-                gv("wikiversity_langs"), gv("wikivoyage_langs"), gv("commons_langs"),
-                gv("meta_langs"), gv("wikispecies_langs"), gv("wikidata_langs"),
-                gv("incubator_langs"), gv("wikifunctions_langs"),
+                langs("wikipedia_langs"), langs("wiktionary_langs"), langs("wikiquote_langs"),
+                langs("wikisource_langs"), langs("wikibooks_langs"), langs("wikinews_langs"),
+                langs("wikiversity_langs"), langs("wikivoyage_langs"), langs("commons_langs"),
+                langs("meta_langs"), langs("wikispecies_langs"), langs("wikidata_langs"),
+                langs("incubator_langs"), langs("wikifunctions_langs"),
             ]
             all_rows.append(row)
 
@@ -184,6 +190,7 @@ def main():
 
     print(f"💾 Writing {len(all_rows)} rows to {OUTPUT_FILE}")
     write_csv(all_rows, OUTPUT_FILE)
+    bitmaps_script.write_sitelink_bitmaps(OUTPUT_FILE)
     print("✅ Done.")
 
 if __name__ == "__main__":